@@ -0,0 +1,177 @@
+"""Time each analysis stage on synthetic flights at several sizes.
+
+    python benchmarks/bench.py                         # 100k and 1M rows
+    python benchmarks/bench.py --sizes 100k,1M,7M,50M --out bench.json
+    python benchmarks/bench.py --compare old.json      # ratios against an earlier run
+
+Synthetic CSVs (flights.synth) are written once to --data and reused. Each
+size runs in a fresh process, so the peak RSS recorded after each stage is
+the high-water mark of that size alone. Results are JSON: one record per
+(rows, stage) with wall and CPU seconds and peak RSS, plus the versions of
+Python and the libraries, so runs of different versions can be compared.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SIZES = {'100k': 100_000, '1M': 1_000_000, '7M': 7_000_000, '50M': 50_000_000}
+STAGES = ['load_csv', 'build_cache', 'load_cache', 'filter', 'groupby', 'binning', 'merge',
+          'plot']
+SEED = 2008
+
+
+def run_stages(csv_path, stages):
+    """[{stage, seconds, cpu_seconds, peak_rss_mb}, ...] for one CSV."""
+    from flights import (DELAY_BINS, DELAY_COLUMNS, bin_counts, build_cache, default_registry,
+                         load_flights, merge_all, read_flights, render_report, report_charts)
+    from flights.trace import _max_rss
+
+    registry = default_registry()
+    state = {}
+
+    def load_csv():
+        state['df'] = read_flights(csv_path)
+
+    def load_cache():
+        state['df'] = load_flights(csv_path)
+
+    def filter_():
+        # The NaN / 0 filters of code.py's delay cells.
+        df = state['df']
+        for c in DELAY_COLUMNS:
+            s = df[c]
+            s[s.notna() & (s != 0)]
+
+    def groupby():
+        state['results'] = registry.run(state['df'])
+
+    def binning():
+        bin_counts(state['df'], DELAY_BINS)
+
+    def merge():
+        df = state['df']
+        months = df['Month'].to_numpy()
+        partials = [registry.partial(df[months == m]) for m in range(1, 13)]
+        registry.finish(merge_all(partials))
+
+    def plot():
+        out = tempfile.mkdtemp()
+        try:
+            render_report(report_charts(state.get('results') or registry.run(state['df'])),
+                          out, workers=1, force=True)
+        finally:
+            shutil.rmtree(out)
+
+    actions = {'load_csv': load_csv, 'build_cache': lambda: build_cache(csv_path),
+               'load_cache': load_cache, 'filter': filter_, 'groupby': groupby,
+               'binning': binning, 'merge': merge, 'plot': plot}
+    records = []
+    for stage in stages:
+        if stage not in ('load_csv', 'build_cache', 'load_cache') and 'df' not in state:
+            load_cache()
+        wall, cpu = time.perf_counter(), time.process_time()
+        actions[stage]()
+        records.append({'stage': stage, 'seconds': round(time.perf_counter() - wall, 4),
+                        'cpu_seconds': round(time.process_time() - cpu, 4),
+                        'peak_rss_mb': _mb(_max_rss())})
+    return records
+
+
+def data_file(data_dir, rows):
+    """Path of the synthetic CSV of `rows` rows, written if missing."""
+    from flights.synth import write_synthetic
+
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, 'synthetic_%d.csv' % rows)
+    if not os.path.exists(path):
+        tmp = path + '.part'
+        write_synthetic(tmp, rows, seed=SEED)
+        os.replace(tmp, path)
+    return path
+
+
+def environment():
+    import numpy
+    import pandas
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'commit': commit, 'python': platform.python_version(),
+            'numpy': numpy.__version__, 'pandas': pandas.__version__,
+            'machine': platform.machine(), 'cpus': os.cpu_count()}
+
+
+def compare(results, baseline):
+    """Print seconds and the ratio to `baseline` for every (rows, stage)."""
+    old = {(r['rows'], r['stage']): r for r in baseline['results']}
+    print('%10s %-12s %10s %10s %7s' % ('rows', 'stage', 'seconds', 'baseline', 'ratio'))
+    for r in results['results']:
+        b = old.get((r['rows'], r['stage']))
+        ratio = '%7.2f' % (r['seconds'] / b['seconds']) if b and b['seconds'] else '%7s' % '-'
+        print('%10d %-12s %10.3f %10s %s' % (r['rows'], r['stage'], r['seconds'],
+                                            '%.3f' % b['seconds'] if b else '-', ratio))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100k,1M',
+                        help='comma-separated, from %s or row counts' % ', '.join(SIZES))
+    parser.add_argument('--stages', default=','.join(STAGES))
+    parser.add_argument('--data', default=os.path.join(ROOT, 'benchmarks', 'data'),
+                        help='directory for the synthetic CSVs')
+    parser.add_argument('--out', help='write the JSON here (default: stdout)')
+    parser.add_argument('--compare', help='JSON of an earlier run to compare with')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    stages = args.stages.split(',')
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error('unknown stages: %s' % ', '.join(sorted(unknown)))
+
+    if args.child:
+        json.dump(run_stages(args.child, stages), sys.stdout)
+        return
+
+    results = {'environment': environment(), 'results': []}
+    for size in args.sizes.split(','):
+        rows = SIZES[size] if size in SIZES else int(size)
+        path = data_file(args.data, rows)
+        child = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', path,
+                                '--stages', args.stages], capture_output=True, text=True)
+        if child.returncode:
+            sys.stderr.write(child.stderr)
+            raise SystemExit('benchmark of %d rows failed' % rows)
+        for record in json.loads(child.stdout):
+            results['results'].append({'rows': rows, **record})
+        sys.stderr.write('%d rows done\n' % rows)
+
+    text = json.dumps(results, indent=1)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+    elif not args.compare:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+def _mb(size):
+    return None if size is None else round(size / 2**20, 1)
+
+
+if __name__ == '__main__':
+    main()
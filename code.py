@@ -44,11 +44,22 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sb
 import calendar
+from flights import (CodeTable, Tracer, bin_counts, build_cube, cached_results, code_counts,
+                     daily_counts, day_names, default_registry, delay_bins, delay_chains,
+                     hourly_delays, load_columns, load_flights, month_names, render_report,
+                     report_charts, rotations, route_stats, sample_flights, top_routes)
 
-%matplotlib inline
+get_ipython().run_line_magic('matplotlib', 'inline')
+# Time every loading, aggregation and rendering stage of this run
+# (summarised at the end)
+tracer = Tracer().start()
 
 # In[2]:
-df_2008 = pd.read_csv('2008.csv')
+# Read with a fixed schema (small ints, categoricals, nullable delays).
+# The first run converts the CSV to one binary file per column in
+# .flights_columns/; later runs map those files into memory, so only the
+# columns that are used are ever read (and other processes share the pages).
+df_2008 = load_columns('2008.csv')
 
 # In[3]:
 print(df_2008.shape)
@@ -56,11 +67,21 @@ print(df_2008.dtypes)
 print(df_2008.head(10))
 
 # In[4]:
-# Due to large file size, take a sample to more efficiently analyze trends in data
-df_2008.sample(100000).to_csv('2008_sampled_100000.csv')
+# Due to large file size, take a sample to more efficiently analyze trends in data.
+# The sample is drawn while streaming over the CSV, seeded so that it is the same
+# on every run, and stratified so that it keeps the month, day of week and carrier
+# proportions of the full year.
+sample_2008 = sample_flights('2008.csv', 100000, seed=2008, strata=['Month', 'DayOfWeek', 'UniqueCarrier'])
+sample_2008.frame.to_csv('2008_sampled_100000.csv', index=False)
+# Weight of each stratum (flights in the full year per sampled flight)
+sample_2008.weights
 
 # In[5]:
-df_2008s = pd.read_csv('2008_Sampled_100000.csv')
+# Carrier, airport and tail codes are numbered once, in a table shared by all
+# years and files (Origin and Dest share the airport numbering)
+codes = CodeTable.open('flight_codes.json')
+df_2008s = load_flights('2008_sampled_100000.csv', codes=codes)
+codes.save()
 
 # In[6]
 print(df_2008s.shape)
@@ -87,6 +108,7 @@ month = list(calendar.month_name)
 month_abbr = list(calendar.month_abbr)
 print(month, month_abbr)
 print(calendar.month_abbr[1])
+print(month_names([1, 12]), day_names([1, 7]))
 exit()
 
 # In[8]:
@@ -94,7 +116,7 @@ exit()
 df_2008s_month_value_counts = df_2008s.Month.value_counts().reset_index()
 df_2008s_month_value_counts.columns = ["Month", "Total_Flights"]
 df_2008s_month_value_counts = df_2008s_month_value_counts.sort_values(by=['Month'])
-df_2008s_month_value_counts['Month'] = df_2008s_month_value_counts['Month'].apply(lambda x: calendar.month_abbr[x])
+df_2008s_month_value_counts['Month'] = month_names(df_2008s_month_value_counts['Month'])
 print(df_2008s_month_value_counts)
 df_flights_by_month = df_2008s_month_value_counts.reset_index()
 df_flights_by_month = df_flights_by_month.drop(columns=['index'])
@@ -116,7 +138,7 @@ plt.show();
 df_2008s_day_value_counts = df_2008s.DayOfWeek.value_counts().reset_index()
 df_2008s_day_value_counts.columns = ["DayOfWeek", "Total_Flights"]
 df_2008s_day_value_counts = df_2008s_day_value_counts.sort_values(by=['DayOfWeek'])
-df_2008s_day_value_counts['DayOfWeek'] = df_2008s_day_value_counts['DayOfWeek'].apply(lambda x: calendar.day_abbr[x-1])
+df_2008s_day_value_counts['DayOfWeek'] = day_names(df_2008s_day_value_counts['DayOfWeek'])
 print(df_2008s_day_value_counts)
 
 
@@ -132,12 +154,10 @@ plt.show();
 # In[12]:
 ######### Day of the Year
 # Calculating how many flights there are per day of year.
-df_dvc2 = df_2008s
-df_dvc2['Date']=df_dvc2['Year'].astype(str)+'/'+df_dvc2['Month'].astype(str)+'/'+df_dvc2['DayofMonth'].astype(str)
-df_dvc2 = df_dvc2.Date.value_counts().reset_index()
+# The date is computed from the Year, Month and DayofMonth numbers, and the
+# flights are counted per day of year with a histogram (one row per day, in order).
+df_dvc2 = daily_counts(df_2008s).reset_index()
 df_dvc2.columns = ["Day", "Total_Flights"]
-df_dvc2['Date'] = pd.to_datetime(df_dvc2['Day'], format='%Y/%m/%d')
-df_dvc2 = df_dvc2.sort_values(by=['Day'])
 print(df_dvc2)
 
 
@@ -189,7 +209,18 @@ df_2008s['CancellationCode'].value_counts()
 
 
 # In[21]:
-df_2008s['CancellationCode'].replace({'A': 'carrier', 'B': 'weather', 'C': 'NAS', 'D': 'security'}, inplace = True)
+df_2008s['CancellationCode'] = df_2008s['CancellationCode'].cat.rename_categories({'A': 'carrier', 'B': 'weather', 'C': 'NAS', 'D': 'security'})
+# Quartile bins of each delay type's length, read off mergeable quantile
+# sketches instead of copied by hand from describe()
+bins = delay_bins(df_2008s, seed=2008)
+# Every summary used below (see flights.registry.default_registry), computed
+# together in as few passes over the data as possible, and cached on disk
+# keyed on the data of each month and the summaries asked for: a rerun on
+# unchanged data loads them, and only months whose data changed are redone
+results = cached_results('2008_sampled_100000.csv', default_registry(bins=bins))
+# Flights, cancellations and delay sums per Month x DayOfWeek x carrier x
+# origin x cancellation code; roll-ups below are read from it
+cube = build_cube(df_2008s)
 
 
 # In[22]:
@@ -201,121 +232,91 @@ plt.xlabel("Type of Cancellation")
 plt.show();
 
 
-# In[23]:
-# Carrier Delays
-df_cd_1 = df_2008s.query('CarrierDelay != "NaN"')
-df_cd_1 = df_cd_1.query('CarrierDelay != "0.0"')
-df_cd_1
-
-
 # In[24]:
-df_cd_1.describe().CarrierDelay
+# Count, mean, spread and quartiles of each delay type, leaving out flights
+# with no delay (NaN) or a delay of 0 minutes
+# Carrier Delays
+results['CarrierDelay_describe']
 
 
 # In[25]:
-bin_edges = [1, 9, 19, 41, 2436]
-bin_names = ['1-8', '9-18', '19-39', '40-1951']
-df_cd_1['CDGroup'] = pd.cut(df_cd_1['CarrierDelay'], bin_edges, labels=bin_names)
-df_cd_1
+# Flights in each length bin, for all five delay types in one pass, overall
+# and by month (NaN and 0 delays left out)
+delay_lengths = bin_counts(df_2008s, bins)
+delay_lengths_month = bin_counts(df_2008s, bins, keys='Month')
+delay_lengths_month['CarrierDelay']
 
 
 # In[26]:
-df_cd_1['CDGroup'].value_counts()
+delay_lengths['CarrierDelay'].sort_values(ascending=False)
 
 
 # In[27]:
-df_cd_1['CDGroup'].value_counts(sort = False).plot(kind= 'bar', color = 'teal', figsize=(8,8))
+delay_lengths['CarrierDelay'].plot(kind= 'bar', color = 'teal', figsize=(8,8))
 plt.title("Length of Carrier Delay")
 plt.ylabel("Count")
 plt.xlabel("Length of Delay (min)")
 plt.show();
 
 
-# In[28]:
-# Weather Delays
-df_wd_1 = df_2008s.query('WeatherDelay != "NaN"')
-df_wd_1 = df_wd_1.query('WeatherDelay != "0.0"')
-df_wd_1
-
-
 # In[29]:
-df_wd_1.describe().WeatherDelay
+# Weather Delays
+results['WeatherDelay_describe']
 
 
 # In[30]:
-bin_edges = [1, 11, 25, 57, 1352]
-bin_names = ['1-10', '11-24', '25-56', '57-1352']
-df_wd_1['WDGroup'] = pd.cut(df_wd_1['WeatherDelay'], bin_edges, labels=bin_names)
-df_wd_1
+delay_lengths_month['WeatherDelay']
 
 
 # In[31]:
-df_wd_1['WDGroup'].value_counts()
+delay_lengths['WeatherDelay'].sort_values(ascending=False)
 
 
 # In[32]:
-df_wd_1['WDGroup'].value_counts(sort = False).plot(kind= 'bar', color = 'teal', figsize=(8,8))
+delay_lengths['WeatherDelay'].plot(kind= 'bar', color = 'teal', figsize=(8,8))
 plt.title("Length of Weather Delay")
 plt.ylabel("Count")
 plt.xlabel("Length of Delay (min)")
 plt.show();
 
 
-# In[33]:
-# NAS Delays
-df_nd_1 = df_2008s.query('NASDelay != "NaN"')
-df_nd_1 = df_nd_1.query('NASDelay != "0.0"')
-df_nd_1
-
-
 # In[34]:
-df_nd_1.describe().NASDelay
+# NAS Delays
+results['NASDelay_describe']
 
 
 # In[35]:
-bin_edges = [1, 8, 18, 31, 1357]
-bin_names = ['1-7', '8-17', '18-30', '31-1357']
-df_nd_1['NDGroup'] = pd.cut(df_nd_1['NASDelay'], bin_edges, labels=bin_names)
-df_nd_1
+delay_lengths_month['NASDelay']
 
 
 # In[36]:
-df_nd_1['NDGroup'].value_counts()
+delay_lengths['NASDelay'].sort_values(ascending=False)
 
 
 # In[37]:
-df_nd_1['NDGroup'].value_counts(sort = False).plot(kind= 'bar', color = 'teal', figsize=(8,8))
+delay_lengths['NASDelay'].plot(kind= 'bar', color = 'teal', figsize=(8,8))
 plt.title("Length of NAS Delay")
 plt.ylabel("Count")
 plt.xlabel("Length of Delay (min)")
 plt.show();
 
 
-# In[38]:
-# Security Delays
-df_sd_1 = df_2008s.query('SecurityDelay != "NaN"')
-df_sd_1 = df_sd_1.query('SecurityDelay != "0.0"')
-df_sd_1
-
-
 # In[39]:
-df_sd_1.describe().SecurityDelay
+# Security Delays
+results['SecurityDelay_describe']
 
 
 # In[40]:
-bin_edges = [1, 7, 13, 22, 392]
-bin_names = ['1-6', '7-12', '13-21', '22-392']
-df_sd_1['SDGroup'] = pd.cut(df_sd_1['SecurityDelay'], bin_edges, labels=bin_names)
-df_sd_1
+delay_lengths_month['SecurityDelay']
 
 
 # In[41]:
-df_sd_1['SDGroup'].value_counts()
+delay_lengths['SecurityDelay'].sort_values(ascending=False)
 
 
 # In[42]:
 # Plot
-df_sd_1['SDGroup'].value_counts(sort = False).plot(kind= 'bar', color = 'teal', figsize=(8,8))
+delay_lengths['SecurityDelay'].plot(kind= 'bar', color = 'teal', figsize=(8,8))
 plt.title("Length of Security Delay")
 plt.ylabel("Count")
 plt.xlabel("Length of Delay (min)")
@@ -329,33 +330,24 @@ plt.show();
 # #### Length of Late Aircraft Delays
 
 
-# In[44]:
-# Query 'LateAircraftDelay' to only select entries that are neither NaN or 0.
-df_ld_1 = df_2008s.query('LateAircraftDelay != "NaN"')
-df_ld_1 = df_ld_1.query('LateAircraftDelay != "0.0"')
-df_ld_1
-
-
 # In[45]:
-df_ld_1.describe().LateAircraftDelay
+# Late aircraft delays that are neither NaN nor 0
+results['LateAircraftDelay_describe']
 
 
 # In[46]:
-# Create bins of late aircraft delay lengths using information from the cell above.
-bin_edges = [1, 11, 25, 57, 1352]
-bin_names = ['1-10', '11-24', '25-56', '57-1352']
-df_ld_1['LDGroup'] = pd.cut(df_ld_1['LateAircraftDelay'], bin_edges, labels=bin_names)
-df_ld_1
+# Late aircraft delays by length bin (split at the quartiles) and month
+delay_lengths_month['LateAircraftDelay']
 
 
 # In[47]:
 # value counts for each bin
-df_ld_1['LDGroup'].value_counts()
+delay_lengths['LateAircraftDelay'].sort_values(ascending=False)
 
 
 # In[48]:
 # Plot
-df_ld_1['LDGroup'].value_counts(sort = False).plot(kind= 'bar', color = 'teal', figsize=(8,8))
+delay_lengths['LateAircraftDelay'].plot(kind= 'bar', color = 'teal', figsize=(8,8))
 plt.title("Length of Late Aircraft Delay")
 plt.ylabel("Count")
 plt.xlabel("Length of Delay (min)")
@@ -364,10 +356,15 @@ plt.show();
 # >Late aircraft delays are most commonly 25-56 minutes long.
 # #### Total Destinations
 # In[49]:
-# create value counts data set for 'Dest' column
-df_dest = df_2008s['Dest'].value_counts()
+# create value counts data set for 'Dest' column (a bincount over the airport codes)
+df_dest = code_counts(df_2008s['Dest'])
 df_dest = df_dest.reset_index()
 
+# per-route (Origin -> Dest) flights, cancellation rate and delay stats, and the
+# 50 worst routes by late-aircraft delay in February
+df_routes = route_stats(df_2008s)
+df_worst_routes = top_routes(df_2008s, 'LateAircraftDelay', k=50, where={'Month': [2]}, min_flights=10)
+
 
 # In[50]:
 #df_dest.to_csv('dest.csv', index=False)
@@ -390,13 +387,15 @@ df_2008s.Cancelled.mean()
 
 
 # In[53]:
+# Average cancellations and average length of each delay type by month
+df_month = results['month']
 # Convert to new data set
-df_cancelled_month = df_cancelled_month.reset_index()
+df_cancelled_month = df_month['Cancelled'].reset_index()
 
 
 # In[54]:
 # convert numbered months to letter months
-df_cancelled_month['Month'] = df_cancelled_month['Month'].apply(lambda x: calendar.month_abbr[x])
+df_cancelled_month['Month'] = month_names(df_cancelled_month['Month'])
 
 
 # In[55]:
@@ -422,7 +421,7 @@ df_2008s.CarrierDelay.mean()
 
 # In[58]:
 # Average carrier delay by month in minutes
-df_cd_month = df_2008s.groupby(['Month'])['CarrierDelay'].mean()
+df_cd_month = df_month['CarrierDelay']
 
 
 # In[59]:
@@ -432,7 +431,7 @@ df_cd_month = df_cd_month.reset_index()
 
 # In[60]:
 # Convert numbered months to lettered months
-df_cd_month['Month'] = df_cd_month['Month'].apply(lambda x: calendar.month_abbr[x])
+df_cd_month['Month'] = month_names(df_cd_month['Month'])
 
 
 # In[61]:
@@ -458,7 +457,7 @@ df_2008s.WeatherDelay.mean()
 
 # In[64]:
 # average weather delay by month in minutes
-df_wd_month = df_2008s.groupby(['Month'])['WeatherDelay'].mean()
+df_wd_month = df_month['WeatherDelay']
 
 
 # In[65]:
@@ -467,8 +466,8 @@ df_wd_month = df_wd_month.reset_index()
 
 
 # In[66]:
-# convert numbered months to lettered months
-df_wd_month['Month'] = df_wd_month['Month'].apply(lambda x: calendar.month_abbr[x])
+# convert numbered months to lettered months (a lookup, not a Python call per row)
+df_wd_month['Month'] = month_names(df_wd_month['Month'])
 
 
 # In[67]:
@@ -494,7 +493,7 @@ df_2008s.NASDelay.mean()
 
 # In[70]:
 # average monthly NAS delays in minutes
-df_nd_month = df_2008s.groupby(['Month'])['NASDelay'].mean()
+df_nd_month = df_month['NASDelay']
 
 
 # In[71]:
@@ -504,7 +503,7 @@ df_nd_month = df_nd_month.reset_index()
 
 # In[72]:
 # convert numbered months to lettered months
-df_nd_month['Month'] = df_nd_month['Month'].apply(lambda x: calendar.month_abbr[x])
+df_nd_month['Month'] = month_names(df_nd_month['Month'])
 
 
 # In[73]:
@@ -530,14 +529,14 @@ df_2008s.SecurityDelay.mean()
 
 # In[76]:
 # average monthly security delay in minutes
-df_sd_month = df_2008s.groupby(['Month'])['SecurityDelay'].mean()
+df_sd_month = df_month['SecurityDelay']
 
 
 # In[77]:
 # convert to new data set. 
 # convert numbered months to lettered months.
 df_sd_month = df_sd_month.reset_index()
-df_sd_month['Month'] = df_sd_month['Month'].apply(lambda x: calendar.month_abbr[x])
+df_sd_month['Month'] = month_names(df_sd_month['Month'])
 
 
 # In[78]:
@@ -563,14 +562,14 @@ df_2008s.LateAircraftDelay.mean()
 
 # In[81]:
 # average monthly late aircraft delays in minutes
-df_ad_month = df_2008s.groupby(['Month'])['LateAircraftDelay'].mean()
+df_ad_month = df_month['LateAircraftDelay']
 
 
 # In[82]:
 # convert to new data set
 # convert numbered months to lettered months
 df_ad_month = df_ad_month.reset_index()
-df_ad_month['Month'] = df_ad_month['Month'].apply(lambda x: calendar.month_abbr[x])
+df_ad_month['Month'] = month_names(df_ad_month['Month'])
 
 
 # In[83]:
@@ -589,20 +588,30 @@ plt.show();
 # sort average monthly late aircraft delays.
 df_ad_month.sort_values(['LateAircraftDelay'], ascending = False)
 
+# late aircraft delays come from the previous leg of the same aircraft: link each
+# TailNum's legs of the day and follow the delay along them (on the full year,
+# since the sample only holds scattered legs of each aircraft)
+df_rotations = rotations(df_2008)
+df_chains = delay_chains(df_2008, df_rotations)
+
+# hour-of-day curves: mean departure delay of each origin airport by scheduled hour
+df_hourly = hourly_delays(df_2008s, 'DepDelay', by='Origin')
+
 
 # #### Cancellations cf. Day of Week
 
 
 # In[85]:
-# average cancellations by day of week in minutes
-df_cancelled_weekday = df_2008s.groupby(['DayOfWeek'])['Cancelled'].mean()
+# average cancellations and delays by day of week
+df_weekday = results['weekday']
+df_cancelled_weekday = df_weekday['Cancelled']
 
 
 # In[86]:
 # convert to data set.
 # convert numbered days of week to lettered days of week
 df_cancelled_weekday = df_cancelled_weekday.reset_index()
-df_cancelled_weekday['DayOfWeek'] = df_cancelled_weekday['DayOfWeek'].apply(lambda x: calendar.day_abbr[x-1])
+df_cancelled_weekday['DayOfWeek'] = day_names(df_cancelled_weekday['DayOfWeek'])
 
 
 # In[87]:
@@ -627,14 +636,14 @@ df_cancelled_weekday.sort_values(['Cancelled'], ascending = False)
 
 # In[89]:
 # Average Carrier Delay by Day of Week
-df_cd_weekday = df_2008s.groupby(['DayOfWeek'])['CarrierDelay'].mean()
+df_cd_weekday = df_weekday['CarrierDelay']
 
 
 # In[90]:
 # convert to new data set
 # convert numbered days of week to lettered days of week
 df_cd_weekday = df_cd_weekday.reset_index()
-df_cd_weekday['DayOfWeek'] = df_cd_weekday['DayOfWeek'].apply(lambda x: calendar.day_abbr[x-1])
+df_cd_weekday['DayOfWeek'] = day_names(df_cd_weekday['DayOfWeek'])
 
 
 # In[91]:
@@ -656,14 +665,14 @@ df_cd_weekday.sort_values(['CarrierDelay'], ascending = False)
 
 # In[92]:
 #  Average weather delay by day of week
-df_wd_weekday = df_2008s.groupby(['DayOfWeek'])['WeatherDelay'].mean()
+df_wd_weekday = df_weekday['WeatherDelay']
 
 
 # In[93]:
 # convert to data set
 # convert numbered days of week to lettered days of week
 df_wd_weekday = df_wd_weekday.reset_index()
-df_wd_weekday['DayOfWeek'] = df_wd_weekday['DayOfWeek'].apply(lambda x: calendar.day_abbr[x-1])
+df_wd_weekday['DayOfWeek'] = day_names(df_wd_weekday['DayOfWeek'])
 
 
 # In[94]:
@@ -685,14 +694,14 @@ df_wd_weekday.sort_values(['WeatherDelay'], ascending = False)
 
 # In[96]:
 # Average NAS delays by day of week
-df_nd_weekday = df_2008s.groupby(['DayOfWeek'])['NASDelay'].mean()
+df_nd_weekday = df_weekday['NASDelay']
 
 
 # In[97]:
 # convert to data set
 # convert numbered days of week to lettered days of week
 df_nd_weekday = df_nd_weekday.reset_index()
-df_nd_weekday['DayOfWeek'] = df_nd_weekday['DayOfWeek'].apply(lambda x: calendar.day_abbr[x-1])
+df_nd_weekday['DayOfWeek'] = day_names(df_nd_weekday['DayOfWeek'])
 
 
 # In[98]:
@@ -713,14 +722,14 @@ df_nd_weekday.sort_values(['NASDelay'], ascending = False)
 
 # In[100]:
 # average security delays by day of week
-df_sd_weekday = df_2008s.groupby(['DayOfWeek'])['SecurityDelay'].mean()
+df_sd_weekday = df_weekday['SecurityDelay']
 
 
 # In[101]:
 # convert to data set
 # convert numbered days of week to lettered days of week
 df_sd_weekday = df_sd_weekday.reset_index()
-df_sd_weekday['DayOfWeek'] = df_sd_weekday['DayOfWeek'].apply(lambda x: calendar.day_abbr[x-1])
+df_sd_weekday['DayOfWeek'] = day_names(df_sd_weekday['DayOfWeek'])
 
 
 # In[102]:
@@ -740,14 +749,14 @@ df_sd_weekday.sort_values(['SecurityDelay'], ascending = False)
 
 # In[104]:
 # average late aircraft carrier delays by day of week
-df_ld_weekday = df_2008s.groupby(['DayOfWeek'])['LateAircraftDelay'].mean()
+df_ld_weekday = df_weekday['LateAircraftDelay']
 
 
 # In[105]:
 # convert to data set
 # convert numbered days of week to lettered days of week
 df_ld_weekday = df_ld_weekday.reset_index()
-df_ld_weekday['DayOfWeek'] = df_ld_weekday['DayOfWeek'].apply(lambda x: calendar.day_abbr[x-1])
+df_ld_weekday['DayOfWeek'] = day_names(df_ld_weekday['DayOfWeek'])
 
 
 # In[106]:
@@ -773,14 +782,14 @@ df_ld_weekday.sort_values(['LateAircraftDelay'], ascending = False)
 
 # In[108]:
 # average cancellations by month and cancellations code
-df_cancelled_mv1 = df_2008s.groupby(['Month', 'CancellationCode'])['Cancelled'].count()
+df_cancelled_mv1 = cube.cancellations('Month')
 
 
 # In[109]:
 # convert to data set
 # convert numbered months to lettered months
 df_cancelled_mv1 = df_cancelled_mv1.reset_index()
-df_cancelled_mv1['Month'] = df_cancelled_mv1['Month'].apply(lambda x: calendar.month_abbr[x])
+df_cancelled_mv1['Month'] = month_names(df_cancelled_mv1['Month'])
 
 
 # In[110]:
@@ -796,118 +805,16 @@ ax.set_title('Types of Flight Cancellations by Month');
 
 
 # In[111]:
-# Drop NaN's from 'CarrierDelay'
-# Exclude 0 entries from 'CarrierDelay'
-# Group 'CarrierDelay' by month and find the average
-df_delay_carrier_0 = df_2008s.dropna(subset=['CarrierDelay'])
-df_delay_carrier_0 = df_delay_carrier_0[df_delay_carrier_0['CarrierDelay']!=0]
-df_delay_carrier_1 = df_delay_carrier_0.groupby(['Month'])['CarrierDelay'].mean()
-
-
-# In[112]:
-# convert to data set
-df_delay_carrier_1 = df_delay_carrier_1.reset_index()
-df_delay_carrier_1
-
-
-# In[113]:
-# Drop NaN's from 'WeatherDelay'
-# Exclude 0 entries from 'WeatherDelay'
-# Group 'WeatherDelay' by month and find the average
-df_delay_weather_0 = df_2008s.dropna(subset=['WeatherDelay'])
-df_delay_weather_0 = df_delay_weather_0[df_delay_weather_0['WeatherDelay']!=0]
-df_delay_weather_1 = df_delay_weather_0.groupby(['Month'])['WeatherDelay'].mean()
-
-
-# In[114]:
-# convert to data set
-df_delay_weather_1 = df_delay_weather_1.reset_index()
-df_delay_weather_1
-
-
-# In[115]:
-# Drop NaN's from 'NASDelay'
-# Exclude 0 entries from 'NASDelay'
-# Group 'NASDelay' by month and find the average
-df_delay_NAS_0 = df_2008s.dropna(subset=['NASDelay'])
-df_delay_NAS_0 = df_delay_NAS_0[df_delay_NAS_0['NASDelay']!=0]
-df_delay_NAS_1 = df_delay_NAS_0.groupby(['Month'])['NASDelay'].mean()
-
-
-# In[116]:
-# convert to data set
-df_delay_weather_1 = df_delay_weather_1.reset_index()
-df_delay_weather_1
-
-
-# In[117]:
-# Drop NaN's from 'NASDelay'
-# Exclude 0 entries from 'NASDelay'
-# Group 'NASDelay' by month and find the average
-df_delay_NAS_0 = df_2008s.dropna(subset=['NASDelay'])
-df_delay_NAS_0 = df_delay_NAS_0[df_delay_NAS_0['NASDelay']!=0]
-df_delay_NAS_1 = df_delay_NAS_0.groupby(['Month'])['NASDelay'].mean()
-
-
-# In[118]:
-# convert to data set
-df_delay_NAS_1 = df_delay_NAS_1.reset_index()
-df_delay_NAS_1
-
-
-# In[119]:
-# Drop NaN's from 'SecurityDelay'
-# Exclude 0 entries from 'SecurityDelay'
-# Group 'SecurityDelay' by month and find the average
-df_delay_security_0 = df_2008s.dropna(subset=['SecurityDelay'])
-df_delay_security_0 = df_delay_security_0[df_delay_security_0['SecurityDelay']!=0]
-df_delay_security_1 = df_delay_security_0.groupby(['Month'])['SecurityDelay'].mean()
-
-
-# In[120]:
-# convert to data set
-df_delay_security_1 = df_delay_security_1.reset_index()
-df_delay_security_1
-
-
-# In[121]:
-# Drop NaN's from 'LateAircraftDelay'
-# Exclude 0 entries from 'LateAircraftDelay'
-# Group 'LateAircraftDelay' by month and find the average
-df_delay_aircraft_0 = df_2008s.dropna(subset=['LateAircraftDelay'])
-df_delay_aircraft_0 = df_delay_aircraft_0[df_delay_aircraft_0['LateAircraftDelay']!=0]
-df_delay_aircraft_1 = df_delay_aircraft_0.groupby(['Month'])['LateAircraftDelay'].mean()
-
-
-# In[122]:
-# convert to data set
-df_delay_aircraft_1 = df_delay_aircraft_1.reset_index()
-df_delay_aircraft_1
-
-
-# In[123]:
-# merge 
-df_delay = pd.merge(df_delay_carrier_1, df_delay_weather_1, on='Month', how='outer')
-
-
-# In[124]:
-# merge
-df_delay = pd.merge(df_delay, df_delay_NAS_1, on='Month', how='outer')
-
-
-# In[125]:
-# merge
-df_delay = pd.merge(df_delay, df_delay_security_1, on='Month', how='outer')
-
-
-# In[126]:
-# merge
-df_delay = pd.merge(df_delay, df_delay_aircraft_1, on='Month', how='outer')
+# Average length of each delay type by month, leaving out NaN and 0 entries.
+# All five delay types come out as one table indexed by month, so there is
+# nothing to merge.
+df_delay = results['delay_month'].reset_index()
+df_delay
 
 
 # In[127]:
 # convert numbered months to lettered months
-df_delay['Month'] = df_delay['Month'].apply(lambda x: calendar.month_abbr[x])
+df_delay['Month'] = month_names(df_delay['Month'])
 df_delay
 
 
@@ -957,14 +864,14 @@ ax.set_ylabel('Percent of Flights Delayed');
 
 # In[131]:
 # count cancellations by day of week and cancellation code
-df_cancelled_mv = df_2008s.groupby(['DayOfWeek', 'CancellationCode'])['Cancelled'].count()
+df_cancelled_mv = cube.cancellations('DayOfWeek')
 
 
 # In[132]:
 # convert to data set
 # convert numbered day of week to lettered day of week
 df_cancelled_mv = df_cancelled_mv.reset_index()
-df_cancelled_mv['DayOfWeek'] = df_cancelled_mv['DayOfWeek'].apply(lambda x: calendar.day_abbr[x-1])
+df_cancelled_mv['DayOfWeek'] = day_names(df_cancelled_mv['DayOfWeek'])
 
 
 # In[133]:
@@ -982,104 +889,14 @@ ax.set_xlabel('Day of Week');
 
 
 # In[134]:
-# Drop NaN's from 'CarrierDelay'
-# Exclude 0 entries from 'CarrierDelay'
-# Group 'CarrierDelay' by day of week and find the average
-df_delay_car_0 = df_2008s.dropna(subset=['CarrierDelay'])
-df_delay_car_0 = df_delay_car_0[df_delay_car_0['CarrierDelay']!=0]
-df_delay_car_1 = df_delay_car_0.groupby(['DayOfWeek'])['CarrierDelay'].mean()
-
-
-# In[135]:
-# convert to data set
-df_delay_car_1 = df_delay_car_1.reset_index()
-df_delay_car_1
-
-
-# In[136]:
-# Drop NaN's from 'WeatherDelay'
-# Exclude 0 entries from 'WeatherDelay'
-# Group 'WeatherDelay' by day of week and find the average
-df_delay_wea_0 = df_2008s.dropna(subset=['WeatherDelay'])
-df_delay_wea_0 = df_delay_wea_0[df_delay_wea_0['WeatherDelay']!=0]
-df_delay_wea_1 = df_delay_wea_0.groupby(['DayOfWeek'])['WeatherDelay'].mean()
-
-
-# In[137]:
-# convert to data set
-df_delay_wea_1 = df_delay_wea_1.reset_index()
-df_delay_wea_1
-
-
-# In[138]
-# Drop NaN's from 'NASDelay'
-# Exclude 0 entries from 'NASDelay'
-# Group 'NASDelay' by day of week and find the average
-df_delay_NAS1_0 = df_2008s.dropna(subset=['NASDelay'])
-df_delay_NAS1_0 = df_delay_NAS1_0[df_delay_NAS1_0['NASDelay']!=0]
-df_delay_NAS1_1 = df_delay_NAS1_0.groupby(['DayOfWeek'])['NASDelay'].mean()
-
-
-# In[139]
-# convert to data set
-df_delay_NAS1_1 = df_delay_NAS1_1.reset_index()
-df_delay_NAS1_1
-
-
-# In[140]:
-# Drop NaN's from 'SecurityDelay'
-# Exclude 0 entries from 'SecurityDelay'
-# Group 'SecurityDelay' by day of week and find the average
-df_delay_sec_0 = df_2008s.dropna(subset=['SecurityDelay'])
-df_delay_sec_0 = df_delay_sec_0[df_delay_sec_0['SecurityDelay']!=0]
-df_delay_sec_1 = df_delay_sec_0.groupby(['DayOfWeek'])['SecurityDelay'].mean()
-
-
-# In[141]:
-# convert to data set
-df_delay_sec_1 = df_delay_sec_1.reset_index()
-df_delay_sec_1
-
-
-# In[142]:
-# Drop NaN's from 'LateAircraftDelay'
-# Exclude 0 entries from 'LateAircraftDelay'
-# Group 'LateAircraftDelay' by day of week and find the average
-df_delay_air_0 = df_2008s.dropna(subset=['LateAircraftDelay'])
-df_delay_air_0 = df_delay_air_0[df_delay_air_0['LateAircraftDelay']!=0]
-df_delay_air_1 = df_delay_air_0.groupby(['DayOfWeek'])['LateAircraftDelay'].mean()
-
-
-# In[143]:
-# convert to data set
-df_delay_air_1 = df_delay_air_1.reset_index()
-df_delay_air_1
-
-
-# In[144]:
-# merge
-df_delay1 = pd.merge(df_delay_car_1, df_delay_wea_1, on='DayOfWeek', how='outer')
+# Average length of each delay type by day of week, leaving out NaN and 0 entries
+df_delay1 = results['delay_weekday'].reset_index()
 df_delay1
 
 
-# In[145]:
-# merge
-df_delay1 = pd.merge(df_delay1, df_delay_NAS1_1, on='DayOfWeek', how='outer')
-
-
-# In[146]:
-# merge
-df_delay1 = pd.merge(df_delay1, df_delay_sec_1, on='DayOfWeek', how='outer')
-
-
-# In[147]:
-# merge
-df_delay1 = pd.merge(df_delay1, df_delay_air_1, on='DayOfWeek', how='outer')
-
-
 # In[148]:
 # convert numbered days of week to lettered days of week
-df_delay1['DayOfWeek'] = df_delay1['DayOfWeek'].apply(lambda x: calendar.day_abbr[x-1])
+df_delay1['DayOfWeek'] = day_names(df_delay1['DayOfWeek'])
 
 
 # In[149]:
@@ -1126,3 +943,16 @@ ax.set_xlabel('Day of Week');
 
 # ### Were there any interesting or surprising interactions between features?
 # > Security delays and cancellations are very infrequent compared with the other types of delays and cancellations.
+
+
+# In[152]:
+# render the same charts headless, to files in report/, spread over worker
+# processes; charts whose tables did not change since the last run are skipped
+render_report(report_charts(results), 'report')
+
+
+# In[153]:
+# Where the time went: wall and CPU seconds, rows in and out and peak RSS per
+# stage. trace.json opens in chrome://tracing or https://ui.perfetto.dev
+tracer.stop().save('trace.json')
+tracer.summary()
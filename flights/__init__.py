@@ -0,0 +1,27 @@
+"""Helpers for loading and summarising the 2008 US flights data."""
+
+from .aggregate import STATS, GroupIndex, Reducer, aggregate, delay_summary, histogram
+from .bins import bin_counts, delay_bins, fixed_bins, log_bins, quantile_bins
+from .cache import build_cache, load_flights
+from .codes import DOMAINS, CodeTable, code_counts
+from .colstore import ColumnStore, build_columns, load_columns
+from .cube import CUBE_DIMENSIONS, MEASURES, Cube, build_cube
+from .dates import add_day_of_year, daily_counts, day_of_year, to_datetime64
+from .history import history_files, run_history, year_partials
+from .incremental import Store
+from .labels import DAY_ABBR, MONTH_ABBR, day_names, month_names, with_labels
+from .load import concat_frames, iter_flights, read_flights
+from .parallel import run_parallel
+from .partial import Partial, merge_all
+from .registry import DELAY_BINS, Metric, Registry, default_registry
+from .report import Chart, render_chart, render_report, report_charts
+from .results import ResultCache, cached_results
+from .rotations import ROTATION_KEYS, delay_chains, rotations
+from .routes import ROUTE_KEYS, ROUTE_STATS, RouteIndex, route_stats, top_routes
+from .sample import Sample, sample_flights
+from .schema import CODE_COLUMNS, COLUMNS, DELAY_COLUMNS, DERIVED_DTYPES, DTYPES
+from .sketch import QuantileSketch, quartile_bins, sketch_columns
+from .stream import WINDOWS, RollingStats, read_ndjson, replay
+from .synth import synthetic_flights, write_synthetic
+from .times import TIME_COLUMNS, add_time_columns, hour_of_day, hourly_delays, minutes
+from .trace import Tracer, stage, traced
@@ -0,0 +1,25 @@
+"""Command line entry points: python -m flights <command> ...
+
+    python -m flights stream replay 2008.csv | python -m flights stream run
+    python -m flights report 2008.csv report/
+"""
+
+import sys
+
+from . import report, stream
+
+COMMANDS = {'stream': stream.main, 'report': report.main}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in COMMANDS:
+        sys.stderr.write(__doc__.lstrip())
+        sys.stderr.write('\ncommands: %s\n' % ', '.join(COMMANDS))
+        return 2
+    COMMANDS[argv[0]](argv[1:])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,348 @@
+# Grouped statistics computed from integer-coded keys with np.bincount.
+#
+# A groupby over Month or DayOfWeek only ever has a handful of groups, so
+# instead of hashing the frame once per column (what
+# `df.groupby(['Month'])[col].mean()` does) the keys are turned into one
+# array of group numbers up front and every requested statistic is a
+# bincount over that array.
+
+import numpy as np
+import pandas as pd
+
+from .schema import DELAY_COLUMNS
+from .trace import traced
+
+STATS = ('size', 'count', 'sum', 'mean', 'var', 'std', 'min', 'max', 'median')
+
+# Largest number of key combinations kept as a dense range of group numbers;
+# above this only the combinations that occur are numbered.
+DENSE_LIMIT = 1 << 20
+
+
+@traced('aggregate')
+def aggregate(df, keys, stats, nonzero=False):
+    """Group `df` by `keys` and compute several statistics at once.
+
+    `keys` is a column name or a list of them ([] for one overall group).
+    `stats` is either a list of (column, stat) pairs, giving a result with
+    (column, stat) MultiIndex columns, or a dict {name: (column, stat)} in
+    the style of pandas named aggregation, giving flat columns called
+    `name`. `stat` is one of STATS or 'qNN' for the NN-th percentile
+    ('q25', 'q99.9'); quantiles interpolate linearly like
+    Series.quantile. Like groupby, rows with a missing key are dropped,
+    missing values are skipped, and only key combinations that occur are
+    returned, sorted by key (categoricals in category order).
+
+    With `nonzero=True` zeros are skipped like missing values, which is
+    how the delay columns are summarised (a 0 delay means the flight was
+    not delayed for that cause). Only `size` still counts every row. The
+    filter is applied per column as a mask; no filtered copy of `df` is
+    made.
+
+        aggregate(df, ['Month'], {c: (c, 'mean') for c in DELAY_COLUMNS})
+    """
+    if isinstance(stats, dict):
+        names, pairs = list(stats), list(stats.values())
+    else:
+        pairs = [tuple(p) for p in stats]
+        names = pd.MultiIndex.from_tuples(pairs)
+    for column, stat in pairs:
+        if stat not in STATS and _quantile_level(stat) is None:
+            raise ValueError('unknown statistic %r for %r' % (stat, column))
+
+    reducer = Reducer(GroupIndex(df, keys), nonzero)
+    observed = np.flatnonzero(reducer.size())
+    data = [reducer.stat(df, column, stat)[observed] for column, stat in pairs]
+    out = pd.DataFrame(dict(enumerate(data)), index=reducer.groups.index(observed))
+    out.columns = names
+    return out
+
+
+@traced('histogram')
+def histogram(df, column, edges, keys=(), nonzero=False, labels=None):
+    """Count the values of `column` falling in each bin, per group.
+
+    Bins follow pd.cut: right-closed intervals (edges[i], edges[i+1]],
+    values outside all bins are not counted. Returns a frame with one row
+    per group (a single row when `keys` is empty) and one column per bin,
+    named by `labels` or by the intervals.
+    """
+    return Reducer(GroupIndex(df, keys), nonzero).histogram_table(df, column, edges, labels)
+
+
+def delay_summary(df, keys, stat='mean', columns=DELAY_COLUMNS, nonzero=True):
+    """One row per key, one column per delay type, holding `stat`.
+
+    The wide table comes straight out of a single aggregate call, already
+    aligned on the key, so there is no per-delay frame to merge. By
+    default NaN and 0 delays are left out, as in the multivariate cells
+    of code.py.
+
+        delay_summary(df, 'Month')
+        delay_summary(df, ['Origin', 'UniqueCarrier'], stat='median')
+    """
+    return aggregate(df, keys, {c: (c, stat) for c in columns}, nonzero=nonzero)
+
+
+class GroupIndex:
+    """Row-to-group numbering for a list of key columns.
+
+    `codes[i]` is the group number of row i, or -1 when one of its keys is
+    missing; group numbers run from 0 to `ngroups` - 1 in sorted key order.
+    """
+
+    def __init__(self, df, keys):
+        self.keys = [keys] if isinstance(keys, str) else list(keys)
+        levels, codes = zip(*(_encode(df[k]) for k in self.keys)) if self.keys else ((), ())
+        self.levels = list(levels)
+        self.shape = tuple(len(lv) for lv in levels)
+        full = np.zeros(len(df), dtype=np.int64)
+        missing = np.zeros(len(df), dtype=bool)
+        for c, n in zip(codes, self.shape):
+            full *= n
+            full += c
+            missing |= c < 0
+        full[missing] = -1
+        self._combos = None
+        if np.prod(self.shape, dtype=np.float64) > DENSE_LIMIT:
+            self._combos, full[~missing] = np.unique(full[~missing], return_inverse=True)
+            self.ngroups = len(self._combos)
+        else:
+            self.ngroups = int(np.prod(self.shape, dtype=np.int64))
+        self.codes = full
+
+    def index(self, groups):
+        """Key index (Index or MultiIndex) for an array of group numbers."""
+        groups = np.asarray(groups, dtype=np.int64)
+        if self._combos is not None:
+            groups = self._combos[groups]
+        if not self.keys:
+            return pd.RangeIndex(len(groups))
+        if len(self.keys) == 1:
+            return pd.Index(self.levels[0].take(groups), name=self.keys[0])
+        positions = np.unravel_index(groups, self.shape)
+        return pd.MultiIndex.from_arrays(
+            [lv.take(p) for lv, p in zip(self.levels, positions)], names=self.keys)
+
+
+class Reducer:
+    """Per-group reductions over one GroupIndex; shares work between stats.
+
+    Each column's values and missing/zero mask are extracted once and
+    reused by every statistic asked of it; histograms of integer columns
+    bin the integers as stored instead.
+
+    Rows with a missing key go to an extra trailing bin that is dropped from
+    every result, and missing values are zero-weighted, which is much cheaper
+    than boolean-indexing each column.
+    """
+
+    def __init__(self, groups, nonzero=False):
+        self.groups = groups
+        self.nonzero = nonzero
+        self.ngroups = groups.ngroups
+        self.valid = groups.codes >= 0
+        self.codes = np.where(self.valid, groups.codes, self.ngroups)
+        self._order = None
+        self._cache = {}
+
+    def size(self):
+        return self._bincount()
+
+    def stat(self, df, column, stat):
+        if stat == 'size':
+            return self.size()
+        key = (column, stat)
+        if key not in self._cache:
+            level = _quantile_level(stat)
+            if level is None:
+                result = getattr(self, '_' + stat)(*self._values(df, column))
+            else:
+                result = self._quantile(column, level, *self._values(df, column))
+            self._cache[key] = result
+        return self._cache[key]
+
+    def _values(self, df, column):
+        """(values, mask) for a column, computed once; missing values are 0."""
+        key = (column, None)
+        if key not in self._cache:
+            series = df[column]
+            mask = series.notna().to_numpy()
+            values = series.to_numpy(dtype=np.float64, na_value=0.0)
+            if self.nonzero:
+                mask = mask & (values != 0)
+            self._cache[key] = values, mask
+        return self._cache[key]
+
+    def _raw(self, df, column):
+        """(values, mask) like _values, but integer columns stay integers."""
+        key = (column, None)
+        series = df[column]
+        dtype = getattr(series.dtype, 'numpy_dtype', series.dtype)
+        if key in self._cache or not isinstance(dtype, np.dtype) or dtype.kind not in 'iu':
+            return self._values(df, column)
+        # Missing values of a nullable column are filled with 0 so that the
+        # values stay integers; the mask leaves them out.
+        array = series.array
+        values = array.to_numpy(dtype=dtype, na_value=0)
+        mask = ~np.asarray(array.isna())
+        if self.nonzero:
+            mask = mask & (values != 0)
+        return values, mask
+
+    def moments(self, df, column, which=('count', 'sum', 'm2', 'min', 'max')):
+        """Per-group count, sum, m2, min and/or max of a column.
+
+        m2 is the sum of squared deviations from the group mean (0 for
+        empty groups). Together these merge exactly across pieces of the
+        data; see flights.partial.
+        """
+        values, mask = self._values(df, column)
+        return {k: self._m2(values, mask) if k == 'm2' else self.stat(df, column, k)
+                for k in which}
+
+    def value_counts(self, df, column):
+        """(distinct values, (ngroups, nvalues) counts) of a column.
+
+        Every quantile of a group can be read off its counts, and counts
+        add across pieces of the data, so this is the mergeable form of the
+        quantile statistics. The flights columns are all small integers, so
+        there are at most a few thousand distinct values.
+        """
+        values, mask = self._values(df, column)
+        keep = mask & self.valid
+        distinct, inverse = np.unique(values[keep], return_inverse=True)
+        n = len(distinct)
+        counts = np.bincount(self.codes[keep] * n + inverse, minlength=self.ngroups * n)
+        return distinct, counts.reshape(self.ngroups, n)
+
+    def histogram(self, df, column, edges):
+        """(ngroups, len(edges) - 1) array of per-group bin counts."""
+        values, mask = self._raw(df, column)
+        edges = np.asarray(edges, dtype=np.float64)
+        nbins = len(edges) - 1
+        if values.dtype.kind in 'iu':
+            # For integers edges[i] < v <= edges[i+1] is the same test with
+            # the edges floored, so the values are binned as they are.
+            edges = np.clip(np.floor(edges), -2.0**62, 2.0**62).astype(np.int64)
+        # The delay columns are mostly missing: only the rows that count are
+        # binned. searchsorted(side='left') puts v in bin i when
+        # edges[i] < v <= edges[i+1].
+        keep = np.flatnonzero(mask & self.valid)
+        b = np.searchsorted(edges, values[keep], side='left') - 1
+        inside = (b >= 0) & (b < nbins)
+        cell = self.codes[keep[inside]] * nbins + b[inside]
+        counts = np.bincount(cell, minlength=self.ngroups * nbins)
+        return counts.reshape(self.ngroups, nbins)
+
+    def histogram_table(self, df, column, edges, labels=None):
+        """histogram() as a frame of observed groups by bins."""
+        if labels is None:
+            labels = pd.IntervalIndex.from_breaks(edges, closed='right')
+        counts = self.histogram(df, column, edges)
+        observed = np.flatnonzero(self.size())
+        return pd.DataFrame(counts[observed], index=self.groups.index(observed),
+                            columns=pd.Index(labels, name='bin'))
+
+    def _bincount(self, weights=None):
+        out = np.bincount(self.codes, weights, minlength=self.ngroups + 1)[:-1]
+        return out if weights is None else out.astype(np.float64, copy=False)
+
+    def _count(self, values, mask):
+        return self._bincount(mask).astype(np.int64)
+
+    def _sum(self, values, mask):
+        return self._bincount(values)
+
+    def _mean(self, values, mask):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self._sum(values, mask) / self._count(values, mask)
+
+    def _var(self, values, mask):
+        count = self._count(values, mask)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = self._m2(values, mask) / (count - 1)
+        var[count < 2] = np.nan
+        return var
+
+    def _m2(self, values, mask):
+        # Two passes (mean, then squared deviations) to avoid the
+        # cancellation error of sum(x**2) - sum(x)**2 / n.
+        mean = np.nan_to_num(self._mean(values, mask))
+        dev = (values - np.append(mean, 0.0)[self.codes]) * mask
+        return self._bincount(dev * dev)
+
+    def _std(self, values, mask):
+        return np.sqrt(self._var(values, mask))
+
+    def _min(self, values, mask):
+        return self._extreme(values, mask, np.fmin)
+
+    def _max(self, values, mask):
+        return self._extreme(values, mask, np.fmax)
+
+    def _quantile(self, column, level, values, mask):
+        # Sort the kept values by (group, value) once per column and read
+        # each group's quantile off its run.
+        key = (column, 'sorted')
+        if key not in self._cache:
+            rows = np.flatnonzero(mask & self.valid)
+            order = np.lexsort((values[rows], self.codes[rows]))
+            count = self._bincount(mask).astype(np.int64)
+            starts = np.concatenate(([0], np.cumsum(count)[:-1]))
+            self._cache[key] = values[rows[order]], count, starts
+        ordered, count, starts = self._cache[key]
+        out = np.full(self.ngroups, np.nan)
+        has = count > 0
+        pos = (count[has] - 1) * level
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.ceil(pos).astype(np.int64)
+        below, above = ordered[starts[has] + lo], ordered[starts[has] + hi]
+        out[has] = below + (above - below) * (pos - lo)
+        return out
+
+    def _extreme(self, values, mask, ufunc):
+        # Rows are sorted by group once; each column is then a reduceat
+        # over contiguous runs, with NaN (skipped by fmin/fmax) for rows
+        # that must not count.
+        if self._order is None:
+            order = np.argsort(self.codes, kind='stable')
+            order = order[self.valid[order]]
+            starts = np.searchsorted(self.codes[order], np.arange(self.ngroups))
+            self._order = order, starts
+        order, starts = self._order
+        out = np.full(self.ngroups, np.nan)
+        if len(order):
+            nonempty = starts < len(order)
+            picked = np.where(mask[order], values[order], np.nan)
+            out[nonempty] = ufunc.reduceat(picked, starts[nonempty])
+            out[self.size() == 0] = np.nan
+        return out
+
+
+def _quantile_level(stat):
+    """0.25 for 'q25', None if `stat` is not a quantile name."""
+    if stat == 'median':
+        return 0.5
+    if isinstance(stat, str) and stat.startswith('q'):
+        try:
+            level = float(stat[1:]) / 100
+        except ValueError:
+            return None
+        if 0 <= level <= 1:
+            return level
+    return None
+
+
+def _encode(series):
+    """Return (levels, codes) for one key column; codes are -1 where missing."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        levels = pd.CategoricalIndex(series.cat.categories, dtype=series.dtype)
+        return levels, series.cat.codes.to_numpy(dtype=np.int64)
+    values = series.to_numpy()
+    if values.dtype.kind in 'iu' and len(values):
+        lo, hi = int(values.min()), int(values.max())
+        if hi - lo < max(2 * len(values), 1 << 16):
+            return pd.Index(np.arange(lo, hi + 1, dtype=values.dtype)), values.astype(np.int64) - lo
+    codes, levels = pd.factorize(series, sort=True)
+    return pd.Index(levels), codes.astype(np.int64)
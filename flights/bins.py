@@ -0,0 +1,109 @@
+# Histogram binning of the delay columns without pd.cut.
+#
+# Bins are (edges, labels) pairs as in registry.DELAY_BINS: right-closed
+# intervals (edges[i], edges[i+1]] like pd.cut. They can be fixed-width
+# (fixed_bins), equal-width on a log scale for the long-tailed delays
+# (log_bins), or split at quantiles read off mergeable sketches
+# (quantile_bins; delay_bins for the quartiles). bin_counts counts several
+# columns at once, overall or per group (Month x bin, carrier x bin, ...):
+# the rows are grouped once, and each column's valid values are taken from
+# its raw array, put in bins with searchsorted and counted with one bincount
+# (aggregate.Reducer.histogram), so no categorical column and no filtered
+# copy of the frame is made.
+#
+#     counts = bin_counts(df, delay_bins(df))                   # {column: counts by bin}
+#     by_month = bin_counts(df, delay_bins(df), keys='Month')   # {column: month x bin}
+
+import numpy as np
+import pandas as pd
+
+from .aggregate import GroupIndex, Reducer
+from .schema import DELAY_COLUMNS
+from .sketch import DEFAULT_K, quartile_bins, sketch_columns
+from .trace import traced
+
+
+def fixed_bins(start, stop, width):
+    """Bins (start, start + width], ... of equal `width`, the last one ending at or past `stop`."""
+    if width <= 0 or stop <= start:
+        raise ValueError('need start < stop and a positive width')
+    edges = start + width * np.arange(int(np.ceil((stop - start) / width)) + 1)
+    return _with_labels(edges)
+
+
+def log_bins(low, high, n):
+    """`n` bins splitting (low, high] evenly on a log scale.
+
+    Edges of integer `low` and `high` are rounded to whole numbers (and
+    coinciding ones merged), which suits the delays in minutes.
+    """
+    if not 0 < low < high or n < 1:
+        raise ValueError('need 0 < low < high and n >= 1')
+    edges = np.geomspace(low, high, n + 1)
+    if float(low).is_integer() and float(high).is_integer():
+        edges = np.unique(np.rint(edges))
+    return _with_labels(edges)
+
+
+def quantile_bins(frames, columns=DELAY_COLUMNS, levels=(0.25, 0.5, 0.75), nonzero=True,
+                  k=DEFAULT_K, seed=None):
+    """{column: bins} split at `levels` quantiles, from one sketch per column.
+
+    `frames` is a frame or an iterable of chunks; see delay_bins for the
+    quartiles of the delays.
+    """
+    sketches = sketch_columns(frames, columns, nonzero=nonzero, k=k, seed=seed)
+    return {c: quartile_bins(s, levels) for c, s in sketches.items()}
+
+
+def delay_bins(frames, columns=DELAY_COLUMNS, k=DEFAULT_K, seed=None):
+    """Quartile (edges, labels) of each delay column, NaN and 0 left out.
+
+    The same mapping as registry.DELAY_BINS, derived from the data:
+
+        default_registry(bins=delay_bins(df))
+    """
+    return quantile_bins(frames, columns, k=k, seed=seed)
+
+
+@traced('bin_counts')
+def bin_counts(df, bins, keys=(), nonzero=True):
+    """Counts of each column's values per bin: {column: counts}.
+
+    `bins` maps each column to (edges, labels) or to edges alone (labelled
+    by interval). Missing values, values outside the bins and, with
+    `nonzero`, zeros are not counted. Without `keys` each column gives a
+    series indexed by bin, like value_counts(sort=False) of pd.cut; with
+    keys it gives a frame of one row per group that occurs and one column
+    per bin.
+    """
+    reducer = Reducer(GroupIndex(df, keys), nonzero)
+    out = {}
+    for column, spec in bins.items():
+        edges, labels = _spec(spec)
+        if reducer.groups.keys:
+            out[column] = reducer.histogram_table(df, column, edges, labels)
+        else:
+            counts = reducer.histogram(df, column, edges)[0]
+            out[column] = pd.Series(counts, index=pd.Index(labels, name='bin'), name=column)
+    return out
+
+
+def _spec(spec):
+    if isinstance(spec, tuple) and len(spec) == 2 and not np.isscalar(spec[0]):
+        edges, labels = spec
+    else:
+        edges, labels = spec, None
+    if labels is None:
+        labels = pd.IntervalIndex.from_breaks(edges, closed='right')
+    return edges, labels
+
+
+def _with_labels(edges):
+    # The same labels as sketch.quartile_bins: '1-9' for (0, 9] on integers.
+    if np.all(np.mod(edges, 1) == 0):
+        edges = edges.astype(np.int64)
+        labels = ['%d-%d' % (a + 1, b) for a, b in zip(edges[:-1], edges[1:])]
+    else:
+        labels = ['%g-%g' % (a, b) for a, b in zip(edges[:-1], edges[1:])]
+    return edges.tolist(), labels
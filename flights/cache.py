@@ -0,0 +1,211 @@
+# Columnar cache of a parsed flights CSV: one Parquet file per month.
+#
+# The first load of a CSV writes the typed frame to
+# <cache_dir>/<csv name>/month=MM.parquet together with a _source.json
+# recording the CSV's size and mtime. Later loads read only the requested
+# columns and months from Parquet and never touch the CSV parser. If the
+# CSV changes on disk the cache is rebuilt.
+#
+# Besides the CSV's own columns the cache stores the derived columns in
+# schema.DERIVED_DTYPES (e.g. DayOfYear, the hhmm times decoded to minutes);
+# ask for them by name.
+
+import json
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+from .dates import add_day_of_year
+from .load import CHUNKSIZE, iter_flights
+from .schema import CODE_COLUMNS, COLUMNS, DERIVED_DTYPES, DTYPES
+from .times import add_time_columns
+from .trace import traced
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+CACHE_DIR = '.flights_cache'
+SOURCE_FILE = '_source.json'
+# Bumped whenever the layout or the set of derived columns changes, so that
+# caches written by older code are rebuilt.
+CACHE_VERSION = 3
+# Rows per Parquet row group, fixed so that the month files do not depend on
+# the chunking of the CSV.
+ROW_GROUP_SIZE = 1 << 16
+
+_ALL_DTYPES = {**DTYPES, **DERIVED_DTYPES}
+_ALL_COLUMNS = COLUMNS + list(DERIVED_DTYPES)
+
+_ARROW_TYPES = {
+    'int8': 'int8', 'int16': 'int16', 'Int16': 'int16', 'category': 'string',
+}
+
+
+@traced('load_flights')
+def load_flights(csv_path, columns=None, months=None, cache_dir=None, codes=None):
+    """Load a flights CSV through the Parquet cache, building it if needed.
+
+    `columns` and `months` (1-12) restrict what is read from the cache; the
+    result has the same dtypes as flights.read_flights, and `codes` works
+    as there.
+    """
+    path = cache_path(csv_path, cache_dir)
+    if not is_fresh(csv_path, cache_dir):
+        build_cache(csv_path, cache_dir)
+    return read_cache(path, columns, months, codes)
+
+
+def cache_path(csv_path, cache_dir=None):
+    """Directory holding the cache for `csv_path`."""
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(csv_path)), CACHE_DIR)
+    return os.path.join(cache_dir, os.path.basename(csv_path))
+
+
+def source_fingerprint(csv_path):
+    st = os.stat(csv_path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def is_fresh(csv_path, cache_dir=None):
+    """True if the cache exists and was built from the CSV as it is now."""
+    source = os.path.join(cache_path(csv_path, cache_dir), SOURCE_FILE)
+    try:
+        with open(source) as f:
+            recorded = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (recorded.get('version') == CACHE_VERSION
+            and recorded.get('source') == source_fingerprint(csv_path))
+
+
+@traced('build_cache')
+def build_cache(csv_path, cache_dir=None, chunksize=CHUNKSIZE):
+    """Parse `csv_path` once and write it as one Parquet file per month.
+
+    Each month's rows are appended to its file in row groups of exactly
+    ROW_GROUP_SIZE rows (the last one shorter), so memory stays at one
+    chunk plus a partial row group per month regardless of the size of the
+    CSV. As the row groups do not follow the chunks, a month file's bytes
+    depend only on that month's rows: a change to one month leaves the
+    other files identical, which flights.results relies on. The cache is
+    written to a temporary directory and moved into place when complete.
+    """
+    _require_pyarrow()
+    path = cache_path(csv_path, cache_dir)
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+    fingerprint = source_fingerprint(csv_path)
+    schema = _arrow_schema()
+    tmp = tempfile.mkdtemp(prefix='.building-', dir=parent)
+    writers, pending = {}, {}
+    try:
+        for chunk in iter_flights(csv_path, chunksize=chunksize):
+            _derive(chunk)
+            for month, part in chunk.groupby('Month', sort=False):
+                if month not in writers:
+                    writers[month] = pq.ParquetWriter(
+                        os.path.join(tmp, _month_file(month)), schema)
+                    pending[month] = []
+                pending[month].append(_to_arrow(part, schema))
+                pending[month] = _write_row_groups(writers[month], pending[month])
+        for month, w in writers.items():
+            _write_row_groups(w, pending[month], final=True)
+            w.close()
+        writers = {}
+        with open(os.path.join(tmp, SOURCE_FILE), 'w') as f:
+            json.dump({'version': CACHE_VERSION,
+                       'path': os.path.abspath(csv_path), 'source': fingerprint,
+                       'months': sorted(int(m) for m in _months_in(tmp))}, f)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(tmp, path)
+    except BaseException:
+        for w in writers.values():
+            w.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return path
+
+
+@traced('read_cache')
+def read_cache(path, columns=None, months=None, codes=None):
+    """Read `columns` for `months` from a cache directory."""
+    _require_pyarrow()
+    available = _months_in(path)
+    if months is not None:
+        available = [m for m in available if m in set(months)]
+    columns = list(COLUMNS if columns is None else columns)
+    files = [os.path.join(path, _month_file(m)) for m in available]
+    if not files:
+        frame = pd.DataFrame({c: pd.Series(dtype=_ALL_DTYPES[c]) for c in columns})
+    else:
+        table = pa.concat_tables(
+            pq.read_table(f, columns=columns,
+                          read_dictionary=[c for c in columns if c in CODE_COLUMNS])
+            for f in files)
+        frame = _to_pandas(table.unify_dictionaries().combine_chunks())
+    return frame if codes is None else codes.encode_frame(frame)
+
+
+def _write_row_groups(writer, tables, final=False):
+    # Writes the whole row groups in `tables` (all of them if final) and
+    # returns what is left over.
+    rows = sum(len(t) for t in tables)
+    whole = rows if final else rows - rows % ROW_GROUP_SIZE
+    if not whole:
+        return tables
+    table = pa.concat_tables(tables)
+    writer.write_table(table.slice(0, whole), row_group_size=ROW_GROUP_SIZE)
+    return [table.slice(whole)] if whole < rows else []
+
+
+def _derive(chunk):
+    add_day_of_year(chunk)
+    add_time_columns(chunk)
+
+
+def _month_file(month):
+    return 'month=%02d.parquet' % month
+
+
+def _months_in(path):
+    return sorted(int(name[6:8]) for name in os.listdir(path)
+                  if name.startswith('month=') and name.endswith('.parquet'))
+
+
+def _arrow_schema():
+    return pa.schema([(c, getattr(pa, _ARROW_TYPES[_ALL_DTYPES[c]])()) for c in _ALL_COLUMNS])
+
+
+def _to_arrow(frame, schema):
+    arrays = []
+    for field in schema:
+        s = frame[field.name]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            s = s.astype(object)
+        arrays.append(pa.array(s, type=field.type, from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _to_pandas(table):
+    # Integer columns come back nullable and are narrowed to the schema
+    # dtype; dictionary columns come back as categoricals with categories
+    # in first-seen order, which are sorted as read_flights sorts them.
+    frame = table.to_pandas(types_mapper={pa.int8(): pd.Int8Dtype(),
+                                          pa.int16(): pd.Int16Dtype()}.get)
+    for c in frame.columns:
+        if isinstance(frame[c].dtype, pd.CategoricalDtype):
+            frame[c] = frame[c].cat.reorder_categories(frame[c].cat.categories.sort_values())
+    return frame.astype({c: _ALL_DTYPES[c] for c in frame.columns
+                         if _ALL_DTYPES[c] != 'category'})
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError('the flights Parquet cache needs pyarrow: pip install pyarrow')
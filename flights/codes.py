@@ -0,0 +1,118 @@
+# Persistent integer numbering of the string code columns.
+#
+# The loader already keeps carrier, airport, tail and cancellation codes as
+# categoricals, but each file (and each chunk) numbers its categories by
+# itself: ATL can be code 3 in 2007.csv and code 5 in 2008.csv, and Origin
+# and Dest are numbered separately. A CodeTable numbers every value once and
+# for good, in one table per domain, with Origin and Dest sharing the
+# airport table. Frames loaded through the same table have identical
+# categories, so they concatenate without recoding; origin and destination
+# codes can be compared and combined as plain ints; and counts are a
+# bincount over the codes. Codes are append-only, so codes handed out
+# earlier stay valid as new airports and aircraft turn up.
+
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Which table each code column is numbered in.
+DOMAINS = {
+    'UniqueCarrier': 'carriers',
+    'TailNum': 'tails',
+    'Origin': 'airports',
+    'Dest': 'airports',
+    'CancellationCode': 'cancellations',
+}
+
+CODES_VERSION = 1
+
+
+class CodeTable:
+    """Append-only value -> code tables, one per domain in DOMAINS."""
+
+    def __init__(self, path=None, tables=None):
+        self.path = path
+        self.values = {d: list((tables or {}).get(d, [])) for d in set(DOMAINS.values())}
+        self._index = {d: {v: i for i, v in enumerate(vs)} for d, vs in self.values.items()}
+        self._dtypes = {}
+        self.changed = False
+
+    @classmethod
+    def open(cls, path):
+        """The table saved at `path`, or an empty one that will be saved there."""
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+        except OSError:
+            return cls(path)
+        return cls(path, saved['tables'])
+
+    def save(self, path=None):
+        """Write the table as JSON (to `path`, default where it was opened)."""
+        path = self.path if path is None else path
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'version': CODES_VERSION, 'tables': self.values}, f)
+        os.replace(tmp, path)
+        self.path = path
+        self.changed = False
+
+    def dtype(self, column):
+        """CategoricalDtype of `column`: every value of its domain so far."""
+        domain = DOMAINS[column]
+        n = len(self.values[domain])
+        if self._dtypes.get(domain, (None, 0))[1] != n:
+            self._dtypes[domain] = pd.CategoricalDtype(self.values[domain]), n
+        return self._dtypes[domain][0]
+
+    def codes(self, column, values):
+        """Codes of `values` in the domain of `column`, adding new ones."""
+        domain = DOMAINS[column]
+        index, table = self._index[domain], self.values[domain]
+        out = np.empty(len(values), dtype=np.int64)
+        for i, v in enumerate(values):
+            code = index.get(v)
+            if code is None:
+                code = index[v] = len(table)
+                table.append(v)
+                self.changed = True
+            out[i] = code
+        return out
+
+    def encode(self, series):
+        """A categorical series recoded to the table's categories.
+
+        Only the series' categories are looked up (a few hundred values per
+        chunk); the rows are recoded with one take.
+        """
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype('category')
+        mapping = np.append(self.codes(series.name, series.cat.categories.tolist()), -1)
+        codes = mapping[series.cat.codes.to_numpy()]
+        return pd.Series(pd.Categorical.from_codes(codes, dtype=self.dtype(series.name)),
+                         index=series.index, name=series.name)
+
+    def encode_frame(self, df):
+        """Recode every code column of `df` in place; returns `df`."""
+        for column in DOMAINS:
+            if column in df:
+                df[column] = self.encode(df[column])
+        return df
+
+
+def code_counts(series):
+    """value_counts() of a categorical column as a bincount over its codes.
+
+    Counts of every category (0 for categories that do not occur), largest
+    first, missing values left out.
+    """
+    codes = series.cat.codes.to_numpy()
+    counts = np.bincount(codes[codes >= 0], minlength=len(series.cat.categories))
+    out = pd.Series(counts, index=pd.CategoricalIndex(series.cat.categories,
+                                                      dtype=series.dtype, name=series.name),
+                    name='count')
+    return out.sort_values(ascending=False, kind='stable')
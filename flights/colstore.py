@@ -0,0 +1,204 @@
+# Memory-mapped column store: one fixed-width binary file per column.
+#
+# <dir>/<column>.bin holds the column's values back to back (int8/int16 for
+# the calendar and flag columns and the nullable delays, int8 or int16 codes
+# for the categorical ones, the width pandas itself uses for that many
+# categories); nullable columns add <column>.na.bin, one byte per row that
+# is 1 where the value is missing. meta.json records the number of rows,
+# each column's dtype and the categories and code width of the code
+# columns.
+#
+# Opening the store maps the files with numpy.memmap and wraps them in
+# pandas arrays without copying, so a frame over the store costs no memory
+# up front: only the pages of the columns an analysis touches are read, and
+# several processes on one host analysing the same year share those pages
+# through the OS page cache instead of each holding a private copy.
+
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from .cache import _ALL_DTYPES, _derive, source_fingerprint
+from .load import CHUNKSIZE, iter_flights
+from .trace import traced
+
+COLUMNS_DIR = '.flights_columns'
+META_FILE = 'meta.json'
+COLSTORE_VERSION = 3
+
+# Category codes are written as int16 (-1 is missing) while the file is
+# parsed, and narrowed to pandas' width once the categories are known.
+_CODE_DTYPE = np.int16
+
+
+@traced('load_columns')
+def load_columns(csv_path, columns=None, directory=None):
+    """A memory-mapped frame of a flights CSV, building the store if needed.
+
+    Like flights.load_flights, but the frame's columns are views of the
+    store's files rather than copies in memory. They are read-only; assign
+    a new column instead of modifying one in place.
+    """
+    path = columns_path(csv_path, directory)
+    meta = _read_meta(path)
+    if (meta is None or meta.get('version') != COLSTORE_VERSION
+            or meta.get('source') != source_fingerprint(csv_path)):
+        build_columns(csv_path, directory)
+    return ColumnStore(path).frame(columns)
+
+
+def columns_path(csv_path, directory=None):
+    """Directory holding the column store for `csv_path`."""
+    if directory is None:
+        directory = os.path.join(os.path.dirname(os.path.abspath(csv_path)), COLUMNS_DIR)
+    return os.path.join(directory, os.path.basename(csv_path))
+
+
+@traced('build_columns')
+def build_columns(csv_path, directory=None, chunksize=CHUNKSIZE):
+    """Parse `csv_path` once into one binary file per column.
+
+    Chunks are appended to the column files as they are parsed; the store
+    is written to a temporary directory and moved into place when
+    complete.
+    """
+    path = columns_path(csv_path, directory)
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+    fingerprint = source_fingerprint(csv_path)
+    tmp = tempfile.mkdtemp(prefix='.building-', dir=parent)
+    files = {}
+    categories = {}
+    rows = 0
+    try:
+        for chunk in iter_flights(csv_path, chunksize=chunksize):
+            _derive(chunk)
+            for c in chunk.columns:
+                _append(files, tmp, c, chunk[c], categories)
+            rows += len(chunk)
+        for f in files.values():
+            f.close()
+        files = {}
+        for c, known in categories.items():
+            categories[c] = _finish_codes(os.path.join(tmp, c + '.bin'), known, rows)
+        columns = {}
+        for c, dtype in _ALL_DTYPES.items():
+            if os.path.exists(os.path.join(tmp, c + '.bin')):
+                columns[c] = {'dtype': dtype}
+                if dtype == 'category':
+                    columns[c]['categories'], columns[c]['codes'] = categories[c]
+        with open(os.path.join(tmp, META_FILE), 'w') as f:
+            json.dump({'version': COLSTORE_VERSION, 'path': os.path.abspath(csv_path),
+                       'source': fingerprint, 'rows': rows, 'columns': columns}, f)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(tmp, path)
+    except BaseException:
+        for f in files.values():
+            f.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return path
+
+
+class ColumnStore:
+    """Read-only memory-mapped view of a store written by build_columns."""
+
+    def __init__(self, path):
+        self.path = path
+        self.meta = _read_meta(path)
+        if self.meta is None:
+            raise FileNotFoundError('no column store in %r' % path)
+        self.rows = self.meta['rows']
+        self.columns = list(self.meta['columns'])
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, column):
+        return pd.Series(self.array(column), name=column, copy=False)
+
+    def array(self, column):
+        """The column as a numpy memmap or a pandas array wrapping one."""
+        info = self.meta['columns'][column]
+        dtype = info['dtype']
+        if dtype == 'category':
+            codes = self._map(column + '.bin', np.dtype(info['codes']))
+            return pd.Categorical.from_codes(codes, categories=info['categories'], validate=False)
+        if dtype == 'Int16':
+            values = self._map(column + '.bin', np.int16)
+            missing = self._map(column + '.na.bin', np.bool_)
+            return pd.arrays.IntegerArray(values, missing)
+        return self._map(column + '.bin', np.dtype(dtype))
+
+    def frame(self, columns=None):
+        """A DataFrame over `columns` (default all) without copying them."""
+        columns = self.columns if columns is None else list(columns)
+        return pd.DataFrame({c: self.array(c) for c in columns}, copy=False)
+
+    def _map(self, name, dtype):
+        if not self.rows:
+            return np.empty(0, dtype=dtype)
+        # A plain ndarray view keeps the mapping alive without making every
+        # result computed from the column a memmap too.
+        return np.memmap(os.path.join(self.path, name), dtype=dtype, mode='r',
+                         shape=(self.rows,)).view(np.ndarray)
+
+
+def _append(files, directory, column, series, categories):
+    def write(name, array):
+        if name not in files:
+            files[name] = open(os.path.join(directory, name), 'wb')
+        files[name].write(np.ascontiguousarray(array).tobytes())
+
+    dtype = _ALL_DTYPES[column]
+    if dtype == 'category':
+        # Categories are numbered in order of first appearance, so codes
+        # already written stay valid as new ones turn up.
+        known = categories.setdefault(column, {})
+        for value in series.cat.categories:
+            known.setdefault(value, len(known))
+        if len(known) > np.iinfo(_CODE_DTYPE).max:
+            raise ValueError('%s has more than %d distinct values' % (column, len(known) - 1))
+        mapping = np.array([known[v] for v in series.cat.categories] + [-1], dtype=_CODE_DTYPE)
+        write(column + '.bin', mapping[series.cat.codes.to_numpy()])
+    elif dtype == 'Int16':
+        write(column + '.bin', series.to_numpy(dtype=np.int16, na_value=0))
+        write(column + '.na.bin', series.isna().to_numpy())
+    else:
+        write(column + '.bin', series.to_numpy(dtype=dtype))
+
+
+def _finish_codes(path, known, rows):
+    # Renumber the codes written in order of appearance so that categories
+    # come out sorted, as from read_csv, and rewrite them at the width
+    # pandas.Categorical keeps its codes in (int8 below 127 categories),
+    # which it would otherwise cast to, copying the column on every read.
+    # Returns (categories, code dtype name).
+    values = list(known)
+    order = sorted(range(len(values)), key=values.__getitem__)
+    width = np.int8 if len(values) < np.iinfo(np.int8).max else _CODE_DTYPE
+    if (order == list(range(len(values))) and width == _CODE_DTYPE) or not rows:
+        return [values[i] for i in order], np.dtype(width).name
+    recode = np.empty(len(values) + 1, dtype=width)
+    recode[order] = np.arange(len(values))
+    recode[-1] = -1
+    codes = np.memmap(path, dtype=_CODE_DTYPE, mode='r', shape=(rows,))
+    with open(path + '.tmp', 'wb') as f:
+        for start in range(0, rows, CHUNKSIZE):
+            f.write(recode[codes[start:start + CHUNKSIZE]].tobytes())
+    del codes
+    os.replace(path + '.tmp', path)
+    return [values[i] for i in order], np.dtype(width).name
+
+
+def _read_meta(path):
+    try:
+        with open(os.path.join(path, META_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,177 @@
+# Materialized aggregate cube over the dimensions every question slices.
+#
+# Each occupied cell of Month x DayOfWeek x UniqueCarrier x Origin x
+# CancellationCode holds additive measures: flights, cancellations, and for
+# each delay type the number of reported values, their sum and the number
+# that are not 0. A year of flights fills a few hundred thousand cells, so
+# any roll-up (by month, by weekday, by month and cancellation code, ...)
+# is a bincount over the cells instead of a scan of millions of rows, and
+# the means of code.py follow from the sums and counts. Cells store integer
+# codes into per-dimension levels and int64 measures, which keeps the cube
+# small on disk and makes cubes of separate chunks or files merge exactly.
+
+import numpy as np
+import pandas as pd
+
+from .aggregate import _encode
+from .schema import DELAY_COLUMNS
+
+CUBE_DIMENSIONS = ['Month', 'DayOfWeek', 'UniqueCarrier', 'Origin', 'CancellationCode']
+
+MEASURES = ['flights', 'cancelled'] + [
+    '%s_%s' % (c, m) for c in DELAY_COLUMNS for m in ('count', 'sum', 'nonzero')]
+
+
+class Cube:
+    """Sparse cube: one row of `codes` and `measures` per occupied cell.
+
+    `levels[i]` holds the values of dimension `dims[i]` and `codes[:, i]`
+    the position of each cell's value in it, or -1 where the value is
+    missing (the CancellationCode of flights that were not cancelled).
+    """
+
+    def __init__(self, dims, levels, codes, measures):
+        self.dims = list(dims)
+        self.levels = [pd.Index(lv) for lv in levels]
+        self.codes = codes
+        self.measures = measures
+
+    def __len__(self):
+        return len(self.codes)
+
+    @classmethod
+    def from_frame(cls, df, dims=CUBE_DIMENSIONS):
+        levels, codes = zip(*(_encode(df[d]) for d in dims))
+        levels = [pd.Index(lv.categories if isinstance(lv, pd.CategoricalIndex) else lv)
+                  for lv in levels]
+        measures = {'flights': np.ones(len(df), dtype=np.int64),
+                    'cancelled': df['Cancelled'].to_numpy(dtype=np.int64)}
+        for c in DELAY_COLUMNS:
+            values = df[c].to_numpy(dtype=np.int64, na_value=0)
+            measures[c + '_count'] = df[c].notna().to_numpy(dtype=np.int64)
+            measures[c + '_sum'] = values
+            measures[c + '_nonzero'] = (values != 0).astype(np.int64)
+        return _compact(cls, dims, levels, np.column_stack(codes), measures)
+
+    def merge(self, other):
+        """A cube of the data of both cubes (which must have the same dims)."""
+        if other.dims != self.dims:
+            raise ValueError('cannot merge cubes over %r and %r' % (self.dims, other.dims))
+        levels = [a.append(b[~b.isin(a)]) for a, b in zip(self.levels, other.levels)]
+        codes = np.concatenate([_recode(self, levels), _recode(other, levels)])
+        measures = {m: np.concatenate([self.measures[m], other.measures[m]]) for m in MEASURES}
+        return _compact(type(self), self.dims, levels, codes, measures)
+
+    def rollup(self, keys=(), where=None):
+        """Measures summed by `keys`, over the cells matching `where`.
+
+        `where` maps dimensions to the values to keep, e.g.
+        {'Month': [2]}; values that do not occur match nothing, and a NaN
+        matches the cells where that dimension is missing. Like groupby,
+        cells with a missing key are left out. Returns a frame indexed by
+        `keys`, or a Series of totals when `keys` is empty.
+        """
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        keep = np.ones(len(self), dtype=bool)
+        for dim, values in (where or {}).items():
+            i = self.dims.index(dim)
+            values = pd.Index(list(values))
+            wanted = self.levels[i].get_indexer(values.dropna())
+            # get_indexer gives -1 for unknown values, which is also the code
+            # of a missing key.
+            wanted = wanted[wanted >= 0]
+            if values.hasnans:
+                wanted = np.append(wanted, -1)
+            keep &= np.isin(self.codes[:, i], wanted)
+        cols = [self.dims.index(k) for k in keys]
+        codes = self.codes[:, cols]
+        keep &= (codes >= 0).all(axis=1)
+        codes = codes[keep]
+        shape = [len(self.levels[i]) for i in cols]
+        flat = np.ravel_multi_index(codes.T, shape) if keys else np.zeros(len(codes), np.int64)
+        groups, inverse = np.unique(flat, return_inverse=True)
+        sums = {m: np.bincount(inverse, self.measures[m][keep], minlength=len(groups))
+                .astype(np.int64) for m in MEASURES}
+        if not keys:
+            return pd.Series({m: int(v.sum()) for m, v in sums.items()}, dtype=np.int64)
+        positions = np.unravel_index(groups, shape)
+        arrays = [self.levels[i].take(p) for i, p in zip(cols, positions)]
+        index = (pd.Index(arrays[0], name=keys[0]) if len(keys) == 1
+                 else pd.MultiIndex.from_arrays(arrays, names=keys))
+        return pd.DataFrame(sums, index=index).sort_index()
+
+    def summary(self, keys, where=None):
+        """Flights, cancellation rate and mean of each delay (0 included).
+
+        The same table as default_registry()'s 'month' / 'weekday'.
+        """
+        r = _frame(self.rollup(keys, where))
+        out = pd.DataFrame({'Total_Flights': r['flights'],
+                            'Cancelled': r['cancelled'] / r['flights']})
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for c in DELAY_COLUMNS:
+                out[c] = r[c + '_sum'] / r[c + '_count'].where(r[c + '_count'] > 0)
+        return out
+
+    def delay_means(self, keys, where=None):
+        """Mean length of each delay type, NaN and 0 left out (delay_summary)."""
+        r = _frame(self.rollup(keys, where))
+        return pd.DataFrame({c: r[c + '_sum'] / r[c + '_nonzero'].where(r[c + '_nonzero'] > 0)
+                             for c in DELAY_COLUMNS})
+
+    def cancellations(self, keys, where=None):
+        """Cancelled flights by `keys` and CancellationCode."""
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        return self.rollup(keys + ['CancellationCode'], where)['cancelled'].rename('Cancelled')
+
+    def save(self, path):
+        """Write the cube to a compressed .npz file (no pickling)."""
+        levels = {'level_%d' % i: lv.to_numpy(dtype=None if lv.dtype.kind in 'iuf' else str)
+                  for i, lv in enumerate(self.levels)}
+        np.savez_compressed(path, dims=np.array(self.dims), codes=self.codes,
+                            measure_names=np.array(MEASURES),
+                            measures=np.column_stack([self.measures[m] for m in MEASURES]),
+                            **levels)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as f:
+            dims = f['dims'].tolist()
+            levels = [f['level_%d' % i] for i in range(len(dims))]
+            measures = dict(zip(f['measure_names'].tolist(), f['measures'].T))
+            return cls(dims, levels, f['codes'], measures)
+
+
+def build_cube(frames, dims=CUBE_DIMENSIONS):
+    """Cube over a frame or an iterable of chunks (e.g. from iter_flights)."""
+    if isinstance(frames, pd.DataFrame):
+        return Cube.from_frame(frames, dims)
+    cube = None
+    for frame in frames:
+        part = Cube.from_frame(frame, dims)
+        cube = part if cube is None else cube.merge(part)
+    return cube
+
+
+def _compact(cls, dims, levels, codes, measures):
+    # One row per distinct cell; -1 (missing) is shifted to 0 for the
+    # flat cell number.
+    shape = [len(lv) + 1 for lv in levels]
+    flat = np.ravel_multi_index((codes + 1).T, shape)
+    cells, inverse = np.unique(flat, return_inverse=True)
+    codes = np.column_stack(np.unravel_index(cells, shape)).astype(np.int32) - 1
+    sums = {m: np.bincount(inverse, measures[m], minlength=len(cells)).astype(np.int64)
+            for m in MEASURES}
+    return cls(dims, levels, codes, sums)
+
+
+def _recode(cube, levels):
+    codes = cube.codes.copy()
+    for i, (old, new) in enumerate(zip(cube.levels, levels)):
+        mapping = np.append(new.get_indexer(old), -1)
+        codes[:, i] = mapping[cube.codes[:, i]]
+    return codes
+
+
+def _frame(rollup):
+    return rollup.to_frame().T if isinstance(rollup, pd.Series) else rollup
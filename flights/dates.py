@@ -0,0 +1,58 @@
+# Calendar keys computed arithmetically from the Year, Month and DayofMonth
+# columns, instead of formatting and re-parsing 'YYYY/M/D' strings.
+
+import numpy as np
+import pandas as pd
+
+# Days before the first of each month in a non-leap year, indexed by month.
+_DAYS_BEFORE = np.array([0, 0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334],
+                        dtype=np.int16)
+
+
+def is_leap(year):
+    year = np.asarray(year)
+    return (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+
+
+def day_of_year(year, month, day):
+    """Day of the year, 1-366, as int16."""
+    month = np.asarray(month)
+    doy = _DAYS_BEFORE[month] + np.asarray(day, dtype=np.int16)
+    return (doy + (is_leap(year) & (month > 2))).astype(np.int16)
+
+
+def to_datetime64(year, month, day):
+    """datetime64[D] dates from integer year, month and day arrays."""
+    months = (np.asarray(year, dtype=np.int64) - 1970) * 12 + np.asarray(month) - 1
+    return months.astype('datetime64[M]').astype('datetime64[D]') + (np.asarray(day) - 1)
+
+
+def add_day_of_year(df):
+    """Add an int16 DayOfYear column to `df` in place and return it."""
+    df['DayOfYear'] = day_of_year(df['Year'].to_numpy(), df['Month'].to_numpy(),
+                                  df['DayofMonth'].to_numpy())
+    return df
+
+
+def daily_counts(df):
+    """Number of flights on every day covered by `df`, indexed by date.
+
+    A 366-bin histogram per year over the day of year (taken from a
+    DayOfYear column when the frame has one); days without flights are
+    included with a count of 0.
+    """
+    year = df['Year'].to_numpy().astype(np.int64)
+    if 'DayOfYear' in df:
+        doy = df['DayOfYear'].to_numpy()
+    else:
+        doy = day_of_year(year, df['Month'].to_numpy(), df['DayofMonth'].to_numpy())
+    if not len(year):
+        return pd.Series(dtype=np.int64, index=pd.DatetimeIndex([], name='Date'),
+                         name='Total_Flights')
+    first = year.min()
+    years = np.arange(first, year.max() + 1)
+    counts = np.bincount((year - first) * 366 + doy - 1, minlength=len(years) * 366)
+    days = (years - 1970).astype('datetime64[Y]').astype('datetime64[D]')[:, None] + np.arange(366)
+    real = np.arange(366) < np.where(is_leap(years), 366, 365)[:, None]
+    return pd.Series(counts[real.ravel()], name='Total_Flights',
+                     index=pd.DatetimeIndex(days[real], name='Date'))
@@ -0,0 +1,69 @@
+# Out-of-core summaries of the full 1987-2008 history.
+#
+# The yearly CSVs hold about 120M rows together, far more than one frame
+# can. The history is streamed a chunk at a time instead: each chunk is
+# reduced to a registry Partial and merged into a running total, so memory
+# holds one chunk plus the partial state (a few numbers per group and
+# column) however many years are read, and the tables come out the same as
+# Registry.run over all the rows at once.
+
+import os
+import re
+
+from .load import CHUNKSIZE, iter_flights
+from .registry import default_registry
+from .trace import traced
+
+# 1987.csv, 2008.csv.bz2, ... as distributed by RITA / the ASA data expo.
+YEAR_FILE = re.compile(r'^(\d{4})\.csv(\.bz2|\.gz|\.zip|\.xz)?$')
+
+
+def history_files(directory, years=None):
+    """{year: path} of the yearly CSVs in `directory`, in year order."""
+    found = {}
+    for name in os.listdir(directory):
+        match = YEAR_FILE.match(name)
+        if match and (years is None or int(match.group(1)) in years):
+            found[int(match.group(1))] = os.path.join(directory, name)
+    return dict(sorted(found.items()))
+
+
+def year_partials(directory, registry=None, tables=None, years=None, chunksize=CHUNKSIZE,
+                  codes=None):
+    """Yield (year, Partial) for each yearly CSV, one chunk in memory at a time.
+
+    Only the columns the registry needs are parsed. With a CodeTable as
+    `codes` every year's code columns are numbered the same way.
+    """
+    registry = default_registry() if registry is None else registry
+    columns = registry.columns(tables)
+    for year, path in history_files(directory, years).items():
+        chunks = iter_flights(path, columns=columns, chunksize=chunksize, codes=codes)
+        yield year, _fold(registry.partial(chunk, tables) for chunk in chunks)
+
+
+@traced('run_history')
+def run_history(directory, registry=None, tables=None, years=None, chunksize=CHUNKSIZE,
+                codes=None):
+    """Registry tables (default_registry() by default) over every year.
+
+    `years` restricts the files read, e.g. range(2000, 2009).
+
+        results = run_history('data/')
+        results['delay_month']
+    """
+    registry = default_registry() if registry is None else registry
+    partial = _fold(p for _, p in year_partials(directory, registry, tables, years,
+                                                chunksize, codes))
+    if partial is None:
+        raise FileNotFoundError('no yearly flights CSVs (YYYY.csv) in %r' % directory)
+    return registry.finish(partial, tables)
+
+
+def _fold(partials):
+    # Merged into a running total as they come, so only one is held at a time.
+    total = None
+    for p in partials:
+        if p is not None:
+            total = p if total is None else total.merge(p)
+    return total
@@ -0,0 +1,221 @@
+# A store of aggregates maintained one monthly file at a time.
+#
+# BTS publishes on-time data monthly. Store.ingest reads one new monthly
+# CSV a chunk at a time and computes, for that month alone, the registry
+# partial aggregates, the cube, the delay sketches, the per-day flight
+# counts and the typed Parquet data. These are written under
+# months/YYYY-MM and merged into the running totals, so an append costs
+# time proportional to the new month and never rereads older ones. Partials
+# and cubes merge exactly, so the totals equal a full recompute; sketches
+# stay within their documented error bound.
+#
+# Layout of a store directory:
+#
+#     manifest.json              months ingested, with source and row count
+#     totals.pkl                 merged state of every month
+#     cube.npz                   the total cube, for dashboards
+#     months/YYYY-MM.pkl         state of one month
+#     data/year=YYYY/month=MM.parquet
+#
+# The .pkl files are pickles written by this module; only open stores you
+# created.
+
+import copy
+import json
+import os
+import pickle
+import tempfile
+
+import numpy as np
+
+from .cache import _arrow_schema, _derive, _month_file, _to_arrow, read_cache, source_fingerprint
+from .cube import Cube
+from .dates import daily_counts
+from .load import CHUNKSIZE, concat_frames, iter_flights
+from .registry import default_registry
+from .sketch import quartile_bins, sketch_columns
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+MANIFEST = 'manifest.json'
+TOTALS = 'totals.pkl'
+STORE_VERSION = 1
+
+
+class Store:
+    """Aggregates of every month ingested so far, kept in `root`.
+
+    The registry (default_registry() unless given) is fixed when the store
+    is created and saved with it.
+    """
+
+    def __init__(self, root, registry=None):
+        self.root = root
+        os.makedirs(os.path.join(root, 'months'), exist_ok=True)
+        self.manifest = self._read_json(MANIFEST) or {'version': STORE_VERSION, 'months': {}}
+        self.totals = self._read_pickle(TOTALS)
+        if self.totals is None:
+            self.totals = {'registry': default_registry() if registry is None else registry}
+        self.registry = self.totals['registry']
+
+    def months(self):
+        """[(year, month), ...] ingested so far, in order."""
+        return [tuple(int(p) for p in key.split('-')) for key in sorted(self.manifest['months'])]
+
+    def ingest(self, csv_path, replace=False, chunksize=CHUNKSIZE):
+        """Add the month of flights in `csv_path`; returns (year, month).
+
+        The file must hold a single month. A month that is already in the
+        store is refused unless `replace` is set (e.g. for a corrected
+        file); the totals are then rebuilt from the per-month states, which
+        still reads no flight data.
+        """
+        state, year, month = self._month_state(csv_path, chunksize)
+        key = '%04d-%02d' % (year, month)
+        if key in self.manifest['months'] and not replace:
+            os.remove(state.pop('_data'))
+            raise ValueError('%s is already in the store; pass replace=True to reload it' % key)
+        data = state.pop('_data')
+        target = os.path.join(self.root, 'data', 'year=%04d' % year, _month_file(month))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(data, target)
+        self._write_pickle(os.path.join('months', key + '.pkl'), state)
+        replaced = key in self.manifest['months']
+        self.manifest['months'][key] = {'source': os.path.abspath(csv_path),
+                                        'fingerprint': source_fingerprint(csv_path),
+                                        'rows': state['rows']}
+        if replaced:
+            self._rebuild_totals()
+        else:
+            self.totals = _merge_states(self.totals, state)
+        self._save_totals()
+        return year, month
+
+    def results(self, tables=None):
+        """Registry tables over every month, as Registry.run would give."""
+        return self.registry.finish(self.totals['partial'], tables)
+
+    @property
+    def cube(self):
+        return self.totals['cube']
+
+    @property
+    def sketches(self):
+        return self.totals['sketches']
+
+    def daily_counts(self):
+        return self.totals['daily']
+
+    def delay_bins(self):
+        """Quartile bins of each delay column, from the merged sketches."""
+        return {c: quartile_bins(s) for c, s in self.sketches.items()}
+
+    def load(self, columns=None, months=None):
+        """Typed flights of `months` ([(year, month), ...], default all)."""
+        wanted = self.months() if months is None else [tuple(m) for m in months]
+        years = sorted({y for y, _ in wanted})
+        return concat_frames(
+            read_cache(os.path.join(self.root, 'data', 'year=%04d' % y), columns,
+                       [m for yy, m in wanted if yy == y])
+            for y in years)
+
+    def _month_state(self, csv_path, chunksize):
+        if pq is None:
+            raise ImportError('the flights store needs pyarrow: pip install pyarrow')
+        schema = _arrow_schema()
+        fd, data = tempfile.mkstemp(suffix='.parquet', dir=self.root)
+        os.close(fd)
+        writer = pq.ParquetWriter(data, schema)
+        state = None
+        year = month = None
+        try:
+            for chunk in iter_flights(csv_path, chunksize=chunksize):
+                _derive(chunk)
+                # Year * 100 + Month, so one unique over a single array.
+                ym = np.unique(chunk['Year'].to_numpy(np.int64) * 100
+                               + chunk['Month'].to_numpy(np.int64))
+                if year is not None:
+                    ym = np.union1d(ym, [year * 100 + month])
+                if len(ym) != 1:
+                    raise ValueError('%s holds more than one month: %s'
+                                     % (csv_path, [divmod(int(v), 100) for v in ym]))
+                year, month = divmod(int(ym[0]), 100)
+                writer.write_table(_to_arrow(chunk, schema))
+                part = {'rows': len(chunk),
+                        'partial': self.registry.partial(chunk),
+                        'cube': Cube.from_frame(chunk),
+                        'sketches': sketch_columns(chunk),
+                        'daily': daily_counts(chunk)}
+                state = part if state is None else _merge_states(state, part)
+        except BaseException:
+            writer.close()
+            os.remove(data)
+            raise
+        writer.close()
+        if year is None:
+            os.remove(data)
+            raise ValueError('%s holds no flights' % csv_path)
+        state['_data'] = data
+        return state, int(year), int(month)
+
+    def _rebuild_totals(self):
+        totals = {'registry': self.registry}
+        for key in sorted(self.manifest['months']):
+            totals = _merge_states(totals, self._read_pickle(os.path.join('months', key + '.pkl')))
+        self.totals = totals
+
+    def _save_totals(self):
+        self._write_pickle(TOTALS, self.totals)
+        self.cube.save(os.path.join(self.root, 'cube.npz'))
+        self._write(MANIFEST, lambda f: f.write(json.dumps(self.manifest, indent=1).encode()))
+
+    def _read_json(self, name):
+        try:
+            with open(os.path.join(self.root, name)) as f:
+                return json.load(f)
+        except OSError:
+            return None
+
+    def _read_pickle(self, name):
+        try:
+            with open(os.path.join(self.root, name), 'rb') as f:
+                return pickle.load(f)
+        except OSError:
+            return None
+
+    def _write_pickle(self, name, obj):
+        self._write(name, lambda f: pickle.dump(obj, f, pickle.HIGHEST_PROTOCOL))
+
+    def _write(self, name, dump):
+        # Written next to the target and renamed, so a crash never leaves a
+        # half-written file behind.
+        path = os.path.join(self.root, name)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                dump(f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+
+def _merge_states(total, part):
+    """Totals with one more piece of data merged in (a new dict)."""
+    if 'partial' not in total:
+        merged = dict(part)
+        merged['sketches'] = copy.deepcopy(part['sketches'])
+    else:
+        merged = dict(total)
+        merged['rows'] = total['rows'] + part['rows']
+        merged['partial'] = total['partial'].merge(part['partial'])
+        merged['cube'] = total['cube'].merge(part['cube'])
+        merged['sketches'] = {c: copy.deepcopy(s).merge(part['sketches'][c])
+                              for c, s in total['sketches'].items()}
+        merged['daily'] = total['daily'].add(part['daily'], fill_value=0).astype('int64')
+    if 'registry' in total:
+        merged['registry'] = total['registry']
+    return merged
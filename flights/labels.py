@@ -0,0 +1,58 @@
+# Month and weekday names for presentation.
+#
+# Month and DayOfWeek stay integer codes through every computation; names are
+# attached at the end through a lookup table, as an ordered categorical, so
+# labelling millions of rows is one vectorized take and the labels still sort
+# in calendar order.
+
+import calendar
+
+import numpy as np
+import pandas as pd
+
+MONTH_ABBR = list(calendar.month_abbr)[1:]           # Month 1-12
+DAY_ABBR = list(calendar.day_abbr)                   # DayOfWeek 1 (Mon) - 7 (Sun)
+
+_NAMES = {'Month': MONTH_ABBR, 'DayOfWeek': DAY_ABBR}
+
+
+def month_names(values):
+    """'Jan'...'Dec' for months 1-12, as an ordered categorical."""
+    return _lookup(values, MONTH_ABBR)
+
+
+def day_names(values):
+    """'Mon'...'Sun' for DayOfWeek 1-7, as an ordered categorical."""
+    return _lookup(values, DAY_ABBR)
+
+
+def with_labels(obj):
+    """Replace Month/DayOfWeek numbers with names in a frame or series.
+
+    Both columns and index levels called Month or DayOfWeek are relabelled;
+    everything else is left alone. Returns a new object.
+    """
+    obj = obj.copy()
+    if isinstance(obj, pd.DataFrame):
+        for column, names in _NAMES.items():
+            if column in obj.columns:
+                obj[column] = _lookup(obj[column], names)
+    index = obj.index
+    if isinstance(index, pd.MultiIndex):
+        levels = [_lookup(index.get_level_values(i), _NAMES[name]) if name in _NAMES
+                  else index.get_level_values(i) for i, name in enumerate(index.names)]
+        obj.index = pd.MultiIndex.from_arrays(levels, names=index.names)
+    elif index.name in _NAMES:
+        obj.index = _lookup(index, _NAMES[index.name])
+    return obj
+
+
+def _lookup(values, names):
+    """Categorical of names[v - 1], keeping the type of Series/Index input."""
+    codes = np.asarray(values, dtype=np.int64) - 1
+    labels = pd.Categorical.from_codes(codes, categories=names, ordered=True)
+    if isinstance(values, pd.Series):
+        return pd.Series(labels, index=values.index, name=values.name)
+    if isinstance(values, pd.Index):
+        return pd.CategoricalIndex(labels, name=values.name)
+    return labels
@@ -0,0 +1,64 @@
+# Typed, chunked reader for the yearly flight CSVs.
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from .schema import COLUMNS, DTYPES
+from .trace import traced
+
+CHUNKSIZE = 500000
+
+
+@traced('read_flights')
+def read_flights(path, columns=None, chunksize=CHUNKSIZE, codes=None):
+    """Read a flights CSV with the fixed schema in flights.schema.
+
+    The file is parsed `chunksize` rows at a time, so the parser never holds
+    more than one chunk of untyped data. Only `columns` are read (default:
+    all 29); columns that are not in the schema, such as the index column
+    written by `DataFrame.to_csv`, are skipped.
+
+    With a flights.codes.CodeTable as `codes`, the code columns take their
+    categories from it (see flights.codes), the same for every file.
+    """
+    return concat_frames(iter_flights(path, columns, chunksize, codes),
+                         sort_categories=codes is None)
+
+
+def iter_flights(path, columns=None, chunksize=CHUNKSIZE, codes=None):
+    """Yield typed chunks of a flights CSV. See read_flights."""
+    wanted = set(COLUMNS if columns is None else columns)
+    # The C parser only has a fast path for numpy dtypes; nullable columns
+    # are parsed as float64 (NA -> NaN) and narrowed afterwards, which is
+    # many times faster than letting read_csv build Int16 from strings.
+    nullable = [c for c in wanted if DTYPES[c] == 'Int16']
+    dtype = {c: 'float64' if c in nullable else DTYPES[c] for c in wanted}
+    reader = pd.read_csv(path, usecols=lambda c: c in wanted, dtype=dtype,
+                         chunksize=chunksize)
+    with reader:
+        for chunk in reader:
+            if nullable:
+                chunk = chunk.astype({c: 'Int16' for c in nullable})
+            if codes is not None:
+                codes.encode_frame(chunk)
+            yield chunk
+
+
+def concat_frames(frames, sort_categories=True):
+    """Concatenate typed frames, keeping categoricals categorical.
+
+    Chunks read separately end up with different categories, which makes a
+    plain pd.concat fall back to object columns. The categories are unioned
+    here instead. read_csv gives them in first-seen order; they are sorted,
+    so that a frame has the same categories however it was read, unless
+    `sort_categories` is false (a CodeTable's, whose order is its codes).
+    """
+    frames = list(frames)
+    if not frames:
+        return pd.DataFrame({c: pd.Series(dtype=DTYPES[c]) for c in COLUMNS})
+    order = list(frames[0].columns)
+    cats = [c for c in order if isinstance(frames[0][c].dtype, pd.CategoricalDtype)]
+    out = pd.concat([f.drop(columns=cats) for f in frames], ignore_index=True)
+    for c in cats:
+        out[c] = union_categoricals([f[c] for f in frames], sort_categories=sort_categories)
+    return out[order]
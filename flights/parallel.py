@@ -0,0 +1,133 @@
+# Registry tables computed by a pool of worker processes.
+#
+# The rows are ordered by Month and the columns the registry needs are
+# copied once into shared memory, so every worker sees the same pages
+# instead of receiving a pickled slice of the frame. Each task covers the
+# rows of one month (large months are split further when there are more
+# workers than months), reduces them to a registry Partial and sends only
+# that back; partials merge exactly, so the tables are the ones
+# Registry.run gives on the whole frame.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .partial import merge_all
+from .registry import default_registry
+
+# Column state of the worker processes, set up by _attach.
+_worker = {}
+
+
+def run_parallel(df, registry=None, tables=None, workers=None, partition='Month'):
+    """Registry tables (default_registry() by default) using `workers` processes.
+
+    Rows are partitioned on `partition`; with `workers=1` the partitions are
+    reduced in this process, which is handy for checking results.
+    """
+    registry = default_registry() if registry is None else registry
+    if not len(df):
+        return registry.run(df, tables)
+    workers = os.cpu_count() if workers is None else workers
+    columns = list(dict.fromkeys([partition] + registry.columns(tables)))
+    order, bounds = _partition(df[partition].to_numpy(), workers)
+    tasks = [(registry, tables, start, stop) for start, stop in bounds]
+    blocks, layout = _share(df, columns, order)
+    try:
+        if workers == 1:
+            _attach(layout)
+            partials = [_reduce(t) for t in tasks]
+        else:
+            with ProcessPoolExecutor(workers, initializer=_attach, initargs=(layout,)) as pool:
+                partials = list(pool.map(_reduce, tasks))
+    finally:
+        _detach()
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+    return registry.finish(merge_all(partials), tables)
+
+
+def _partition(keys, workers):
+    """Row order grouping equal keys, and (start, stop) of every task."""
+    order = np.argsort(keys, kind='stable')
+    ordered = keys[order]
+    edges = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1], True])
+    # Split the partitions into pieces of at most len / workers rows, so
+    # that a few months are not left running on their own at the end.
+    largest = max(-(-len(keys) // max(workers, 1)), 1)
+    bounds = []
+    for start, stop in zip(edges[:-1], edges[1:]):
+        pieces = -(-(stop - start) // largest)
+        cuts = np.linspace(start, stop, pieces + 1).astype(np.int64)
+        bounds.extend(zip(cuts[:-1].tolist(), cuts[1:].tolist()))
+    return order, bounds
+
+
+def _share(df, columns, order):
+    """Copy `columns` of `df`, rows in `order`, into shared memory blocks.
+
+    Returns the blocks (to be unlinked by the caller) and a picklable
+    layout from which _attach rebuilds the columns in a worker.
+    """
+    blocks, layout = [], []
+
+    def put(array):
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        blocks.append(shm)
+        np.ndarray(array.shape, array.dtype, buffer=shm.buf)[:] = array
+        return shm.name, array.dtype.str, len(array)
+
+    try:
+        for c in columns:
+            s = df[c]
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                layout.append((c, 'category', s.dtype,
+                               [put(s.cat.codes.to_numpy()[order])]))
+            elif isinstance(s.dtype, pd.api.extensions.ExtensionDtype):
+                values = s.to_numpy(dtype=s.dtype.numpy_dtype, na_value=0)
+                layout.append((c, 'masked', s.dtype,
+                               [put(values[order]), put(s.isna().to_numpy()[order])]))
+            else:
+                layout.append((c, 'plain', s.dtype, [put(s.to_numpy()[order])]))
+    except BaseException:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+        raise
+    return blocks, layout
+
+
+def _attach(layout):
+    _worker['blocks'] = blocks = []
+    _worker['columns'] = columns = []
+    for column, kind, dtype, arrays in layout:
+        views = []
+        for name, dt, n in arrays:
+            shm = shared_memory.SharedMemory(name=name)
+            blocks.append(shm)
+            views.append(np.ndarray((n,), np.dtype(dt), buffer=shm.buf))
+        columns.append((column, kind, dtype, views))
+
+
+def _detach():
+    _worker.pop('columns', None)
+    for shm in _worker.pop('blocks', []):
+        shm.close()
+
+
+def _reduce(task):
+    registry, tables, start, stop = task
+    data = {}
+    for column, kind, dtype, views in _worker['columns']:
+        part = [v[start:stop] for v in views]
+        if kind == 'category':
+            data[column] = pd.Categorical.from_codes(part[0], dtype=dtype)
+        elif kind == 'masked':
+            data[column] = dtype.construct_array_type()(part[0], part[1])
+        else:
+            data[column] = part[0]
+    return registry.partial(pd.DataFrame(data, copy=False), tables)
@@ -0,0 +1,246 @@
+# Mergeable partial aggregates, for data that does not fit in memory.
+#
+# A Partial holds what a Registry's statistics are finished from, per
+# group: row counts; count, sum, min, max and m2 (sum of squared deviations
+# from the mean) of each column; the count of every distinct value of
+# columns that need quantiles; and histogram bin counts. Partials of
+# disjoint pieces of the data merge exactly (m2 with the pairwise update of
+# Chan, Golub and LeVeque), so a chunk at a time can be reduced to a
+# Partial and thrown away, and the result is the same as from the whole
+# frame at once. The size of a Partial depends only on the number of
+# groups and distinct values, not on the number of rows.
+
+import numpy as np
+import pandas as pd
+
+from .aggregate import _quantile_level
+
+_MOMENTS = ('count', 'sum', 'm2', 'min', 'max')
+# What each statistic is finished from (merging m2 needs count and sum),
+# and the value of each moment for a group without values.
+_NEEDS = {'count': ('count',), 'sum': ('sum',), 'mean': ('count', 'sum'),
+          'var': ('count', 'sum', 'm2'), 'std': ('count', 'sum', 'm2'),
+          'min': ('min',), 'max': ('max',)}
+_EMPTY = {'count': 0.0, 'sum': 0.0, 'm2': 0.0, 'min': np.nan, 'max': np.nan}
+
+
+class GroupState:
+    """Partial state of one pass (key set and filter) of a Registry plan.
+
+    Every table is indexed by the observed groups: `size` is a Series of
+    row counts, `moments[column]` a frame of the _MOMENTS its statistics
+    need, `values[column]` a frame of counts with one column per distinct
+    value, and `hists[(column, edges)]` a frame of bin counts.
+    """
+
+    def __init__(self, size, moments=None, values=None, hists=None):
+        self.size = size
+        self.moments = moments or {}
+        self.values = values or {}
+        self.hists = hists or {}
+
+    @classmethod
+    def from_reducer(cls, reducer, df, metrics):
+        observed = np.flatnonzero(reducer.size())
+        index = reducer.groups.index(observed)
+        state = cls(pd.Series(reducer.size()[observed], index=index, name='size'))
+        needs = {}
+        for m in metrics:
+            if m.bins is not None:
+                key = (m.column, m.bins)
+                if key not in state.hists:
+                    counts = reducer.histogram(df, m.column, m.bins)[observed]
+                    state.hists[key] = pd.DataFrame(counts, index=index)
+            elif _quantile_level(m.stat) is not None:
+                if m.column not in state.values:
+                    distinct, counts = reducer.value_counts(df, m.column)
+                    state.values[m.column] = pd.DataFrame(counts[observed], index=index,
+                                                          columns=distinct)
+            elif m.stat != 'size':
+                if m.stat not in _NEEDS:
+                    raise ValueError('unknown statistic %r for %r' % (m.stat, m.column))
+                needs.setdefault(m.column, set()).update(_NEEDS[m.stat])
+        for column, which in needs.items():
+            which = [k for k in _MOMENTS if k in which]
+            moments = reducer.moments(df, column, which)
+            state.moments[column] = pd.DataFrame({k: moments[k][observed] for k in which},
+                                                 index=index)
+        return state
+
+    def merge(self, other):
+        """The state of both pieces of data together (a new GroupState)."""
+        return _merge_states([self, other])
+
+    def stat(self, column, stat):
+        """Finish one statistic as a Series over the observed groups."""
+        if stat == 'size':
+            return self.size.astype(np.int64)
+        level = _quantile_level(stat)
+        if level is not None:
+            return _quantile(self.values[column], level)
+        if stat not in _NEEDS:
+            raise ValueError('unknown statistic %r for %r' % (stat, column))
+        m = self.moments[column]
+        count = m['count'].to_numpy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if stat == 'count':
+                out = count.astype(np.int64)
+            elif stat == 'sum':
+                out = m['sum'].to_numpy()
+            elif stat == 'mean':
+                out = m['sum'].to_numpy() / count
+            elif stat in ('var', 'std'):
+                out = np.where(count < 2, np.nan, m['m2'].to_numpy() / (count - 1))
+                if stat == 'std':
+                    out = np.sqrt(out)
+            else:
+                out = m[stat].to_numpy()
+        return pd.Series(out, index=self.size.index)
+
+    def histogram(self, column, edges, labels=None):
+        if labels is None:
+            labels = pd.IntervalIndex.from_breaks(edges, closed='right')
+        counts = self.hists[(column, tuple(edges))]
+        return pd.DataFrame(counts.to_numpy(dtype=np.int64), index=self.size.index,
+                            columns=pd.Index(labels, name='bin'))
+
+
+class Partial:
+    """Mergeable state of a whole Registry: {(keys, nonzero): GroupState}.
+
+    Built with Registry.partial(df), combined with merge() (merge_all for
+    many) and turned into result tables by Registry.finish().
+    """
+
+    def __init__(self, passes):
+        self.passes = passes
+
+    def merge(self, other):
+        return merge_all([self, other])
+
+
+def merge_all(partials):
+    """Merge an iterable of Partials; None if there are none.
+
+    All the states of a pass are aligned on one union of their groups and
+    summed together, rather than merged pairwise.
+    """
+    states = {}
+    for p in partials:
+        if p is not None:
+            for key, state in p.passes.items():
+                states.setdefault(key, []).append(state)
+    if not states:
+        return None
+    return Partial({key: _merge_states(s) for key, s in states.items()})
+
+
+def _merge_states(states):
+    if len(states) == 1:
+        return states[0]
+    index = _union_index([s.size.index for s in states])
+    size = _add([s.size.to_frame() for s in states], index)['size']
+    moments, values, hists = {}, {}, {}
+    for s in states:
+        for c, frame in s.moments.items():
+            moments.setdefault(c, []).append(frame)
+        for c, frame in s.values.items():
+            values.setdefault(c, []).append(frame)
+        for k, frame in s.hists.items():
+            hists.setdefault(k, []).append(frame)
+    return GroupState(size,
+                      {c: _merge_moments(f, index) for c, f in moments.items()},
+                      {c: _add(f, index) for c, f in values.items()},
+                      {k: _add(f, index) for k, f in hists.items()})
+
+
+def _union_index(indexes):
+    """Union of group indexes, keeping categorical keys categorical.
+
+    Index.union falls back to plain values when the pieces' categories
+    differ (files read separately), which would change how the groups
+    sort and compare against Registry.run. Those keys are made categorical
+    again over the union of the categories: sorted if every piece's are,
+    else in first-seen order (a CodeTable's numbering).
+    """
+    index = indexes[0]
+    for other in indexes[1:]:
+        index = index.union(other)
+    arrays = [index.get_level_values(i) for i in range(index.nlevels)]
+    restored = False
+    for i, values in enumerate(arrays):
+        parts = [ix.get_level_values(i) for ix in indexes]
+        if (isinstance(values.dtype, pd.CategoricalDtype)
+                or not all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts)):
+            continue
+        categories = parts[0].categories
+        for p in parts[1:]:
+            categories = categories.append(p.categories[~p.categories.isin(categories)])
+        if all(p.categories.is_monotonic_increasing for p in parts):
+            categories = categories.sort_values()
+        arrays[i] = pd.CategoricalIndex(values, categories=categories, name=values.name)
+        restored = True
+    if not restored:
+        return index
+    if isinstance(index, pd.MultiIndex):
+        return pd.MultiIndex.from_arrays(arrays).sort_values()
+    return arrays[0].sort_values()
+
+
+def _add(frames, index):
+    """Sum of count frames, aligned on `index` and on their columns."""
+    columns = frames[0].columns
+    for f in frames[1:]:
+        columns = columns.union(f.columns)
+    out = np.zeros((len(index), len(columns)), dtype=np.int64)
+    for f in frames:
+        rows, cols = index.get_indexer(f.index), columns.get_indexer(f.columns)
+        out[np.ix_(rows, cols)] += f.to_numpy(dtype=np.int64)
+    return pd.DataFrame(out, index=index, columns=columns)
+
+
+def _merge_moments(frames, index):
+    columns = frames[0].columns
+    out = None
+    for frame in frames:
+        # Groups missing from a frame have no values there.
+        part = {k: np.full(len(index), _EMPTY[k]) for k in columns}
+        rows = index.get_indexer(frame.index)
+        for k in columns:
+            part[k][rows] = frame[k].to_numpy()
+        out = part if out is None else _combine(out, part)
+    return pd.DataFrame({k: out[k] for k in columns}, index=index)
+
+
+def _combine(a, b):
+    """Moments of two disjoint sets of values, group by group."""
+    out = {}
+    if 'm2' in a:
+        na, nb = a['count'], b['count']
+        n = na + nb
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = np.where((na > 0) & (nb > 0), b['sum'] / nb - a['sum'] / na, 0.0)
+            out['m2'] = a['m2'] + b['m2'] + np.where(n > 0, delta * delta * na * nb / n, 0.0)
+    for k in ('count', 'sum'):
+        if k in a:
+            out[k] = a[k] + b[k]
+    for k, ufunc in (('min', np.fmin), ('max', np.fmax)):
+        if k in a:
+            out[k] = ufunc(a[k], b[k])
+    return out
+
+
+def _quantile(counts, level):
+    """Per-row quantile (linear interpolation) of a frame of value counts."""
+    values = counts.columns.to_numpy(dtype=np.float64)
+    cum = counts.to_numpy(dtype=np.int64).cumsum(axis=1)
+    n = cum[:, -1] if cum.shape[1] else np.zeros(len(cum), dtype=np.int64)
+    out = np.full(len(cum), np.nan)
+    has = n > 0
+    pos = (n[has] - 1) * level
+    lo, hi = np.floor(pos), np.ceil(pos)
+    # The value at rank r is the first one whose cumulative count exceeds r.
+    below = values[(cum[has] <= lo[:, None]).sum(axis=1)]
+    above = values[(cum[has] <= hi[:, None]).sum(axis=1)]
+    out[has] = below + (above - below) * (pos - lo)
+    return pd.Series(out, index=counts.index)
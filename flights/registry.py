@@ -0,0 +1,197 @@
+# Declarative registry of the summaries computed from the flights data.
+#
+# Each metric (a column, a statistic or bin edges, group keys and whether
+# NaN/0 values are left out) is declared once. Metrics are collected into
+# named result tables, and the planner runs everything in as few passes
+# as possible: the keys of each distinct key set are coded once, and all
+# metrics sharing keys and filter share one Reducer, so each column's
+# values and mask are extracted once no matter how many statistics and
+# histograms use them.
+
+from dataclasses import dataclass
+
+import pandas as pd
+
+from .aggregate import GroupIndex, Reducer
+from .partial import GroupState, Partial
+from .schema import DELAY_COLUMNS
+from .trace import traced
+
+
+@dataclass(frozen=True)
+class Metric:
+    """One column of one result table.
+
+    `bins` (edges, as for pd.cut) makes the metric a histogram, which is a
+    table of its own; otherwise `stat` is any aggregate() statistic.
+    """
+    table: str
+    column: str
+    stat: str = 'mean'
+    keys: tuple = ()
+    nonzero: bool = False
+    bins: tuple = None
+    labels: tuple = None
+    name: str = None
+
+    @property
+    def label(self):
+        return self.name or self.column
+
+
+class Registry:
+    """An ordered collection of Metrics, run together by run()."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, table, column, stat='mean', keys=(), nonzero=False, bins=None,
+            labels=None, name=None):
+        keys = (keys,) if isinstance(keys, str) else tuple(keys)
+        metric = Metric(table, column, stat, keys, nonzero,
+                        None if bins is None else tuple(bins),
+                        None if labels is None else tuple(labels), name)
+        for other in self.metrics:
+            if other.table != table:
+                continue
+            if metric.bins is not None or other.bins is not None:
+                raise ValueError('histogram %r must be a table of its own' % table)
+            if other.keys != keys:
+                raise ValueError('table %r mixes keys %r and %r' % (table, other.keys, keys))
+            if other.label == metric.label:
+                raise ValueError('table %r already has a column %r' % (table, metric.label))
+        self.metrics.append(metric)
+        return metric
+
+    def tables(self):
+        return list(dict.fromkeys(m.table for m in self.metrics))
+
+    def plan(self):
+        """Group the metrics into passes: {(keys, nonzero): [metrics]}."""
+        passes = {}
+        for m in self.metrics:
+            passes.setdefault((m.keys, m.nonzero), []).append(m)
+        return passes
+
+    def columns(self, tables=None):
+        """Every column `tables` (default all) read, keys included."""
+        wanted = self._wanted(tables)
+        out = {}
+        for m in self.metrics:
+            if m.table in wanted:
+                out.update(dict.fromkeys(m.keys + (m.column,)))
+        return list(out)
+
+    @traced('Registry.run')
+    def run(self, df, tables=None):
+        """Compute every table (or just `tables`) and return {table: frame}.
+
+        Stat tables are indexed by their keys with one column per metric;
+        histograms have one row per group and one column per bin. Tables
+        without keys come back as a series (one value per metric or bin).
+        """
+        wanted = self._wanted(tables)
+        columns = {}
+        for _, reducer, metrics in self._passes(df, wanted):
+            observed = reducer.size() > 0
+            for m in metrics:
+                if m.bins is not None:
+                    columns[m] = reducer.histogram_table(df, m.column, m.bins, m.labels)
+                else:
+                    values = reducer.stat(df, m.column, m.stat)
+                    index = reducer.groups.index(observed.nonzero()[0])
+                    columns[m] = pd.Series(values[observed], index=index, name=m.label)
+        return self._tables(columns, wanted)
+
+    @traced('Registry.partial')
+    def partial(self, df, tables=None):
+        """Mergeable state of `tables` over `df`; see flights.partial.
+
+        For data too big for one frame: reduce each piece to a Partial,
+        merge them and finish() the result, which gives the same tables as
+        run() on all the data at once.
+        """
+        wanted = self._wanted(tables)
+        return Partial({key: GroupState.from_reducer(reducer, df, metrics)
+                        for key, reducer, metrics in self._passes(df, wanted)})
+
+    @traced('Registry.finish')
+    def finish(self, partial, tables=None):
+        """Result tables, as from run(), out of a (merged) Partial."""
+        wanted = self._wanted(tables)
+        columns = {}
+        for (keys, nonzero), metrics in self.plan().items():
+            for m in metrics:
+                if m.table not in wanted:
+                    continue
+                state = partial.passes[(keys, nonzero)]
+                if m.bins is not None:
+                    columns[m] = state.histogram(m.column, m.bins, m.labels)
+                else:
+                    columns[m] = state.stat(m.column, m.stat).rename(m.label)
+        return self._tables(columns, wanted)
+
+    def _passes(self, df, wanted):
+        # One Reducer per pass of the plan; passes with the same keys share
+        # the GroupIndex.
+        groups = {}
+        for (keys, nonzero), metrics in self.plan().items():
+            metrics = [m for m in metrics if m.table in wanted]
+            if not metrics:
+                continue
+            if keys not in groups:
+                groups[keys] = GroupIndex(df, keys)
+            yield (keys, nonzero), Reducer(groups[keys], nonzero), metrics
+
+    def _wanted(self, tables):
+        return set(self.tables() if tables is None else tables)
+
+    def _tables(self, columns, wanted):
+        out = {}
+        for table in self.tables():
+            if table not in wanted:
+                continue
+            metrics = [m for m in self.metrics if m.table == table]
+            parts = [columns[m] for m in metrics]
+            frame = parts[0] if metrics[0].bins is not None else pd.concat(parts, axis=1)
+            out[table] = frame if metrics[0].keys else frame.iloc[0].rename(table)
+        return out
+
+
+# Delay length bins, read off the quartiles of the 2008 sample (In[25]-In[46]).
+DELAY_BINS = {
+    'CarrierDelay': ([1, 9, 19, 41, 2436], ['1-8', '9-18', '19-39', '40-1951']),
+    'WeatherDelay': ([1, 11, 25, 57, 1352], ['1-10', '11-24', '25-56', '57-1352']),
+    'NASDelay': ([1, 8, 18, 31, 1357], ['1-7', '8-17', '18-30', '31-1357']),
+    'SecurityDelay': ([1, 7, 13, 22, 392], ['1-6', '7-12', '13-21', '22-392']),
+    'LateAircraftDelay': ([1, 11, 25, 57, 1352], ['1-10', '11-24', '25-56', '57-1352']),
+}
+
+DESCRIBE_STATS = ('count', 'mean', 'std', 'min', 'q25', 'median', 'q75', 'max')
+
+
+def default_registry(bins=None):
+    """The summaries of code.py, declared once each.
+
+    Tables: 'month' and 'weekday' (flight counts and mean of Cancelled and
+    each delay column over all flights), 'delay_month' and 'delay_weekday'
+    (mean delay length, NaN and 0 left out), 'cancellation_month' and
+    'cancellation_weekday' (cancellations by code), '<delay>_describe' and
+    '<delay>_length' (summary statistics and length bins of each delay
+    type, NaN and 0 left out). `bins` maps each delay column to (edges,
+    labels), e.g. from flights.bins.delay_bins; default DELAY_BINS.
+    """
+    r = Registry()
+    for key, suffix in (('Month', 'month'), ('DayOfWeek', 'weekday')):
+        r.add(suffix, 'Cancelled', 'size', keys=key, name='Total_Flights')
+        for column in ['Cancelled'] + DELAY_COLUMNS:
+            r.add(suffix, column, 'mean', keys=key)
+        for column in DELAY_COLUMNS:
+            r.add('delay_' + suffix, column, 'mean', keys=key, nonzero=True)
+        r.add('cancellation_' + suffix, 'Cancelled', 'count', keys=(key, 'CancellationCode'))
+    for column in DELAY_COLUMNS:
+        for stat in DESCRIBE_STATS:
+            r.add(column + '_describe', column, stat, nonzero=True, name=stat)
+        edges, labels = (DELAY_BINS if bins is None else bins)[column]
+        r.add(column + '_length', column, bins=edges, labels=labels, nonzero=True)
+    return r
@@ -0,0 +1,221 @@
+# Headless batch rendering of the report charts.
+#
+# A Chart is a precomputed summary table plus how to draw it (bar, line or
+# pie, title and axis labels). render_report draws every chart to an image
+# file on its own matplotlib Figure with the non-interactive Agg backend -
+# no pyplot state, no display - spreading the charts over a pool of worker
+# processes. Each chart's table and drawing options are hashed, and the
+# hashes are kept in <out_dir>/manifest.json: a chart whose hash and file
+# are unchanged since the last run is not drawn again, so a nightly report
+# only redraws the charts whose data moved.
+#
+#     python -m flights report 2008.csv report/ [--trace trace.json]
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from .labels import with_labels
+from .schema import DELAY_COLUMNS
+from .trace import Tracer, traced
+
+try:
+    import matplotlib
+    from matplotlib.figure import Figure
+except ImportError:
+    matplotlib = Figure = None
+
+MANIFEST = 'manifest.json'
+# Bumped whenever the drawing code changes, so every chart is redrawn.
+REPORT_VERSION = 1
+
+_DELAY_NAMES = {'CarrierDelay': 'Carrier', 'WeatherDelay': 'Weather', 'NASDelay': 'NAS',
+                'SecurityDelay': 'Security', 'LateAircraftDelay': 'Late Aircraft'}
+
+
+@dataclass
+class Chart:
+    """One figure: `table` drawn as a `kind` ('bar', 'line' or 'pie') plot.
+
+    The table's index is the x axis (the slices of a pie); each column of a
+    frame is a series. `options` are passed on to DataFrame.plot.
+    """
+    name: str
+    table: object
+    kind: str = 'bar'
+    title: str = ''
+    xlabel: str = ''
+    ylabel: str = ''
+    figsize: tuple = (15, 8)
+    options: dict = field(default_factory=dict)
+
+    def fingerprint(self):
+        """Hash of the table's contents and of the drawing options."""
+        table = self.table
+        h = hashlib.sha256()
+        h.update(repr((REPORT_VERSION, self.kind, self.title, self.xlabel, self.ylabel,
+                       tuple(self.figsize), sorted(self.options.items()))).encode())
+        columns = [table.name] if isinstance(table, pd.Series) else list(table.columns)
+        h.update(repr((columns, list(table.index.names), str(getattr(table, 'dtypes', ''))))
+                 .encode())
+        h.update(pd.util.hash_pandas_object(table, index=True).to_numpy().tobytes())
+        return h.hexdigest()
+
+
+@traced('render_report')
+def render_report(charts, out_dir, workers=None, fmt='png', force=False):
+    """Draw `charts` to <out_dir>/<name>.<fmt>; returns {name: status}.
+
+    Status is 'rendered', or 'unchanged' for charts skipped because neither
+    their table nor their options changed (pass `force` to redraw them).
+    `workers` processes draw in parallel (default: one per CPU; 1 draws in
+    this process).
+    """
+    _require_matplotlib()
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = _read_manifest(out_dir)
+    status, todo = {}, []
+    for chart in charts:
+        path = os.path.join(out_dir, '%s.%s' % (chart.name, fmt))
+        digest = chart.fingerprint()
+        entry = manifest.get(chart.name, {})
+        if (not force and entry.get('hash') == digest
+                and entry.get('file') == os.path.basename(path) and os.path.exists(path)):
+            status[chart.name] = 'unchanged'
+        else:
+            todo.append((chart, path, digest))
+    workers = os.cpu_count() if workers is None else workers
+    if workers <= 1 or len(todo) <= 1:
+        for chart, path, _ in todo:
+            render_chart(chart, path)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo)),
+                                 initializer=_use_agg) as pool:
+            for _ in pool.map(render_chart, [t[0] for t in todo], [t[1] for t in todo]):
+                pass
+    for chart, path, digest in todo:
+        manifest[chart.name] = {'hash': digest, 'file': os.path.basename(path)}
+        status[chart.name] = 'rendered'
+    _write_manifest(out_dir, manifest)
+    return status
+
+
+@traced('render_chart')
+def render_chart(chart, path):
+    """Draw one chart to `path` (format from the extension)."""
+    _require_matplotlib()
+    fig = Figure(figsize=chart.figsize)
+    ax = fig.subplots()
+    table = chart.table
+    options = dict(chart.options)
+    if chart.kind == 'pie':
+        table.plot(kind='pie', ax=ax, **options)
+        ax.set_ylabel('')
+    else:
+        if isinstance(table, pd.Series) or table.shape[1] == 1:
+            options.setdefault('color', 'teal')
+            options.setdefault('legend', False)
+        table.plot(kind=chart.kind, ax=ax, **options)
+        ax.set_xlabel(chart.xlabel)
+        ax.set_ylabel(chart.ylabel)
+    ax.set_title(chart.title)
+    fig.savefig(path, bbox_inches='tight')
+    return path
+
+
+def report_charts(results):
+    """The charts of code.py, from the tables of default_registry().run()."""
+    month, weekday = with_labels(results['month']), with_labels(results['weekday'])
+    charts = [
+        Chart('flights_month', month['Total_Flights'], title='Total Flights by Month',
+              ylabel='Total Flights', figsize=(8, 6)),
+        Chart('flights_weekday', weekday['Total_Flights'], title='Total Flights by Day of Week',
+              ylabel='Total Flights', figsize=(8, 6)),
+    ]
+    flights = month['Total_Flights'].sum()
+    cancelled = (month['Total_Flights'] * month['Cancelled']).sum()
+    share = pd.Series([flights - cancelled, cancelled], name='Flights',
+                      index=['Not Cancelled', 'Cancelled'])
+    charts.append(Chart('cancelled_share', share, kind='pie', figsize=(8, 8),
+                        title='Percentage of Flights that are Cancelled',
+                        options={'autopct': '%1.1f%%'}))
+    for c in DELAY_COLUMNS:
+        charts.append(Chart('%s_length' % c, results[c + '_length'], figsize=(8, 8),
+                            title='Length of %s Delay' % _DELAY_NAMES[c],
+                            xlabel='Length of Delay (min)', ylabel='Count'))
+    for table, key, label in ((month, 'month', 'Month'), (weekday, 'weekday', 'Day of Week')):
+        charts.append(Chart('cancelled_' + key, table['Cancelled'], xlabel=label,
+                            title='Average Flight Cancellations by %s' % label,
+                            ylabel='Cancellations'))
+        for c in DELAY_COLUMNS:
+            name = _DELAY_NAMES[c]
+            charts.append(Chart('%s_%s' % (c, key), table[c], xlabel=label,
+                                title='Average Length of %s Delays by %s' % (name, label),
+                                ylabel='%s Delays (in minutes)' % name))
+        codes = with_labels(results['cancellation_' + key]['Cancelled'])
+        codes = codes.unstack('CancellationCode').sort_index(axis=1)
+        charts.append(Chart('cancellation_codes_' + key, codes, xlabel=label,
+                            title='Cancellations by Type and %s' % label,
+                            ylabel='Cancellations'))
+        charts.append(Chart('delay_length_' + key, with_labels(results['delay_' + key]),
+                            kind='line', xlabel=label, ylabel='Minutes',
+                            title='Average Flight Delay Length by %s' % label))
+    return charts
+
+
+def main(argv=None):
+    from .cache import load_flights
+    from .registry import default_registry
+    from .bins import delay_bins
+
+    parser = argparse.ArgumentParser(prog='python -m flights report',
+                                     description='Render the flights report charts to files.')
+    parser.add_argument('csv')
+    parser.add_argument('out_dir')
+    parser.add_argument('--workers', type=int, help='worker processes (default: one per CPU)')
+    parser.add_argument('--format', default='png')
+    parser.add_argument('--force', action='store_true', help='redraw unchanged charts too')
+    parser.add_argument('--trace', metavar='PATH',
+                        help='write a Chrome trace of the stages to PATH and print a summary')
+    args = parser.parse_args(argv)
+    tracer = Tracer().start() if args.trace else None
+    df = load_flights(args.csv)
+    results = default_registry(bins=delay_bins(df, seed=0)).run(df)
+    status = render_report(report_charts(results), args.out_dir, args.workers, args.format,
+                           args.force)
+    rendered = sum(s == 'rendered' for s in status.values())
+    print('%d charts rendered, %d unchanged' % (rendered, len(status) - rendered))
+    if tracer is not None:
+        tracer.stop().save(args.trace)
+        print(tracer.summary().to_string())
+
+
+def _use_agg():
+    matplotlib.use('Agg')
+
+
+def _read_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return saved.get('charts', {}) if saved.get('version') == REPORT_VERSION else {}
+
+
+def _write_manifest(out_dir, charts):
+    fd, tmp = tempfile.mkstemp(dir=out_dir, suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'version': REPORT_VERSION, 'charts': charts}, f, indent=1)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST))
+
+
+def _require_matplotlib():
+    if Figure is None:
+        raise ImportError('rendering the report needs matplotlib: pip install matplotlib')
@@ -0,0 +1,219 @@
+# Persistent, content-addressed cache of computed results.
+#
+# A result is stored under a key that hashes everything it was computed
+# from: a fingerprint of the input data (a file's digest or size and mtime,
+# plus the range of rows used) and the analysis spec (for registry tables,
+# the Metrics that make them up). Unchanged inputs and spec give the same
+# key, so the result is loaded instead of recomputed; any change gives a
+# new key, so a stale result is never returned. Entries are pickles under
+# <root>/<key[:2]>/<key>.pkl, and index.json records their sizes and when
+# they were last used: once the entries outgrow `max_bytes` the least
+# recently used are evicted.
+#
+# cached_results computes the registry tables of a flights CSV month by
+# month through the Parquet cache. Each month's partial aggregates are
+# keyed on the digest of that month's Parquet file, whose bytes depend only
+# on that month's rows (see cache.build_cache), so when one month's data
+# changes only that month is reduced again and the partials are merged as
+# in flights.history.
+#
+# The .pkl files are pickles written by this module; only open caches you
+# created.
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+
+from .cache import _month_file, _months_in, build_cache, cache_path, is_fresh, read_cache
+from .partial import merge_all
+from .registry import default_registry
+from .trace import traced
+
+RESULTS_DIR = '.flights_results'
+INDEX = 'index.json'
+RESULTS_VERSION = 2
+DEFAULT_MAX_BYTES = 512 << 20
+
+_MISSING = object()
+
+
+class ResultCache:
+    """On-disk cache of picklable results, LRU-bounded to `max_bytes`."""
+
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+        self.index = self._read_index()
+
+    def __contains__(self, key):
+        return key in self.index['entries'] and os.path.exists(self._path(key))
+
+    def __len__(self):
+        return len(self.index['entries'])
+
+    @property
+    def size(self):
+        """Total bytes of the stored entries."""
+        return sum(e['size'] for e in self.index['entries'].values())
+
+    @staticmethod
+    def key(data, spec, rows=None):
+        """Key of the result of `spec` over `rows` (start, stop) of `data`.
+
+        `data` and `spec` are anything JSON-serialisable that identifies
+        them, e.g. source_fingerprint(csv) and a list of metric reprs.
+        """
+        blob = json.dumps({'version': RESULTS_VERSION, 'data': data,
+                           'rows': None if rows is None else list(rows), 'spec': spec},
+                          sort_keys=True, default=repr)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def get(self, key, default=None):
+        """The result stored under `key`, or `default`."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except OSError:
+            self.index['entries'].pop(key, None)
+            return default
+        except (EOFError, pickle.UnpicklingError, ValueError, AttributeError, ImportError):
+            # Truncated or corrupt, or pickled by code that has since
+            # changed: a miss, and the entry is dropped.
+            self._remove(key)
+            self._write_index()
+            return default
+        if key not in self.index['entries']:
+            # Written by another process since the index was read, or the
+            # index was lost: register the entry again.
+            self.index['entries'][key] = {'size': os.path.getsize(path)}
+        self._touch(key)
+        self._write_index()
+        return value
+
+    def put(self, key, value):
+        """Store `value` under `key`, evicting old entries if over the bound."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        self.index['entries'][key] = {'size': os.path.getsize(path)}
+        self._touch(key)
+        self._evict(keep=key)
+        self._write_index()
+        return value
+
+    def get_or_compute(self, key, compute):
+        """The result under `key`, computing and storing it with compute() if absent."""
+        value = self.get(key, _MISSING)
+        return self.put(key, compute()) if value is _MISSING else value
+
+    def clear(self):
+        """Remove every entry."""
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+        self.index = {'version': RESULTS_VERSION, 'clock': 0, 'entries': {}}
+        self._write_index()
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + '.pkl')
+
+    def _touch(self, key):
+        # A counter rather than a clock, so the order does not depend on
+        # timestamps.
+        self.index['clock'] += 1
+        self.index['entries'][key]['used'] = self.index['clock']
+
+    def _evict(self, keep):
+        entries = self.index['entries']
+        total = sum(e['size'] for e in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]['used']):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= entries[key]['size']
+            self._remove(key)
+
+    def _remove(self, key):
+        self.index['entries'].pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _read_index(self):
+        try:
+            with open(os.path.join(self.root, INDEX)) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = None
+        if not index or index.get('version') != RESULTS_VERSION:
+            index = {'version': RESULTS_VERSION, 'clock': 0, 'entries': {}}
+        return index
+
+    def _write_index(self):
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp, os.path.join(self.root, INDEX))
+
+
+@traced('cached_results')
+def cached_results(csv_path, registry=None, tables=None, cache=None, cache_dir=None):
+    """Registry tables of a flights CSV, reusing results of unchanged months.
+
+    Like `registry.run(load_flights(csv_path))` (default_registry() unless
+    given). `cache` is a ResultCache, by default one in .flights_results
+    next to the CSV. When nothing changed the finished tables are loaded
+    as they are; otherwise only the months whose data changed are read and
+    reduced.
+    """
+    registry = default_registry() if registry is None else registry
+    if cache is None:
+        cache = ResultCache(os.path.join(os.path.dirname(os.path.abspath(csv_path)),
+                                         RESULTS_DIR))
+    path = cache_path(csv_path, cache_dir)
+    if not is_fresh(csv_path, cache_dir):
+        build_cache(csv_path, cache_dir)
+    spec = registry_spec(registry, tables)
+    months = {m: file_digest(os.path.join(path, _month_file(m))) for m in _months_in(path)}
+    keys = {m: cache.key({'parquet': digest}, spec + ['partial']) for m, digest in months.items()}
+
+    def partials():
+        columns = registry.columns(tables)
+        for m, key in keys.items():
+            yield cache.get_or_compute(
+                key, lambda m=m: registry.partial(read_cache(path, columns, [m]), tables))
+
+    def finish():
+        return registry.finish(merge_all(list(partials())), tables)
+
+    return cache.get_or_compute(cache.key(sorted(keys.values()), spec + ['tables']), finish)
+
+
+def registry_spec(registry, tables=None):
+    """JSON-able description of the metrics behind `tables`, for keys."""
+    wanted = registry._wanted(tables)
+    return [repr(m) for m in registry.metrics if m.table in wanted]
+
+
+def file_digest(path, blocksize=1 << 20):
+    """sha256 of a file's contents."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(blocksize), b''):
+            h.update(block)
+    return h.hexdigest()
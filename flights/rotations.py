@@ -0,0 +1,152 @@
+# Aircraft rotations: the legs each TailNum flies in a day, in order.
+#
+# LateAircraftDelay is the delay a flight inherits from the previous leg of
+# the same aircraft. Sorting the flights once by (day, TailNum, scheduled
+# departure) puts every aircraft-day in one contiguous run of rows, so the
+# previous leg of a flight is simply the row before it when both belong to
+# the same run. Everything else - leg numbers, the inbound delay, how much
+# of it was carried into the departure, propagation chains and the
+# aircraft's cumulative delay through the day - is then a shift, a
+# comparison or a cumulative sum over the sorted arrays, with no per-group
+# Python work.
+#
+# Cancelled flights never leave the gate and are not part of a rotation;
+# neither are flights without a tail number or with one of the placeholder
+# tail numbers in PLACEHOLDER_TAILS.
+
+import numpy as np
+import pandas as pd
+
+from .times import MINUTES_PER_DAY, minutes
+from .trace import traced
+
+ROTATION_KEYS = ['Year', 'Month', 'DayofMonth', 'TailNum']
+
+# Tail numbers the RITA files use for "unknown"; many unrelated aircraft
+# share them, so they are not linked.
+PLACEHOLDER_TAILS = ('0', '000000')
+
+
+@traced('rotations')
+def rotations(df):
+    """Rotation of each flight of `df`, as a frame aligned with it.
+
+    Columns:
+
+    - Leg: 1 for an aircraft's first flight of the day, 2 for the next, ...
+      (0 for flights that are not part of a rotation, see above)
+    - PrevRow: position (for iloc) of the aircraft's previous leg, or -1
+    - InboundDelay: arrival delay of the previous leg
+    - Propagated: minutes of the departure delay the late inbound aircraft
+      accounts for, min(inbound arrival delay, departure delay), both
+      counted from 0
+    - Chain: number of the delay propagation chain the flight belongs to;
+      a chain starts at a leg that did not inherit delay and continues
+      through every following leg of the aircraft that did (-1 off rotation)
+    - CumulativeDelay: the aircraft's arrival delay summed over its legs
+      of the day so far, this one included (early arrivals count as 0)
+    """
+    n = len(df)
+    rows = np.flatnonzero(_in_rotation(df))
+    day = ((df['Year'].to_numpy(dtype=np.int64)[rows] * 13
+            + df['Month'].to_numpy(dtype=np.int64)[rows]) * 32
+           + df['DayofMonth'].to_numpy(dtype=np.int64)[rows])
+    tail = df['TailNum'].cat.codes.to_numpy(dtype=np.int64)[rows]
+    # One int64 sort key instead of a three-key lexsort.
+    scheduled = _scheduled_departure(df)[rows]
+    if len(rows):
+        day -= day.min()
+    key = (day * len(df['TailNum'].cat.categories) + tail) * (MINUTES_PER_DAY + 1) + scheduled
+    order = np.argsort(key, kind='stable')
+    rows, day, tail = rows[order], day[order], tail[order]
+
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = (day[1:] != day[:-1]) | (tail[1:] != tail[:-1])
+    starts = np.flatnonzero(first)
+    run = np.cumsum(first) - 1
+    leg = np.arange(len(rows)) - starts[run] + 1
+    prev = np.where(first, -1, np.roll(rows, 1))
+
+    arrival = _delays(df, 'ArrDelay')[rows]
+    inbound = np.where(first, np.nan, np.roll(arrival, 1))
+    departure = _delays(df, 'DepDelay')[rows]
+    propagated = np.fmin(np.fmax(inbound, 0), np.fmax(departure, 0))
+    propagated = np.nan_to_num(propagated)
+    chain = np.cumsum(first | (propagated <= 0)) - 1
+
+    late = np.nan_to_num(np.fmax(arrival, 0))
+    total = np.cumsum(late)
+    cumulative = total - (total - late)[starts][run]
+
+    out = {'Leg': (np.int16, 0, leg), 'PrevRow': (np.int64, -1, prev),
+           'InboundDelay': (np.float64, np.nan, inbound),
+           'Propagated': (np.float64, np.nan, propagated),
+           'Chain': (np.int64, -1, chain),
+           'CumulativeDelay': (np.float64, np.nan, cumulative)}
+    columns = {}
+    for name, (dtype, fill, values) in out.items():
+        column = np.full(n, fill, dtype=dtype)
+        column[rows] = values
+        columns[name] = column
+    return pd.DataFrame(columns, index=df.index)
+
+
+def delay_chains(df, rotation=None, min_legs=2):
+    """One row per delay propagation chain of at least `min_legs` legs.
+
+    Columns: the ROTATION_KEYS of the chain, Legs, RootDelay (arrival
+    delay of the leg that started it), Propagated (minutes passed on along
+    the chain, summed over its legs) and ArrDelay (arrival delay of its
+    last leg). `rotation` is rotations(df), computed if not given. Sorted
+    by Propagated, largest first.
+    """
+    if rotation is None:
+        rotation = rotations(df)
+    chain = rotation['Chain'].to_numpy()
+    rows = np.flatnonzero(chain >= 0)
+    chain = chain[rows]
+    nchains = int(chain.max()) + 1 if len(chain) else 0
+    legs = np.bincount(chain, minlength=nchains)
+    propagated = np.bincount(chain, rotation['Propagated'].to_numpy()[rows], minlength=nchains)
+    # A chain's legs are consecutive legs of one aircraft: it starts at the
+    # leg whose previous leg is in another chain (or missing) and ends
+    # Legs - 1 legs later.
+    leg = rotation['Leg'].to_numpy()[rows]
+    prev = rotation['PrevRow'].to_numpy()[rows]
+    all_chains = rotation['Chain'].to_numpy()
+    start = (prev < 0) | (all_chains[np.maximum(prev, 0)] != chain)
+    first, head = np.zeros(nchains, dtype=np.int64), np.zeros(nchains, dtype=np.int64)
+    first[chain[start]], head[chain[start]] = leg[start], rows[start]
+    last = np.zeros(nchains, dtype=np.int64)
+    end = leg - first[chain] == legs[chain] - 1
+    last[chain[end]] = rows[end]
+    keep = np.flatnonzero(legs >= min_legs)
+    head, tail = head[keep], last[keep]
+    arrival = _delays(df, 'ArrDelay')
+    out = df.iloc[head][ROTATION_KEYS].reset_index(drop=True)
+    out['Legs'] = legs[keep]
+    out['RootDelay'] = arrival[head]
+    out['Propagated'] = propagated[keep]
+    out['ArrDelay'] = arrival[tail]
+    return out.sort_values('Propagated', ascending=False, kind='stable', ignore_index=True)
+
+
+def _in_rotation(df):
+    tail = df['TailNum']
+    if not isinstance(tail.dtype, pd.CategoricalDtype):
+        raise TypeError('TailNum must be categorical; load the data with flights.read_flights')
+    placeholder = np.append(tail.cat.categories.isin(PLACEHOLDER_TAILS), True)
+    keep = ~placeholder[tail.cat.codes.to_numpy()]
+    if 'Cancelled' in df:
+        keep &= df['Cancelled'].to_numpy() == 0
+    return keep
+
+
+def _scheduled_departure(df):
+    if 'CRSDepMinutes' in df:
+        return df['CRSDepMinutes'].to_numpy(dtype=np.int64)
+    return minutes(df['CRSDepTime']).to_numpy(dtype=np.int64)
+
+
+def _delays(df, column):
+    return df[column].to_numpy(dtype=np.float64, na_value=np.nan)
@@ -0,0 +1,129 @@
+# Route (Origin -> Dest) statistics over a packed integer pair index.
+#
+# Grouping by two string columns hashes every row twice. Here each airport
+# gets one integer code shared by Origin and Dest (the codes of a CodeTable
+# are used as they are; otherwise the two columns' categories are merged),
+# so a route is the single int origin * n + dest. The n * n possible pairs
+# are a dense lookup table of a few hundred thousand entries that renumbers
+# the occupied routes 0 .. routes - 1 in one take, and every statistic of
+# every route is then a bincount (or a single sort for quantiles) through
+# aggregate.Reducer. Top-k queries pick the k routes with argpartition
+# instead of sorting all of them.
+
+import numpy as np
+import pandas as pd
+
+from .aggregate import GroupIndex, Reducer
+from .schema import DELAY_COLUMNS
+from .trace import traced
+
+ROUTE_KEYS = ['Origin', 'Dest']
+ROUTE_STATS = ('count', 'mean', 'median', 'q90')
+
+
+class RouteIndex(GroupIndex):
+    """GroupIndex over (Origin, Dest) numbering the routes that occur.
+
+    Routes are numbered in (Origin, Dest) order over all rows of `df`;
+    rows outside `where` (see route_stats) get -1 like rows with a
+    missing airport, so they drop out of every statistic.
+    """
+
+    def __init__(self, df, where=None):
+        airports, origin, dest = _airport_codes(df['Origin'], df['Dest'])
+        n = len(airports)
+        self.keys = list(ROUTE_KEYS)
+        self.levels = [airports, airports]
+        self.shape = (n, n)
+        missing = (origin < 0) | (dest < 0)
+        pair = np.where(missing, 0, origin * n + dest)
+        occupied = np.bincount(pair[~missing], minlength=n * n) > 0
+        self._combos = np.flatnonzero(occupied)
+        self.ngroups = len(self._combos)
+        lookup = np.cumsum(occupied) - 1
+        if where is not None:
+            missing |= ~_where_mask(df, where)
+        self.codes = np.where(missing, -1, lookup[pair])
+
+
+@traced('route_stats')
+def route_stats(df, columns=DELAY_COLUMNS, stats=ROUTE_STATS, where=None, nonzero=True):
+    """One row per route: flights, cancellation rate and stats of each delay.
+
+    `where` maps columns to the values to keep, e.g. {'Month': [2]}, or is
+    a boolean mask over the rows. Columns are 'Total_Flights', 'Cancelled'
+    (the cancelled fraction) and '<column>_<stat>' for each of `columns`
+    and `stats` (any of aggregate.STATS or 'qNN'). As in delay_summary,
+    delays of 0 are left out unless `nonzero` is False.
+    """
+    groups = RouteIndex(df, where)
+    plain, delays = Reducer(groups), Reducer(groups, nonzero)
+    size = plain.size()
+    observed = np.flatnonzero(size)
+    out = {'Total_Flights': size[observed]}
+    if 'Cancelled' in df:
+        out['Cancelled'] = plain.stat(df, 'Cancelled', 'mean')[observed]
+    for c in columns:
+        reducer = delays if c in DELAY_COLUMNS else plain
+        for stat in stats:
+            out['%s_%s' % (c, stat)] = reducer.stat(df, c, stat)[observed]
+    return pd.DataFrame(out, index=groups.index(observed))
+
+
+def top_routes(df, column, stat='mean', k=50, where=None, min_flights=1, ascending=False,
+               nonzero=True):
+    """The k routes with the largest (or, `ascending`, smallest) `stat`.
+
+    Only `stat` of `column` is computed. Routes with fewer than
+    `min_flights` flights (after `where`) or no value are left out, so a
+    single late flight does not make a route the worst one. Sorted worst
+    first, ties in (Origin, Dest) order; e.g. the 50 worst routes by
+    late-aircraft delay in February:
+
+        top_routes(df, 'LateAircraftDelay', k=50, where={'Month': [2]})
+    """
+    groups = RouteIndex(df, where)
+    plain = Reducer(groups)
+    reducer = Reducer(groups, nonzero) if column in DELAY_COLUMNS else plain
+    size = plain.size()
+    values = reducer.stat(df, column, stat).astype(np.float64)
+    candidates = np.flatnonzero((size >= max(min_flights, 1)) & ~np.isnan(values))
+    keyed = values[candidates] if ascending else -values[candidates]
+    if 0 < k < len(candidates):
+        # Every route tied with the k-th is kept, so that ties are broken
+        # by route order below rather than by where argpartition put them.
+        within = keyed <= np.partition(keyed, k - 1)[k - 1]
+        candidates, keyed = candidates[within], keyed[within]
+    chosen = candidates[np.argsort(keyed, kind='stable')[:k]]
+    return pd.DataFrame({'Total_Flights': size[chosen],
+                         '%s_%s' % (column, stat): values[chosen]},
+                        index=groups.index(chosen))
+
+
+def _airport_codes(origin, dest):
+    """(airports, origin codes, dest codes) over one shared numbering."""
+    origin, dest = _categorical(origin), _categorical(dest)
+    if origin.dtype == dest.dtype:
+        airports = pd.CategoricalIndex(origin.cat.categories, dtype=origin.dtype)
+        return (airports, origin.cat.codes.to_numpy(dtype=np.int64),
+                dest.cat.codes.to_numpy(dtype=np.int64))
+    categories = origin.cat.categories.union(dest.cat.categories)
+    dtype = pd.CategoricalDtype(categories)
+    codes = []
+    for s in (origin, dest):
+        mapping = np.append(categories.get_indexer(s.cat.categories), -1)
+        codes.append(mapping[s.cat.codes.to_numpy(dtype=np.int64)])
+    return pd.CategoricalIndex(categories, dtype=dtype), codes[0], codes[1]
+
+
+def _categorical(series):
+    return series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+
+
+def _where_mask(df, where):
+    if isinstance(where, dict):
+        keep = np.ones(len(df), dtype=bool)
+        for column, values in where.items():
+            keep &= df[column].isin(list(np.atleast_1d(values))).to_numpy()
+        return keep
+    return np.asarray(where, dtype=bool)
@@ -0,0 +1,187 @@
+# Seeded sampling of a flights CSV without loading the whole file.
+#
+# Every row gets a uniform random key and the sample is the n rows with the
+# smallest keys (per stratum, for a stratified sample). Only the current
+# best n rows and one chunk are ever in memory. The keys are drawn from one
+# numpy Generator in file order, so a seed gives the same sample whatever
+# the chunk size.
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .load import CHUNKSIZE, concat_frames, iter_flights
+
+
+@dataclass
+class Sample:
+    """A sample and the inverse-probability weight of each stratum.
+
+    `weights` has one row per stratum (a single row for a uniform sample)
+    with the stratum's population size, sample size and weight =
+    population / sampled (inf for a stratum left out of the sample, see
+    `excluded`).
+    """
+    frame: pd.DataFrame
+    weights: pd.DataFrame
+    strata: list
+
+    def row_weights(self):
+        """Weight of every sampled row, aligned with `frame`."""
+        if not self.strata:
+            return pd.Series(self.weights['weight'].iloc[0], index=self.frame.index,
+                             name='weight')
+        stratum = _stratum_of(self.weights.index, self.frame, self.strata)
+        w = self.weights['weight'].to_numpy()[stratum]
+        return pd.Series(w, index=self.frame.index, name='weight')
+
+    @property
+    def excluded(self):
+        """Index of the non-empty strata with no sampled row.
+
+        Only possible when `n` is smaller than the number of strata.
+        """
+        w = self.weights
+        return w.index[(w['population'] > 0) & (w['sampled'] == 0)]
+
+    def mean(self, column):
+        """Weighted (unbiased for the population) mean of `column`.
+
+        Raises ValueError when strata were left out of the sample, since
+        their flights would silently be missing from the estimate.
+        """
+        if len(self.excluded):
+            strata = int((self.weights['population'] > 0).sum())
+            raise ValueError('%d non-empty strata have no sampled flight; sample at least '
+                             'one per stratum (n >= %d)' % (len(self.excluded), strata))
+        values = self.frame[column].astype('float64')
+        w = self.row_weights()[values.notna()]
+        return float((values.dropna() * w).sum() / w.sum())
+
+
+def sample_flights(path, n, seed=None, strata=None, columns=None, chunksize=CHUNKSIZE):
+    """Draw `n` rows from the CSV at `path` in one streaming pass.
+
+    With `strata` (e.g. ['Month', 'DayOfWeek', 'UniqueCarrier']) the
+    sample is stratified with proportional allocation: each non-empty
+    stratum gets one row and then its share of the rest of `n`, rounded by
+    largest remainder, and a simple random sample within it. If `n` is
+    smaller than the number of strata some get none; see Sample.excluded.
+    Proportional allocation needs the stratum sizes before sampling
+    starts, so the strata columns alone are counted first; that pre-pass
+    reads a few small columns and keeps one count per stratum.
+
+    The returned Sample's frame is in file order and indexed by row
+    number in the file, like DataFrame.sample. It holds `columns` (default
+    all) plus the strata columns.
+    """
+    strata = [strata] if isinstance(strata, str) else list(strata or [])
+    if strata:
+        population = _stratum_sizes(path, strata, chunksize)
+        quota = _allocate(n, population.to_numpy())
+    else:
+        population = None
+        quota = np.array([n])
+
+    rng = np.random.default_rng(seed)
+    kept = None
+    kept_keys = np.empty(0)
+    kept_strata = np.empty(0, dtype=np.int64)
+    kept_rows = np.empty(0, dtype=np.int64)
+    threshold = np.ones(len(quota))
+    offset = 0
+    read = None if columns is None else list(dict.fromkeys([*columns, *strata]))
+    for chunk in iter_flights(path, read, chunksize):
+        rows = np.arange(offset, offset + len(chunk))
+        offset += len(chunk)
+        keys = rng.random(len(chunk))
+        if strata:
+            stratum = _stratum_of(population.index, chunk, strata)
+        else:
+            stratum = np.zeros(len(chunk), dtype=np.int64)
+
+        # Rows whose key is above the current cut-off of a full stratum
+        # can never make it into the sample.
+        take = keys < threshold[stratum]
+        if not take.any():
+            continue
+        pieces = [chunk[take]] if kept is None else [kept, chunk[take]]
+        kept = concat_frames(pieces)
+        kept_keys = np.concatenate([kept_keys, keys[take]])
+        kept_strata = np.concatenate([kept_strata, stratum[take]])
+        kept_rows = np.concatenate([kept_rows, rows[take]])
+
+        keep = _smallest_per_stratum(kept_keys, kept_strata, quota)
+        kept = kept.iloc[keep]
+        kept_keys, kept_strata, kept_rows = kept_keys[keep], kept_strata[keep], kept_rows[keep]
+        full = np.bincount(kept_strata, minlength=len(quota)) >= quota
+        threshold = np.ones(len(quota))
+        if full.any():
+            top = np.zeros(len(quota))
+            np.maximum.at(top, kept_strata, kept_keys)
+            threshold[full] = top[full]
+
+    if kept is None:
+        kept = concat_frames([])
+    order = np.argsort(kept_rows, kind='stable')
+    frame = kept.iloc[order]
+    frame.index = pd.Index(kept_rows[order])
+
+    if strata:
+        sampled = np.bincount(kept_strata, minlength=len(quota))
+        weights = pd.DataFrame({'population': population.to_numpy(), 'sampled': sampled},
+                               index=population.index)
+    else:
+        weights = pd.DataFrame({'population': [offset], 'sampled': [len(frame)]})
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weights['weight'] = weights['population'] / weights['sampled']
+    return Sample(frame, weights, strata)
+
+
+def _stratum_sizes(path, strata, chunksize):
+    counts = None
+    for chunk in iter_flights(path, strata, chunksize):
+        c = chunk.value_counts(subset=strata, sort=False, dropna=False)
+        counts = c if counts is None else counts.add(c, fill_value=0)
+    if counts is None:
+        return pd.Series(dtype=np.int64)
+    return counts.astype(np.int64).sort_index()
+
+
+def _stratum_of(index, chunk, strata):
+    # DataFrame.value_counts gives a MultiIndex even for a single column.
+    rows = pd.MultiIndex.from_frame(chunk[strata])
+    return index.get_indexer(rows).astype(np.int64)
+
+
+def _allocate(n, sizes):
+    """Split n over strata in proportion to sizes, by largest remainder.
+
+    Every non-empty stratum gets at least one when n allows it, so that no
+    stratum is missing from the weighted estimates.
+    """
+    total = sizes.sum()
+    if total <= n:
+        return sizes.copy()
+    base = np.zeros_like(sizes)
+    if n >= np.count_nonzero(sizes):
+        base = (sizes > 0).astype(sizes.dtype)
+    # The rest is shared in proportion to what each stratum has left, which
+    # never rounds a stratum above its size.
+    rest, left = n - base.sum(), sizes - base
+    exact = rest * left / left.sum()
+    quota = np.floor(exact).astype(np.int64)
+    short = rest - quota.sum()
+    if short:
+        quota[np.argsort(quota - exact, kind='stable')[:short]] += 1
+    return np.minimum(base + quota, sizes)
+
+
+def _smallest_per_stratum(keys, strata, quota):
+    """Positions of the quota[s] smallest keys within each stratum s."""
+    order = np.lexsort((keys, strata))
+    ordered = strata[order]
+    starts = np.searchsorted(ordered, ordered, side='left')
+    rank = np.arange(len(order)) - starts
+    return np.sort(order[rank < quota[ordered]])
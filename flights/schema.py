@@ -0,0 +1,69 @@
+# Column schema for the RITA on-time performance files (one CSV per year).
+# The order and names follow the variable table at the top of code.py.
+
+COLUMNS = [
+    'Year', 'Month', 'DayofMonth', 'DayOfWeek',
+    'DepTime', 'CRSDepTime', 'ArrTime', 'CRSArrTime',
+    'UniqueCarrier', 'FlightNum', 'TailNum',
+    'ActualElapsedTime', 'CRSElapsedTime', 'AirTime',
+    'ArrDelay', 'DepDelay',
+    'Origin', 'Dest', 'Distance',
+    'TaxiIn', 'TaxiOut',
+    'Cancelled', 'CancellationCode', 'Diverted',
+    'CarrierDelay', 'WeatherDelay', 'NASDelay', 'SecurityDelay', 'LateAircraftDelay',
+]
+
+DELAY_COLUMNS = ['CarrierDelay', 'WeatherDelay', 'NASDelay', 'SecurityDelay', 'LateAircraftDelay']
+
+# String codes, kept as categoricals.
+CODE_COLUMNS = ['UniqueCarrier', 'TailNum', 'Origin', 'Dest', 'CancellationCode']
+
+# Small ints for the calendar and flag columns, nullable Int16 for anything
+# that is missing on cancelled or diverted flights. Every value in the
+# 1987-2008 files fits in 16 bits (hhmm times top out at 2400, delays and
+# distances stay under 5000).
+DTYPES = {
+    'Year': 'int16',
+    'Month': 'int8',
+    'DayofMonth': 'int8',
+    'DayOfWeek': 'int8',
+    'DepTime': 'Int16',
+    'CRSDepTime': 'int16',
+    'ArrTime': 'Int16',
+    'CRSArrTime': 'int16',
+    'UniqueCarrier': 'category',
+    'FlightNum': 'int16',
+    'TailNum': 'category',
+    'ActualElapsedTime': 'Int16',
+    'CRSElapsedTime': 'Int16',
+    'AirTime': 'Int16',
+    'ArrDelay': 'Int16',
+    'DepDelay': 'Int16',
+    'Origin': 'category',
+    'Dest': 'category',
+    'Distance': 'int16',
+    'TaxiIn': 'Int16',
+    'TaxiOut': 'Int16',
+    'Cancelled': 'int8',
+    'CancellationCode': 'category',
+    'Diverted': 'int8',
+    'CarrierDelay': 'Int16',
+    'WeatherDelay': 'Int16',
+    'NASDelay': 'Int16',
+    'SecurityDelay': 'Int16',
+    'LateAircraftDelay': 'Int16',
+}
+
+# Columns computed from the ones above when a CSV is converted to the
+# Parquet cache (flights.cache), so later runs don't recompute them.
+DERIVED_DTYPES = {
+    'DayOfYear': 'int16',
+    'DepMinutes': 'Int16',
+    'CRSDepMinutes': 'int16',
+    'ArrMinutes': 'Int16',
+    'CRSArrMinutes': 'int16',
+    'Overnight': 'int8',
+    'ArrOvernight': 'int8',
+    'DepHour': 'int8',
+    'ArrHour': 'int8',
+}
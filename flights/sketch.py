@@ -0,0 +1,155 @@
+# Mergeable quantile sketches, for bin edges without sorting whole columns.
+#
+# A KLL sketch (Karnin, Lang and Liberty, "Optimal Quantile Approximation in
+# Streams", 2016) keeps a few hundred of the values it has seen in a stack
+# of levels; a value on level h stands for 2**h of the original ones. When
+# a level outgrows its capacity it is sorted and every other value, from a
+# random offset, is promoted to the next level. Sketches of separate
+# chunks, files or worker processes merge by concatenating their levels
+# and compacting again, so the delay columns of the whole history can be
+# summarised a chunk at a time, in parallel, in a few KB per column.
+#
+# Error bound: with capacity parameter k the rank of a returned quantile is
+# off by at most about 1.65 / (k / 200) percent of the number of values,
+# with 99% confidence (the figure published by Apache DataSketches for its
+# KLL sketch; at the default k = 200 that is 1.65%). The minimum and
+# maximum are kept exactly. For quartile bin edges of delays in minutes
+# this moves an edge by at most a minute or two.
+
+import numpy as np
+import pandas as pd
+
+from .schema import DELAY_COLUMNS
+
+DEFAULT_K = 200
+
+# Capacity of each level relative to the one above it.
+_SHRINK = 2 / 3
+
+
+class QuantileSketch:
+    """KLL sketch of a stream of numbers; see the module comment."""
+
+    def __init__(self, k=DEFAULT_K, seed=None):
+        self.k = k
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.integral = True
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.n
+
+    def update(self, values):
+        """Add an array of values; NaN is skipped."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.n += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.integral = self.integral and bool(np.all(values == np.round(values)))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Add the values summarised by `other` to this sketch (in place)."""
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.integral = self.integral and other.integral
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """Approximate q-quantile(s), q in [0, 1]; NaN for an empty sketch."""
+        q = np.asarray(q, dtype=np.float64)
+        if not self.n:
+            return np.full(q.shape, np.nan)[()]
+        items, cum = self._sorted()
+        pos = np.searchsorted(cum, q * cum[-1], side='left')
+        out = items[np.minimum(pos, len(items) - 1)]
+        out = np.where(q <= 0, self.min, np.where(q >= 1, self.max, out))
+        return out[()]
+
+    def rank(self, x):
+        """Approximate fraction of the values that are <= x."""
+        if not self.n:
+            return np.nan
+        items, cum = self._sorted()
+        below = np.searchsorted(items, x, side='right')
+        return float(cum[below - 1] / cum[-1]) if below else 0.0
+
+    def _sorted(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lv), 2.0 ** h) for h, lv in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], np.cumsum(weights[order])
+
+    def _capacity(self, h):
+        return max(2, int(np.ceil(self.k * _SHRINK ** (len(self.levels) - 1 - h))))
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                level = np.sort(level)
+                # An odd value out stays behind; the rest are halved.
+                odd = len(level) % 2
+                promoted = level[:len(level) - odd][self._rng.integers(2)::2]
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                self.levels[h] = level[len(level) - odd:]
+            h += 1
+
+
+def sketch_columns(frames, columns=DELAY_COLUMNS, nonzero=True, k=DEFAULT_K, seed=None):
+    """{column: QuantileSketch} over a frame or an iterable of chunks.
+
+    With `nonzero=True` (the default, as for the delay columns) zeros are
+    left out like missing values. Chunks can come from
+    flights.iter_flights; sketches built elsewhere (other files, other
+    processes) can be folded in with merge().
+    """
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+    sketches = {c: QuantileSketch(k, seed) for c in columns}
+    for frame in frames:
+        for c in columns:
+            values = frame[c].to_numpy(dtype=np.float64, na_value=np.nan)
+            sketches[c].update(values[values != 0] if nonzero else values)
+    return sketches
+
+
+def quartile_bins(sketch, levels=(0.25, 0.5, 0.75)):
+    """(edges, labels) of bins split at the given quantiles of a sketch.
+
+    Bins are right-closed as in pd.cut; the first edge sits just below the
+    minimum so that the smallest value is counted. For integer data the
+    labels read like '1-9', '10-19', ...; coinciding edges are merged.
+    """
+    if not sketch.n:
+        raise ValueError('cannot bin an empty sketch')
+    inner = np.atleast_1d(sketch.quantile(levels))
+    if sketch.integral:
+        low = sketch.min - 1
+    else:
+        low = np.nextafter(sketch.min, -np.inf)
+    edges = np.unique(np.concatenate([[low], inner, [sketch.max]]))
+    if sketch.integral:
+        edges = edges.astype(np.int64)
+        labels = ['%d-%d' % (a + 1, b) for a, b in zip(edges[:-1], edges[1:])]
+    else:
+        labels = ['%g-%g' % (a, b) for a, b in zip(edges[:-1], edges[1:])]
+    return edges.tolist(), labels
+
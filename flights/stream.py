@@ -0,0 +1,267 @@
+# Rolling delay and cancellation statistics over a live feed of flights.
+#
+# Each event is one flight record (a dict with the CSV's column names, e.g.
+# one line of newline-delimited JSON). Its time is the scheduled departure,
+# from Year, Month, DayofMonth and CRSDepTime. Every window (1h, 24h, 7d by
+# default) is a ring of fixed-width time buckets; an event adds its
+# measures to the current bucket of its origin airport and its carrier,
+# and buckets that fall out of the window are dropped as event time moves
+# on. Each bucket is created once and dropped once, so the work per event
+# is constant however long the feed runs; a snapshot sums at most one
+# window's worth of buckets per key.
+#
+# Windows are bucket-aligned: a 1h window made of 5-minute buckets covers
+# the last 55 to 60 minutes. Events older than the oldest bucket still in
+# their window are ignored.
+#
+# The measures are those of code.py: flights, cancellations (In[19]) and,
+# for each delay cause, the number and sum of the non-zero delays, whose
+# ratio is the mean delay length of In[57]-In[80].
+#
+#     python -m flights stream replay 2008.csv | python -m flights stream run --every 100000
+#     python -m flights stream run --port 9999 --window 1h --by UniqueCarrier
+
+import argparse
+import datetime
+import json
+import math
+import socket
+import sys
+
+import numpy as np
+import pandas as pd
+
+from .load import read_flights
+from .schema import DELAY_COLUMNS
+
+# Window name -> (length in minutes, number of buckets).
+WINDOWS = {
+    '1h': (60, 12),
+    '24h': (24 * 60, 24),
+    '7d': (7 * 24 * 60, 28),
+}
+
+DIMENSIONS = ('Origin', 'UniqueCarrier')
+
+STREAM_COLUMNS = (['Year', 'Month', 'DayofMonth', 'CRSDepTime', 'UniqueCarrier', 'Origin',
+                   'Dest', 'Cancelled'] + DELAY_COLUMNS)
+
+# Layout of a measure vector: flights, cancelled, then count and sum of
+# each delay cause.
+_CANCELLED = 1
+_WIDTH = 2 + 2 * len(DELAY_COLUMNS)
+
+_EPOCH = datetime.date(1970, 1, 1).toordinal()
+
+
+class RollingStats:
+    """Windowed aggregates per value of each of `dimensions`."""
+
+    def __init__(self, windows=WINDOWS, dimensions=DIMENSIONS):
+        self.dimensions = tuple(dimensions)
+        self.windows = {name: _Window(length, buckets, len(self.dimensions))
+                        for name, (length, buckets) in windows.items()}
+        self.watermark = None
+        self.events = 0
+        self._days = {}
+
+    def update(self, record):
+        """Add one flight record; returns False if it was too old for every window."""
+        t = self.event_time(record)
+        if self.watermark is None or t > self.watermark:
+            self.watermark = t
+        items = [(0, 1.0)]
+        if _number(record.get('Cancelled')):
+            items.append((_CANCELLED, 1.0))
+        for i, c in enumerate(DELAY_COLUMNS):
+            v = _number(record.get(c))
+            if v:
+                items.append((2 + 2 * i, 1.0))
+                items.append((3 + 2 * i, v))
+        keys = [record.get(d) for d in self.dimensions]
+        self.events += 1
+        added = False
+        for window in self.windows.values():
+            added |= window.add(t, self.watermark, keys, items)
+        return added
+
+    def update_many(self, records):
+        """Add every record of an iterable; returns how many there were."""
+        n = 0
+        for record in records:
+            self.update(record)
+            n += 1
+        return n
+
+    def snapshot(self, window='24h', by=DIMENSIONS[0]):
+        """Flights, cancellation rate and mean of each delay per key of `by`.
+
+        One row per key seen in the window, with the columns of the
+        registry's 'month' table: Total_Flights, Cancelled (fraction) and
+        the mean non-zero length of each delay type.
+        """
+        totals = self.windows[window].totals(self.dimensions.index(by), self.watermark)
+        keys = sorted(totals, key=str)
+        m = np.array([totals[k] for k in keys], dtype=np.float64).reshape(len(keys), _WIDTH)
+        out = pd.DataFrame({'Total_Flights': m[:, 0].astype(np.int64),
+                            'Cancelled': m[:, _CANCELLED] / m[:, 0]},
+                           index=pd.Index(keys, name=by))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for i, c in enumerate(DELAY_COLUMNS):
+                out[c] = m[:, 3 + 2 * i] / np.where(m[:, 2 + 2 * i] > 0, m[:, 2 + 2 * i], np.nan)
+        return out
+
+    def event_time(self, record):
+        """Scheduled departure of a record, in minutes since 1970-01-01."""
+        day = (int(record['Year']), int(record['Month']), int(record['DayofMonth']))
+        days = self._days.get(day)
+        if days is None:
+            days = self._days[day] = datetime.date(*day).toordinal() - _EPOCH
+        hhmm = int(float(record['CRSDepTime']))
+        return days * 1440 + (hhmm // 100) * 60 + hhmm % 100
+
+
+class _Window:
+    """Ring of time buckets: bucket id -> one {key: measures} per dimension."""
+
+    def __init__(self, length, buckets, ndims):
+        self.width = length // buckets
+        self.nbuckets = buckets
+        self.ndims = ndims
+        self.buckets = {}
+        self.oldest = None
+
+    def add(self, t, watermark, keys, items):
+        bucket_id = t // self.width
+        self._expire(watermark // self.width)
+        if bucket_id < self.oldest:
+            return False
+        cells = self.buckets.get(bucket_id)
+        if cells is None:
+            cells = self.buckets[bucket_id] = [{} for _ in range(self.ndims)]
+        for dim, key in enumerate(keys):
+            measures = cells[dim].get(key)
+            if measures is None:
+                measures = cells[dim][key] = [0.0] * _WIDTH
+            for i, v in items:
+                measures[i] += v
+        return True
+
+    def totals(self, dim, watermark):
+        if watermark is not None:
+            self._expire(watermark // self.width)
+        out = {}
+        for cells in self.buckets.values():
+            for key, measures in cells[dim].items():
+                total = out.get(key)
+                if total is None:
+                    out[key] = list(measures)
+                else:
+                    for i, v in enumerate(measures):
+                        total[i] += v
+        return out
+
+    def _expire(self, current):
+        # Keeps buckets current - nbuckets + 1 .. current. Each bucket is
+        # dropped once, so this is amortized O(1) per event.
+        oldest = current - self.nbuckets + 1
+        if self.oldest is None:
+            self.oldest = oldest
+        if oldest <= self.oldest:
+            return
+        if oldest - self.oldest > len(self.buckets):
+            self.buckets = {b: c for b, c in self.buckets.items() if b >= oldest}
+        else:
+            for b in range(self.oldest, oldest):
+                self.buckets.pop(b, None)
+        self.oldest = oldest
+
+
+def read_ndjson(lines):
+    """Records of newline-delimited JSON lines; blank lines are skipped."""
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def replay(csv_path, chunksize=100_000):
+    """Records of a flights CSV in scheduled departure order, as from a feed.
+
+    Missing values are None, so the records serialise straight to JSON.
+    """
+    df = read_flights(csv_path, columns=STREAM_COLUMNS)
+    hhmm = df['CRSDepTime'].to_numpy(dtype=np.int64)
+    order = np.lexsort((hhmm, df['DayofMonth'].to_numpy(), df['Month'].to_numpy(),
+                        df['Year'].to_numpy()))
+    for start in range(0, len(df), chunksize):
+        chunk = df.iloc[order[start:start + chunksize]].astype(object)
+        yield from chunk.where(chunk.notna(), None).to_dict('records')
+
+
+def serve(port, host='127.0.0.1'):
+    """Lines sent to a local TCP socket, one connection after another."""
+    with socket.create_server((host, port)) as server:
+        while True:
+            conn, _ = server.accept()
+            with conn, conn.makefile('r', encoding='utf-8') as f:
+                yield from f
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m flights stream',
+        description='Rolling delay and cancellation statistics over a feed of flights.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    p = commands.add_parser('replay', help='write a flights CSV as NDJSON, in time order')
+    p.add_argument('csv')
+    p = commands.add_parser('run', help='read NDJSON records and print rolling statistics')
+    p.add_argument('--port', type=int, help='listen on this local TCP port instead of stdin')
+    p.add_argument('--window', default='24h', choices=list(WINDOWS))
+    p.add_argument('--by', default=DIMENSIONS[0], choices=list(DIMENSIONS))
+    p.add_argument('--every', type=int, default=0,
+                   help='print a snapshot every N events (default: only at the end)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'replay':
+        try:
+            for record in replay(args.csv):
+                sys.stdout.write(json.dumps(record) + '\n')
+        except BrokenPipeError:
+            # The reader went away (e.g. `| head`); not an error for a feed.
+            sys.stderr.close()
+        return
+
+    stats = RollingStats()
+    lines = serve(args.port) if args.port else sys.stdin
+    try:
+        for record in read_ndjson(lines):
+            stats.update(record)
+            if args.every and stats.events % args.every == 0:
+                _print_snapshot(stats, args.window, args.by)
+    except KeyboardInterrupt:
+        pass
+    _print_snapshot(stats, args.window, args.by)
+
+
+def _print_snapshot(stats, window, by):
+    if stats.watermark is None:
+        return
+    frame = stats.snapshot(window, by)
+    time = datetime.datetime(1970, 1, 1) + datetime.timedelta(minutes=stats.watermark)
+    sys.stdout.write(json.dumps({'time': time.isoformat(), 'events': stats.events,
+                                 'window': window, 'by': by,
+                                 'stats': frame.to_dict('index')}) + '\n')
+    sys.stdout.flush()
+
+
+def _number(value):
+    """float of a field that may be missing ('NA', '', None) or a string.
+
+    Missing and non-finite values ('NaN', 'inf', a JSON NaN) count as 0,
+    i.e. no delay, so one bad field cannot poison the window sums.
+    """
+    if value is None or value == '' or value == 'NA':
+        return 0.0
+    value = float(value)
+    return value if math.isfinite(value) else 0.0
@@ -0,0 +1,156 @@
+# Synthetic flights with the 2008 schema, for benchmarks at any size.
+#
+# The columns follow flights.schema and their rough distributions follow the
+# 2008 file: flights spread over the year with fewer in the winter, a few
+# hub airports and large carriers taking most of the traffic (Zipf-like),
+# departures between 05:00 and 23:59, about 2% of flights cancelled (codes
+# A-D in the 2008 proportions) and 0.2% diverted, departure delays mostly
+# a few minutes early or late with a long tail, and the five delay-cause
+# columns reported (summing to the arrival delay) only for flights that
+# arrived 15 or more minutes late - about one in five, so they are mostly
+# missing, as in the real data. Everything is drawn from one seeded numpy
+# Generator with whole-column operations.
+
+import numpy as np
+import pandas as pd
+
+from .dates import to_datetime64
+from .load import CHUNKSIZE
+from .schema import COLUMNS, DELAY_COLUMNS, DTYPES
+
+CANCELLED_RATE = 0.02
+DIVERTED_RATE = 0.002
+# Share of each cancellation code among cancelled flights (A-D).
+CANCELLATION_CODES = {'A': 0.39, 'B': 0.38, 'C': 0.22, 'D': 0.01}
+# Arrival delay from which the causes are reported.
+CAUSE_THRESHOLD = 15
+
+N_AIRPORTS = 300
+N_TAILS = 5000
+CARRIERS = ['WN', 'AA', 'OO', 'MQ', 'US', 'DL', 'UA', 'XE', 'NW', 'CO',
+            'EV', '9E', 'FL', 'YV', 'OH', 'B6', 'AS', 'F9', 'HA', 'AQ']
+
+# Relative number of flights per month (2008: a little under 600k a month,
+# fewer in February and the late autumn).
+_MONTH_WEIGHTS = np.array([605, 569, 616, 598, 606, 608, 627, 612, 540, 556, 523, 544],
+                          dtype=np.float64)
+_DAYS_IN_MONTH = np.array([31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def synthetic_flights(n, seed=None, year=2008):
+    """A typed frame of `n` synthetic flights (dtypes of flights.schema)."""
+    rng = np.random.default_rng(seed)
+    month = rng.choice(np.arange(1, 13), size=n, p=_MONTH_WEIGHTS / _MONTH_WEIGHTS.sum())
+    day = (rng.random(n) * _DAYS_IN_MONTH[month - 1]).astype(np.int64) + 1
+    if year % 4:
+        # February has 28 days outside leap years.
+        day = np.where((month == 2) & (day == 29), 28, day)
+    dates = to_datetime64(np.full(n, year), month, day)
+    weekday = (dates.astype(np.int64) + 3) % 7 + 1          # 1970-01-01 was a Thursday
+
+    carrier = _zipf_choice(rng, len(CARRIERS), n, 0.8)
+    origin = _zipf_choice(rng, N_AIRPORTS, n, 1.0)
+    dest = (origin + 1 + _zipf_choice(rng, N_AIRPORTS - 1, n, 1.0)) % N_AIRPORTS
+    tail = rng.integers(0, N_TAILS, n)
+
+    crs_dep = rng.integers(5 * 60, 24 * 60, n)
+    crs_elapsed = np.clip(rng.gamma(4.0, 35.0, n), 25, 660).astype(np.int64)
+    crs_arr = (crs_dep + crs_elapsed) % 1440
+    distance = np.clip(crs_elapsed * 7 - 100 + rng.normal(0, 40, n), 30, 4960).astype(np.int64)
+
+    # Most flights leave within a few minutes of schedule; ~20% are late
+    # with an exponential tail.
+    late = rng.random(n) < 0.2
+    dep_delay = np.where(late, rng.exponential(40.0, n) + 5, rng.normal(-2.0, 5.0, n))
+    dep_delay = np.round(np.clip(dep_delay, -30, 1500)).astype(np.int64)
+    taxi_out = np.clip(rng.gamma(3.0, 5.0, n), 1, 180).astype(np.int64)
+    taxi_in = np.clip(rng.gamma(2.0, 3.5, n), 1, 120).astype(np.int64)
+    air_time = np.maximum(crs_elapsed - taxi_out - taxi_in + rng.integers(-10, 11, n), 10)
+    elapsed = air_time + taxi_out + taxi_in
+    arr_delay = dep_delay + elapsed - crs_elapsed
+    dep_time = (crs_dep + dep_delay) % 1440
+    arr_time = (dep_time + elapsed) % 1440
+
+    cancelled = rng.random(n) < CANCELLED_RATE
+    diverted = ~cancelled & (rng.random(n) < DIVERTED_RATE)
+    codes = np.array(list(CANCELLATION_CODES))
+    code = rng.choice(len(codes), size=n, p=list(CANCELLATION_CODES.values()))
+    flown = ~cancelled
+    arrived = flown & ~diverted
+
+    frame = {
+        'Year': np.full(n, year), 'Month': month, 'DayofMonth': day, 'DayOfWeek': weekday,
+        'DepTime': _missing(_to_hhmm(dep_time), ~flown),
+        'CRSDepTime': _to_hhmm(crs_dep),
+        'ArrTime': _missing(_to_hhmm(arr_time), ~arrived),
+        'CRSArrTime': _to_hhmm(crs_arr),
+        'UniqueCarrier': pd.Categorical.from_codes(carrier, CARRIERS),
+        'FlightNum': rng.integers(1, 8000, n),
+        'TailNum': pd.Categorical.from_codes(tail, ['N%dXX' % i for i in range(N_TAILS)]),
+        'ActualElapsedTime': _missing(elapsed, ~arrived),
+        'CRSElapsedTime': pd.array(crs_elapsed, dtype='Int16'),
+        'AirTime': _missing(air_time, ~arrived),
+        'ArrDelay': _missing(arr_delay, ~arrived),
+        'DepDelay': _missing(dep_delay, ~flown),
+        'Origin': pd.Categorical.from_codes(origin, _airport_codes()),
+        'Dest': pd.Categorical.from_codes(dest, _airport_codes()),
+        'Distance': distance,
+        'TaxiIn': _missing(taxi_in, ~arrived),
+        'TaxiOut': _missing(taxi_out, ~flown),
+        'Cancelled': cancelled,
+        'CancellationCode': pd.Categorical.from_codes(np.where(cancelled, code, -1), codes),
+        'Diverted': diverted,
+    }
+    frame.update(_causes(rng, arr_delay, arrived))
+    df = pd.DataFrame(frame)[COLUMNS]
+    return df.astype({c: DTYPES[c] for c in COLUMNS if DTYPES[c] != 'category'})
+
+
+def write_synthetic(path, n, seed=None, year=2008, chunksize=CHUNKSIZE):
+    """Write `n` synthetic flights to a CSV laid out like 2008.csv.
+
+    Rows are generated and written `chunksize` at a time, so any size fits
+    in memory. Returns `path`.
+    """
+    rng = np.random.default_rng(seed)
+    with open(path, 'w', newline='') as f:
+        for start in range(0, n, chunksize):
+            chunk = synthetic_flights(min(chunksize, n - start), rng.integers(1 << 62), year)
+            chunk.to_csv(f, header=not start, index=False, na_rep='NA')
+        if not n:
+            synthetic_flights(0).to_csv(f, index=False)
+    return path
+
+
+def _causes(rng, arr_delay, arrived):
+    # Split the arrival delay of flights at least CAUSE_THRESHOLD minutes
+    # late over the causes; most get one or two causes, the rest 0.
+    reported = arrived & (arr_delay >= CAUSE_THRESHOLD)
+    n = len(arr_delay)
+    weights = rng.dirichlet([0.5, 0.1, 0.5, 0.02, 0.5], size=n)
+    keep = weights >= 0.1
+    keep[np.arange(n), weights.argmax(axis=1)] = True
+    weights[~keep] = 0
+    weights /= weights.sum(axis=1, keepdims=True)
+    split = np.floor(weights * np.maximum(arr_delay, 0)[:, None]).astype(np.int64)
+    split[:, 0] += np.maximum(arr_delay, 0) - split.sum(axis=1)
+    return {c: _missing(split[:, i], ~reported) for i, c in enumerate(DELAY_COLUMNS)}
+
+
+def _zipf_choice(rng, k, n, a):
+    p = 1.0 / np.arange(1, k + 1) ** a
+    return rng.choice(k, size=n, p=p / p.sum())
+
+
+def _airport_codes():
+    letters = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+    i = np.arange(N_AIRPORTS)
+    return [''.join(t) for t in zip(letters[i // 676 % 26], letters[i // 26 % 26], letters[i % 26])]
+
+
+def _to_hhmm(minutes):
+    return (minutes // 60) * 100 + minutes % 60
+
+
+def _missing(values, mask):
+    return pd.arrays.IntegerArray(np.where(mask, 0, values).astype(np.int16), np.asarray(mask))
@@ -0,0 +1,96 @@
+# Clock times decoded from the hhmm columns with integer arithmetic.
+#
+# DepTime, CRSDepTime, ArrTime and CRSArrTime hold local clock times as hhmm
+# numbers (1435 is 14:35). Decoding is (t // 100) * 60 + t % 100 over the
+# whole column at once. 2400, which the files use for midnight at the end
+# of the day, decodes to 1440 so that it still sorts after 2359.
+#
+# The cache stores the decoded times with the typed data (see TIME_COLUMNS
+# and flights.cache), together with overnight flags and the hour of the day
+# of the scheduled departure and arrival, the usual buckets of hour-of-day
+# delay curves.
+
+import numpy as np
+import pandas as pd
+
+from .aggregate import GroupIndex, Reducer
+
+# hhmm column -> minutes-since-midnight column.
+TIME_COLUMNS = {
+    'DepTime': 'DepMinutes',
+    'CRSDepTime': 'CRSDepMinutes',
+    'ArrTime': 'ArrMinutes',
+    'CRSArrTime': 'CRSArrMinutes',
+}
+
+MINUTES_PER_DAY = 1440
+
+
+def minutes(series):
+    """Minutes since midnight of an hhmm column, as int16.
+
+    Missing times stay missing (the result is then nullable Int16).
+    """
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    missing = np.isnan(values)
+    hhmm = np.where(missing, 0, values).astype(np.int64)
+    decoded = ((hhmm // 100) * 60 + hhmm % 100).astype(np.int16)
+    if missing.any() or isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+        decoded = pd.arrays.IntegerArray(decoded, missing)
+    return pd.Series(decoded, index=series.index, name=TIME_COLUMNS.get(series.name))
+
+
+def hour_of_day(minutes):
+    """Hour (0-23, int8) of minutes since midnight; 1440 counts as hour 23.
+
+    Where minutes are missing (DepMinutes of a cancelled flight) the
+    result is a nullable Int8 array with the hour missing too.
+    """
+    values = pd.Series(minutes).to_numpy(dtype=np.float64, na_value=np.nan)
+    missing = np.isnan(values)
+    hours = np.minimum(np.where(missing, 0, values).astype(np.int64) // 60, 23).astype(np.int8)
+    return pd.arrays.IntegerArray(hours, missing) if missing.any() else hours
+
+
+def add_time_columns(df):
+    """Add the decoded time columns to `df` in place and return it.
+
+    For each hhmm column present, its minutes column (TIME_COLUMNS);
+    Overnight, 1 where the scheduled arrival is on the day after the
+    scheduled departure (arrival clock time before departure clock time);
+    ArrOvernight, the same from the actual times (0 where the flight did
+    not arrive); DepHour and ArrHour, the hour of the scheduled departure
+    and arrival.
+    """
+    for hhmm, column in TIME_COLUMNS.items():
+        if hhmm in df:
+            df[column] = minutes(df[hhmm])
+    if 'CRSDepMinutes' in df and 'CRSArrMinutes' in df:
+        dep, arr = df['CRSDepMinutes'].to_numpy(), df['CRSArrMinutes'].to_numpy()
+        df['Overnight'] = (arr < dep).astype(np.int8)
+        df['DepHour'] = hour_of_day(dep)
+        df['ArrHour'] = hour_of_day(arr)
+    if 'DepMinutes' in df and 'ArrMinutes' in df:
+        dep = df['DepMinutes'].to_numpy(dtype=np.float64, na_value=np.nan)
+        arr = df['ArrMinutes'].to_numpy(dtype=np.float64, na_value=np.nan)
+        df['ArrOvernight'] = (arr < dep).astype(np.int8)
+    return df
+
+
+def hourly_delays(df, column='DepDelay', by='Origin', hour='DepHour', stat='mean',
+                  nonzero=False):
+    """`stat` of `column` by `by` and scheduled hour: one row per airport.
+
+    Columns are the hours 0-23 (NaN where an airport has no flights in an
+    hour). Use by='Dest', hour='ArrHour' for arrival curves. `hour` is
+    computed from the scheduled times when the frame does not have it.
+    """
+    if hour not in df:
+        scheduled = {'DepHour': 'CRSDepTime', 'ArrHour': 'CRSArrTime'}[hour]
+        df = df.assign(**{hour: hour_of_day(minutes(df[scheduled]).to_numpy())})
+    groups = GroupIndex(df, [by, hour])
+    reducer = Reducer(groups, nonzero)
+    observed = np.flatnonzero(reducer.size())
+    curves = pd.Series(reducer.stat(df, column, stat)[observed],
+                       index=groups.index(observed), name=column)
+    return curves.unstack(hour).reindex(columns=range(24))
@@ -0,0 +1,217 @@
+# Stage-level tracing of the analysis pipeline.
+#
+# The loaders, the cache, the registry, aggregate() and the report renderer
+# are wrapped with `traced`, and any other block of code can be wrapped with
+# `stage`. While a Tracer is active each wrapped call records a span: wall
+# and CPU time, rows in (the length of the first frame argument) and rows
+# out (the length of a frame or series result), and the process's peak RSS
+# so far. With memory=True the spans also record the bytes allocated and
+# the peak above the starting point, from tracemalloc, which is exact but
+# slows allocation-heavy code down; leave it off in production.
+#
+# When no tracer is active a wrapped call costs one global lookup, so the
+# hooks stay in place for good. Spans nest; the trace can be saved as
+# Chrome trace-event JSON (chrome://tracing, https://ui.perfetto.dev) and
+# summarised per stage with summary().
+#
+#     tracer = Tracer().start()
+#     ... run the analysis ...
+#     tracer.stop().save('trace.json')
+#     tracer.summary()
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    # Unix only: spans have no max_rss on Windows.
+    resource = None
+
+_active = None
+
+
+class Span:
+    """One traced call; `rows_out` can be set by the traced code."""
+
+    __slots__ = ('name', 'start', 'wall', 'cpu', 'rows_in', 'rows_out', 'allocated', 'peak',
+                 'max_rss', 'thread', 'args')
+
+    def __init__(self, name, rows_in=None, args=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.allocated = self.peak = None
+        self.args = args or {}
+
+
+class Tracer:
+    """Collects Spans while active (between start() and stop(), or in `with`)."""
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.spans = []
+        self._origin = time.perf_counter_ns()
+        self._peaks = []
+        self._started_tracemalloc = False
+        self._previous = None
+
+    def start(self):
+        """Make this the active tracer; returns it."""
+        global _active
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._previous, _active = _active, self
+        return self
+
+    def stop(self):
+        """Deactivate (restoring any tracer active before start()); returns self."""
+        global _active
+        _active = self._previous
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @contextmanager
+    def span(self, name, rows_in=None, **args):
+        span = Span(name, rows_in, args)
+        span.thread = threading.get_ident()
+        if self.memory:
+            # tracemalloc has one peak; the enclosing span's peak so far is
+            # saved before resetting it and folded back in afterwards.
+            current, peak = tracemalloc.get_traced_memory()
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            self._peaks.append(current)
+            tracemalloc.reset_peak()
+        span.start = time.perf_counter_ns()
+        cpu = time.process_time_ns()
+        try:
+            yield span
+        finally:
+            span.wall = time.perf_counter_ns() - span.start
+            span.cpu = time.process_time_ns() - cpu
+            if self.memory:
+                end, peak = tracemalloc.get_traced_memory()
+                peak = max(self._peaks.pop(), peak)
+                span.allocated = end - current
+                span.peak = peak - current
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+            span.max_rss = _max_rss()
+            self.spans.append(span)
+
+    def chrome_trace(self):
+        """The spans as a Chrome trace-event JSON object."""
+        pid = os.getpid()
+        events = []
+        for s in self.spans:
+            args = {k: v for k, v in (('rows_in', s.rows_in), ('rows_out', s.rows_out),
+                                      ('cpu_ms', s.cpu / 1e6), ('allocated', s.allocated),
+                                      ('peak', s.peak), ('max_rss', s.max_rss))
+                    if v is not None}
+            args.update(s.args)
+            events.append({'name': s.name, 'cat': 'flights', 'ph': 'X', 'pid': pid,
+                           'tid': s.thread, 'ts': (s.start - self._origin) / 1e3,
+                           'dur': s.wall / 1e3, 'args': args})
+        return {'traceEvents': sorted(events, key=lambda e: e['ts']),
+                'displayTimeUnit': 'ms'}
+
+    def save(self, path):
+        """Write chrome_trace() to `path`."""
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f, default=str)
+        return path
+
+    def summary(self):
+        """One row per stage name: calls, total wall and CPU seconds, rows, memory.
+
+        Times of nested stages are included in their parents' times too.
+        Sorted by wall time, largest first.
+        """
+        rows = [{'stage': s.name, 'calls': 1, 'wall_s': s.wall / 1e9, 'cpu_s': s.cpu / 1e9,
+                 'rows_in': s.rows_in, 'rows_out': s.rows_out,
+                 'allocated_mb': None if s.allocated is None else s.allocated / 2**20,
+                 'peak_mb': None if s.peak is None else s.peak / 2**20,
+                 'max_rss_mb': None if s.max_rss is None else s.max_rss / 2**20}
+                for s in self.spans]
+        columns = ['calls', 'wall_s', 'cpu_s', 'rows_in', 'rows_out', 'allocated_mb',
+                   'peak_mb', 'max_rss_mb']
+        if not rows:
+            return pd.DataFrame(columns=columns, index=pd.Index([], name='stage'))
+        groups = pd.DataFrame(rows).astype({c: 'float64' for c in columns[3:]}).groupby(
+            'stage', sort=False)
+        out = pd.concat([groups[columns[:6]].sum(min_count=1),
+                         groups[columns[6:]].max()], axis=1)
+        out['calls'] = out['calls'].astype('int64')
+        if not self.memory:
+            out = out.drop(columns=['allocated_mb', 'peak_mb'])
+        return out.sort_values('wall_s', ascending=False)
+
+
+def active():
+    """The active Tracer, or None."""
+    return _active
+
+
+@contextmanager
+def stage(name, rows_in=None, **args):
+    """Trace a block as stage `name` if a tracer is active; yields its Span or None."""
+    tracer = _active
+    if tracer is None:
+        yield None
+        return
+    with tracer.span(name, rows_in, **args) as span:
+        yield span
+
+
+def traced(name):
+    """Decorator tracing each call of a function as stage `name`."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tracer = _active
+            if tracer is None:
+                return fn(*args, **kwargs)
+            with tracer.span(name, _rows(*args, *kwargs.values())) as span:
+                result = fn(*args, **kwargs)
+                span.rows_out = _length(result)
+                return result
+        return wrapper
+    return decorate
+
+
+def _rows(*values):
+    for v in values:
+        if isinstance(v, pd.DataFrame):
+            return len(v)
+    return None
+
+
+def _length(value):
+    return len(value) if isinstance(value, (pd.DataFrame, pd.Series)) else None
+
+
+def _max_rss():
+    # Peak resident set size of the process in bytes, None where unknown.
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS.
+    return peak if sys.platform == 'darwin' else peak * 1024
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# Appended, not prepended: the repo root holds code.py, which would shadow
+# the standard library module of that name.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flights.synth import write_synthetic  # noqa: E402
+
+ROWS = 20000
+
+
+@pytest.fixture(scope='session')
+def flights_csv(tmp_path_factory):
+    """A synthetic 2008-schema CSV of ROWS flights."""
+    return write_synthetic(str(tmp_path_factory.mktemp('data') / '2008.csv'), ROWS, seed=2008,
+                           chunksize=7000)
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from flights import DELAY_COLUMNS, aggregate, delay_summary, histogram, read_flights
+
+STATS = ['count', 'sum', 'mean', 'var', 'std', 'min', 'max', 'median']
+
+
+@pytest.fixture(scope='module')
+def df(flights_csv):
+    return read_flights(flights_csv)
+
+
+@pytest.mark.parametrize('keys', [['Month'], ['DayOfWeek', 'UniqueCarrier'], ['Origin']])
+def test_aggregate_matches_groupby(df, keys):
+    got = aggregate(df, keys, [(c, s) for c in ['ArrDelay', 'CarrierDelay'] for s in STATS])
+    grouped = df.astype({'ArrDelay': 'float64', 'CarrierDelay': 'float64'}).groupby(
+        keys, observed=True)
+    for c in ['ArrDelay', 'CarrierDelay']:
+        expected = grouped[c].agg(STATS)
+        for s in STATS:
+            np.testing.assert_allclose(got[(c, s)].to_numpy(dtype=np.float64),
+                                       expected[s].to_numpy(dtype=np.float64), rtol=1e-9,
+                                       err_msg='%s %s' % (c, s))
+    assert list(got.index) == list(expected.index)
+
+
+def test_aggregate_quantiles_and_size(df):
+    got = aggregate(df, 'Month', {'n': ('Cancelled', 'size'), 'q90': ('DepDelay', 'q90')})
+    grouped = df.groupby('Month')
+    np.testing.assert_array_equal(got['n'].to_numpy(), grouped.size().to_numpy())
+    np.testing.assert_allclose(got['q90'].to_numpy(),
+                               grouped['DepDelay'].quantile(0.9).to_numpy(dtype=np.float64))
+
+
+def test_nonzero_skips_missing_and_zero(df):
+    got = delay_summary(df, 'Month')
+    for c in DELAY_COLUMNS:
+        s = df[[c, 'Month']].dropna()
+        expected = s[s[c] != 0].astype({c: 'float64'}).groupby('Month')[c].mean()
+        np.testing.assert_allclose(got[c].to_numpy(), expected.to_numpy(), rtol=1e-12)
+
+
+def test_histogram_matches_cut(df):
+    edges = [-np.inf, 0, 15, 60, np.inf]
+    got = histogram(df, 'ArrDelay', edges, keys='Month')
+    s = df[['ArrDelay', 'Month']].dropna()
+    expected = s.groupby(['Month', pd.cut(s['ArrDelay'], edges)], observed=False).size()
+    np.testing.assert_array_equal(got.to_numpy(), expected.unstack().to_numpy())
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from flights import DELAY_COLUMNS, bin_counts, fixed_bins, log_bins, read_flights
+
+
+@pytest.fixture(scope='module')
+def df(flights_csv):
+    return read_flights(flights_csv)
+
+
+def cut_counts(values, edges):
+    values = values.dropna()
+    values = values[values != 0].astype('float64')
+    return pd.cut(values, edges).value_counts(sort=False).to_numpy()
+
+
+@pytest.mark.parametrize('bins', [fixed_bins(0, 300, 15), log_bins(1, 1000, 8),
+                                  ([-10.5, 0, 7.25, 60.0, 2000.0], None)])
+def test_bin_counts_match_cut(df, bins):
+    got = bin_counts(df, {c: bins for c in DELAY_COLUMNS})
+    for c in DELAY_COLUMNS:
+        np.testing.assert_array_equal(got[c].to_numpy(), cut_counts(df[c], bins[0]),
+                                      err_msg=c)
+
+
+def test_bin_counts_by_month(df):
+    edges, labels = fixed_bins(0, 120, 30)
+    got = bin_counts(df, {'ArrDelay': (edges, labels)}, keys='Month')['ArrDelay']
+    assert list(got.columns) == labels
+    for month, counts in got.iterrows():
+        expected = cut_counts(df.loc[df['Month'] == month, 'ArrDelay'], edges)
+        np.testing.assert_array_equal(counts.to_numpy(), expected)
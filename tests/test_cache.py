@@ -0,0 +1,56 @@
+import pandas as pd
+
+from flights import CodeTable, concat_frames, load_flights, read_flights
+from flights.schema import CODE_COLUMNS
+
+
+def test_load_flights_matches_read_flights(flights_csv, tmp_path):
+    expected = read_flights(flights_csv, chunksize=3000)
+    got = load_flights(flights_csv, cache_dir=str(tmp_path))
+    assert got.dtypes.to_dict() == expected.dtypes.to_dict()
+    for c in CODE_COLUMNS:
+        assert list(got[c].cat.categories) == sorted(expected[c].cat.categories)
+    # The cache is written month by month.
+    expected = expected.sort_values(['Month', 'DayofMonth', 'CRSDepTime', 'FlightNum'],
+                                    kind='stable').reset_index(drop=True)
+    got = got.sort_values(['Month', 'DayofMonth', 'CRSDepTime', 'FlightNum'],
+                          kind='stable').reset_index(drop=True)
+    pd.testing.assert_frame_equal(got, expected)
+
+
+def test_read_flights_categories_sorted_across_chunks(flights_csv):
+    df = read_flights(flights_csv, chunksize=500)
+    for c in CODE_COLUMNS:
+        categories = list(df[c].cat.categories)
+        assert categories == sorted(categories)
+
+
+def test_categories_sorted_at_default_chunksize(flights_csv, tmp_path):
+    # The whole file is one chunk, whose categories read_csv gives in
+    # first-seen order.
+    df = read_flights(flights_csv)
+    got = load_flights(flights_csv, cache_dir=str(tmp_path))
+    assert df.dtypes.to_dict() == got.dtypes.to_dict()
+    for c in CODE_COLUMNS:
+        categories = list(df[c].cat.categories)
+        assert categories == sorted(categories)
+    pd.testing.assert_series_equal(df.groupby('UniqueCarrier', observed=True).size(),
+                                   got.groupby('UniqueCarrier', observed=True).size())
+
+
+def test_code_table_order_is_kept(flights_csv, tmp_path):
+    codes = CodeTable(str(tmp_path / 'codes.json'))
+    df = read_flights(flights_csv, chunksize=3000, codes=codes)
+    for c in CODE_COLUMNS:
+        assert df[c].dtype == codes.dtype(c)
+
+
+def test_concat_frames_sorts_first_seen_categories():
+    frame = pd.DataFrame({'Origin': pd.Categorical(['SFO', 'ATL', 'SFO'],
+                                                   categories=['SFO', 'ATL'])})
+    for frames in ([frame], [frame, frame]):
+        out = concat_frames(frames)
+        assert list(out['Origin'].cat.categories) == ['ATL', 'SFO']
+        assert list(out['Origin']) == ['SFO', 'ATL', 'SFO'] * len(frames)
+    out = concat_frames([frame, frame], sort_categories=False)
+    assert list(out['Origin'].cat.categories) == ['SFO', 'ATL']
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from flights import CodeTable, code_counts, read_flights
+from flights.schema import CODE_COLUMNS
+
+
+def frame(**columns):
+    return pd.DataFrame({c: pd.Series(v, dtype='category') for c, v in columns.items()})
+
+
+def test_codes_are_stable_across_reloads(tmp_path):
+    path = str(tmp_path / 'codes.json')
+    codes = CodeTable.open(path)
+    first = codes.encode_frame(frame(Origin=['SFO', 'ATL', None], Dest=['ATL', 'ORD', 'SFO']))
+    assert codes.changed
+    codes.save()
+    assert not codes.changed
+
+    reloaded = CodeTable.open(path)
+    # New airports are appended after the ones numbered already.
+    second = reloaded.encode_frame(frame(Origin=['BOS', 'ORD', 'ATL'],
+                                         Dest=['SFO', 'DEN', 'BOS']))
+    assert list(reloaded.dtype('Origin').categories) == ['ATL', 'SFO', 'ORD', 'BOS', 'DEN']
+    assert reloaded.dtype('Origin') == reloaded.dtype('Dest')
+    for c in ['Origin', 'Dest']:
+        old = first[c].cat.codes.to_numpy()
+        recoded = reloaded.encode(first[c].astype(object).astype('category'))
+        np.testing.assert_array_equal(recoded.cat.codes.to_numpy(), old)
+    np.testing.assert_array_equal(second['Origin'].cat.codes.to_numpy(), [3, 2, 0])
+    assert first['Origin'].isna().tolist() == [False, False, True]
+    assert first['Origin'].cat.codes.tolist() == [1, 0, -1]
+    reloaded.save()
+    assert CodeTable.open(path).values == reloaded.values
+
+
+def test_frames_share_categories(flights_csv, tmp_path):
+    codes = CodeTable(str(tmp_path / 'codes.json'))
+    a = read_flights(flights_csv, chunksize=3000, codes=codes)
+    b = read_flights(flights_csv, chunksize=7000, codes=codes)
+    for c in CODE_COLUMNS:
+        assert a[c].dtype == b[c].dtype
+        np.testing.assert_array_equal(a[c].cat.codes.to_numpy(), b[c].cat.codes.to_numpy())
+    pd.testing.assert_frame_equal(a.astype({c: object for c in CODE_COLUMNS}),
+                                  read_flights(flights_csv).astype(
+                                      {c: object for c in CODE_COLUMNS}))
+
+
+def test_code_counts_matches_value_counts(flights_csv):
+    df = read_flights(flights_csv)
+    for c in ['UniqueCarrier', 'Origin', 'CancellationCode']:
+        got = code_counts(df[c])
+        expected = df[c].value_counts()
+        assert got.to_dict() == expected.to_dict()
+        assert got.is_monotonic_decreasing
+        assert got.index.dtype == df[c].dtype
+    unused = pd.Series(pd.Categorical(['a', 'a', None], categories=['a', 'b']))
+    assert code_counts(unused).to_dict() == {'a': 2, 'b': 0}
@@ -0,0 +1,37 @@
+import mmap
+
+import numpy as np
+import pandas as pd
+
+from flights import ColumnStore, build_columns, load_columns, read_flights
+from flights.schema import CODE_COLUMNS, COLUMNS
+
+
+def test_round_trip_matches_read_flights(flights_csv, tmp_path):
+    expected = read_flights(flights_csv)
+    got = load_columns(flights_csv, directory=str(tmp_path))
+    pd.testing.assert_frame_equal(got[COLUMNS], expected)
+    assert 'DayOfYear' in got
+    again = load_columns(flights_csv, COLUMNS, directory=str(tmp_path))
+    pd.testing.assert_frame_equal(again, expected)
+
+
+def is_mapped(array):
+    while isinstance(array, np.ndarray):
+        array = array.base
+    return isinstance(array, mmap.mmap)
+
+
+def test_code_columns_are_not_copied(flights_csv, tmp_path):
+    # Small chunks: categories turn up out of order and are renumbered.
+    path = build_columns(flights_csv, str(tmp_path), chunksize=3000)
+    store = ColumnStore(path)
+    frame = store.frame(CODE_COLUMNS)
+    for c in CODE_COLUMNS:
+        info = store.meta['columns'][c]
+        codes = frame[c].array.codes
+        assert codes.dtype == info['codes']
+        assert is_mapped(codes), c
+    assert store.meta['columns']['UniqueCarrier']['codes'] == 'int8'
+    assert store.meta['columns']['TailNum']['codes'] == 'int16'
+    pd.testing.assert_frame_equal(frame, read_flights(flights_csv, CODE_COLUMNS)[CODE_COLUMNS])
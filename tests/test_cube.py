@@ -0,0 +1,26 @@
+import numpy as np
+
+from flights import build_cube, read_flights
+
+
+def test_rollup_matches_groupby(flights_csv):
+    df = read_flights(flights_csv)
+    cube = build_cube(df)
+    got = cube.rollup('Month')
+    expected = df.groupby('Month').size()
+    assert (got['flights'].to_numpy() == expected.to_numpy()).all()
+    feb = df[df['Month'] == 2]
+    total = cube.rollup(where={'Month': [2]})
+    assert total['flights'] == len(feb)
+    assert total['cancelled'] == feb['Cancelled'].sum()
+
+
+def test_rollup_where_unknown_value_matches_nothing(flights_csv):
+    df = read_flights(flights_csv)
+    cube = build_cube(df)
+    assert cube.rollup(where={'CancellationCode': ['Z']})['flights'] == 0
+    assert cube.rollup(where={'CancellationCode': ['A', 'Z']})['flights'] == \
+        (df['CancellationCode'] == 'A').sum()
+    # NaN selects the flights without a cancellation code.
+    assert cube.rollup(where={'CancellationCode': [np.nan]})['flights'] == \
+        df['CancellationCode'].isna().sum()
@@ -0,0 +1,16 @@
+import pandas as pd
+
+from flights import concat_frames, default_registry, read_flights, run_history, write_synthetic
+
+
+def test_run_history_equals_run_over_all_years(tmp_path):
+    for year in (2006, 2007, 2008):
+        write_synthetic(str(tmp_path / ('%d.csv' % year)), 3000, seed=year, year=year)
+    df = concat_frames(read_flights(str(tmp_path / ('%d.csv' % y))) for y in (2006, 2007, 2008))
+    expected = default_registry().run(df)
+    got = run_history(str(tmp_path), chunksize=700)
+    for name, table in expected.items():
+        if isinstance(table, pd.Series):
+            pd.testing.assert_series_equal(got[name], table, check_exact=False, rtol=1e-9)
+        else:
+            pd.testing.assert_frame_equal(got[name], table, check_exact=False, rtol=1e-9)
@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from flights import Store, default_registry, read_flights
+
+
+@pytest.fixture(scope='module')
+def monthly_csvs(flights_csv, tmp_path_factory):
+    df = read_flights(flights_csv)
+    directory = tmp_path_factory.mktemp('monthly')
+    paths = []
+    for month, frame in df.groupby('Month'):
+        path = str(directory / ('2008_%02d.csv' % month))
+        frame.to_csv(path, index=False, na_rep='NA')
+        paths.append(path)
+    return df, paths
+
+
+def assert_tables_equal(got, expected):
+    assert set(got) == set(expected)
+    for name in expected:
+        if isinstance(expected[name], pd.Series):
+            pd.testing.assert_series_equal(got[name], expected[name], check_exact=False,
+                                           rtol=1e-9, obj=name)
+        else:
+            pd.testing.assert_frame_equal(got[name], expected[name], check_exact=False,
+                                          rtol=1e-9, obj=name)
+
+
+def test_ingest_equals_full_recompute(monthly_csvs, tmp_path):
+    df, paths = monthly_csvs
+    store = Store(str(tmp_path / 'store'))
+    for path in paths:
+        store.ingest(path, chunksize=500)
+    assert len(store.months()) == len(paths)
+    assert_tables_equal(store.results(), default_registry().run(df))
+    # Reopened from disk, and with a month replaced by the same data.
+    store = Store(str(tmp_path / 'store'))
+    store.ingest(paths[0], replace=True)
+    assert_tables_equal(store.results(), default_registry().run(df))
+    assert store.cube.rollup()['flights'] == len(df)
+
+
+def test_ingest_refuses_mixed_months(flights_csv, tmp_path):
+    with pytest.raises(ValueError, match='more than one month'):
+        Store(str(tmp_path / 'store')).ingest(flights_csv)
@@ -0,0 +1,16 @@
+import pandas as pd
+
+from flights import default_registry, read_flights, run_parallel
+
+
+def test_run_parallel_equals_serial(flights_csv):
+    df = read_flights(flights_csv)
+    registry = default_registry()
+    expected = registry.run(df)
+    got = run_parallel(df, registry, workers=3)
+    assert set(got) == set(expected)
+    for name, table in expected.items():
+        if isinstance(table, pd.Series):
+            pd.testing.assert_series_equal(got[name], table, check_exact=False, rtol=1e-9)
+        else:
+            pd.testing.assert_frame_equal(got[name], table, check_exact=False, rtol=1e-9)
@@ -0,0 +1,61 @@
+import os
+
+import pandas as pd
+import pytest
+
+from flights import Chart, default_registry, read_flights, render_report, report_charts
+from flights.report import MANIFEST
+
+pytest.importorskip('matplotlib')
+
+
+@pytest.fixture(scope='module')
+def charts(flights_csv):
+    # A few of them, to keep the drawing time down.
+    return report_charts(default_registry().run(read_flights(flights_csv)))[:6]
+
+
+def mtimes(out_dir):
+    return {name: os.stat(os.path.join(out_dir, name)).st_mtime_ns
+            for name in os.listdir(out_dir) if name != MANIFEST}
+
+
+def test_second_render_skips_unchanged_charts(charts, tmp_path):
+    out = str(tmp_path)
+    status = render_report(charts, out, workers=1)
+    assert set(status.values()) == {'rendered'}
+    assert sorted(mtimes(out)) == sorted('%s.png' % c.name for c in charts)
+    before = mtimes(out)
+
+    assert set(render_report(charts, out, workers=1).values()) == {'unchanged'}
+    assert mtimes(out) == before
+
+    # New data for one chart redraws that chart alone.
+    changed = list(charts)
+    i = next(i for i, c in enumerate(changed) if c.name == 'flights_month')
+    table = changed[i].table.copy()
+    table.iloc[0] += 1
+    changed[i] = Chart(**{**vars(changed[i]), 'table': table})
+    status = render_report(changed, out, workers=1)
+    assert [n for n, s in status.items() if s == 'rendered'] == ['flights_month']
+    after = mtimes(out)
+    assert [n for n in after if after[n] != before[n]] == ['flights_month.png']
+
+    # So do new drawing options and a missing file; force redraws all.
+    changed[i] = Chart(**{**vars(changed[i]), 'title': 'Flights'})
+    os.remove(os.path.join(out, 'cancelled_share.png'))
+    status = render_report(changed, out, workers=1)
+    assert sorted(n for n, s in status.items() if s == 'rendered') == ['cancelled_share',
+                                                                      'flights_month']
+    assert set(render_report(changed, out, workers=1, force=True).values()) == {'rendered'}
+
+
+def test_fingerprint_follows_contents():
+    table = pd.Series([1.0, 2.0], index=pd.Index(['a', 'b'], name='x'), name='y')
+    chart = Chart('c', table)
+    assert chart.fingerprint() == Chart('c', table.copy()).fingerprint()
+    for other in [table.rename('z'), table.astype('float32'), table.set_axis(['a', 'c']),
+                  table * 2]:
+        assert Chart('c', other).fingerprint() != chart.fingerprint()
+    assert Chart('c', table, kind='line').fingerprint() != chart.fingerprint()
+    assert Chart('c', table, options={'color': 'red'}).fingerprint() != chart.fingerprint()
@@ -0,0 +1,93 @@
+import os
+
+import pandas as pd
+import pytest
+
+from flights import ResultCache, build_cache, cached_results, default_registry, load_flights
+from flights.results import INDEX
+
+
+def counting(registry):
+    # Count the months reduced, i.e. not served from the cache.
+    calls = []
+    partial = registry.partial
+
+    def wrapper(df, tables=None):
+        calls.append(int(df['Month'].iloc[0]))
+        return partial(df, tables)
+    registry.partial = wrapper
+    return calls
+
+
+@pytest.fixture
+def csv(flights_csv, tmp_path):
+    path = str(tmp_path / '2008.csv')
+    with open(flights_csv) as src, open(path, 'w') as dst:
+        dst.write(src.read())
+    return path
+
+
+def test_cached_results_equal_registry_run(csv):
+    registry = default_registry()
+    expected = registry.run(load_flights(csv))
+    for _ in range(2):
+        got = cached_results(csv, registry)
+        for name, table in expected.items():
+            if isinstance(table, pd.Series):
+                pd.testing.assert_series_equal(got[name], table, check_exact=False, rtol=1e-9)
+            else:
+                pd.testing.assert_frame_equal(got[name], table, check_exact=False, rtol=1e-9)
+
+
+def test_one_changed_month_is_recomputed_alone(csv):
+    registry = default_registry()
+    build_cache(csv, chunksize=3000)
+    calls = counting(registry)
+    cached_results(csv, registry)
+    assert sorted(calls) == list(range(1, 13))
+
+    # One more January flight, near the top of the file so that every
+    # chunk boundary after it moves.
+    with open(csv) as f:
+        lines = f.readlines()
+    january = next(line for line in lines[1:] if line.split(',')[1] == '1')
+    lines.insert(2, january)
+    with open(csv, 'w') as f:
+        f.writelines(lines)
+    build_cache(csv, chunksize=3000)
+    del calls[:]
+    results = cached_results(csv, registry)
+    assert calls == [1]
+    assert results['month']['Total_Flights'].sum() == len(lines) - 1
+
+
+def test_lost_index_is_not_an_error(csv):
+    registry = default_registry()
+    cache = ResultCache(os.path.join(os.path.dirname(csv), 'results'))
+    expected = cached_results(csv, registry, cache=cache)
+    os.remove(os.path.join(cache.root, INDEX))
+    cache = ResultCache(cache.root)
+    calls = counting(registry)
+    got = cached_results(csv, registry, cache=cache)
+    assert calls == []
+    pd.testing.assert_frame_equal(got['month'], expected['month'])
+    assert len(cache) > 0
+
+
+@pytest.mark.parametrize('damage', [lambda data: data[:len(data) // 2],
+                                    lambda data: b'not a pickle',
+                                    lambda data: b''])
+def test_corrupt_entry_is_a_miss(tmp_path, damage):
+    cache = ResultCache(str(tmp_path / 'results'))
+    key = cache.key('data', 'spec')
+    cache.put(key, pd.DataFrame({'a': range(1000)}))
+    path = cache._path(key)
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(damage(data))
+    assert cache.get(key) is None
+    assert key not in cache and not os.path.exists(path)
+    assert key not in ResultCache(cache.root).index['entries']
+    assert cache.get_or_compute(key, lambda: 42) == 42
+    assert cache.get(key) == 42
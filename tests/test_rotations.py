@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from flights import delay_chains, minutes, read_flights, rotations
+from flights.rotations import ROTATION_KEYS
+
+
+@pytest.fixture(scope='module')
+def df(flights_csv):
+    # Few aircraft over few days, so that rotations are long and chains
+    # run over many legs; tail '0' is a placeholder and never linked.
+    df = read_flights(flights_csv).iloc[:3000].reset_index(drop=True)
+    rng = np.random.default_rng(18)
+    df['Month'] = df['Month'].where(df.index < 1500, 2)
+    df['DayofMonth'] = rng.integers(1, 4, len(df)).astype(df['DayofMonth'].dtype)
+    tails = ['N%03dXX' % i for i in range(25)] + ['0']
+    df['TailNum'] = pd.Categorical(rng.choice(tails, len(df)))
+    return df
+
+
+def reference(df):
+    r = df[ROTATION_KEYS + ['ArrDelay', 'DepDelay']].astype(
+        {'ArrDelay': 'float64', 'DepDelay': 'float64'})
+    r['row'] = np.arange(len(df))
+    r['sched'] = minutes(df['CRSDepTime']).to_numpy()
+    r = r[(df['Cancelled'] == 0) & (df['TailNum'] != '0')]
+    r = r.sort_values(ROTATION_KEYS + ['sched', 'row'])
+    g = r.groupby(ROTATION_KEYS, observed=True, sort=False)
+    r['Leg'] = g.cumcount() + 1
+    r['PrevRow'] = g['row'].shift().fillna(-1).astype(np.int64)
+    r['InboundDelay'] = g['ArrDelay'].shift()
+    r['Propagated'] = np.minimum(r['InboundDelay'].clip(lower=0),
+                                 r['DepDelay'].clip(lower=0)).fillna(0)
+    r['late'] = r['ArrDelay'].clip(lower=0).fillna(0)
+    r['CumulativeDelay'] = r.groupby(ROTATION_KEYS, observed=True, sort=False)['late'].cumsum()
+    return r
+
+
+def test_rotations_match_groupby_shift(df):
+    got = rotations(df)
+    r = reference(df)
+    assert (got['Leg'].to_numpy()[r['row']] == r['Leg'].to_numpy()).all()
+    off = np.setdiff1d(np.arange(len(df)), r['row'])
+    assert len(off) and (got['Leg'].to_numpy()[off] == 0).all()
+    assert (got['Chain'].to_numpy()[off] == -1).all()
+    assert r['Leg'].max() > 5
+    for c in ['PrevRow', 'InboundDelay', 'Propagated', 'CumulativeDelay']:
+        np.testing.assert_array_equal(got[c].to_numpy()[r['row']], r[c].to_numpy(), err_msg=c)
+
+
+def test_chains_brute_force(df):
+    got = rotations(df)
+    # Walk every aircraft-day leg by leg: a chain goes on while a leg
+    # inherits delay from the one before.
+    r = reference(df)
+    chains, current, previous = {}, None, None
+    for row, key, propagated in zip(r['row'], r[ROTATION_KEYS].itertuples(index=False),
+                                    r['Propagated']):
+        if key != previous or propagated <= 0:
+            current = len(chains)
+            chains[current] = []
+        chains[current].append(row)
+        previous = key
+    chain = got['Chain'].to_numpy()
+    for number, rows in chains.items():
+        assert (chain[rows] == number).all()
+    assert chain.max() == len(chains) - 1
+
+    # Missing delays as -1 so that the tuples sort.
+    arrival = df['ArrDelay'].astype('float64').fillna(-1).to_numpy()
+    propagated = got['Propagated'].to_numpy()
+    expected = sorted(
+        (-propagated[rows].sum(), len(rows), arrival[rows[0]], arrival[rows[-1]])
+        for rows in chains.values() if len(rows) >= 2)
+    out = delay_chains(df, got)
+    assert len(out) == len(expected) and max(len(c) for c in chains.values()) > 2
+    actual = sorted(zip(-out['Propagated'], out['Legs'], out['RootDelay'].fillna(-1),
+                        out['ArrDelay'].fillna(-1)))
+    np.testing.assert_allclose(np.array(actual, dtype=float), np.array(expected, dtype=float))
+    assert out['Propagated'].is_monotonic_decreasing
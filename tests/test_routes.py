@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from flights import DELAY_COLUMNS, CodeTable, RouteIndex, read_flights, route_stats, top_routes
+
+
+@pytest.fixture(scope='module')
+def df(flights_csv):
+    return read_flights(flights_csv)
+
+
+def grouped(df, column, where=None):
+    # The reference: pandas groupby over the route, with 0 left out of the
+    # statistics of the DELAY_COLUMNS like missing values.
+    if where is not None:
+        df = df[where]
+    values = df[column].astype('float64')
+    size = df.groupby(['Origin', 'Dest'], observed=True).size()
+    keep = values.notna() & ((values != 0) | (column not in DELAY_COLUMNS))
+    kept = df[keep].assign(**{column: values})
+    g = kept.groupby(['Origin', 'Dest'], observed=True)[column]
+    return size, g
+
+
+def test_route_index_numbers_occurring_pairs(df):
+    groups = RouteIndex(df)
+    size = df.groupby(['Origin', 'Dest'], observed=True).size()
+    assert groups.ngroups == len(size)
+    counts = np.bincount(groups.codes[groups.codes >= 0], minlength=groups.ngroups)
+    np.testing.assert_array_equal(counts, size.to_numpy())
+    index = groups.index(np.arange(groups.ngroups))
+    assert list(index) == list(size.index)
+
+
+@pytest.mark.parametrize('column', ['ArrDelay', 'LateAircraftDelay'])
+def test_route_stats_match_groupby(df, column):
+    where = (df['Month'] == 2).to_numpy()
+    got = route_stats(df, [column], where={'Month': [2]})
+    size, g = grouped(df, column, where)
+    np.testing.assert_array_equal(got['Total_Flights'].to_numpy(), size.to_numpy())
+    assert list(got.index) == list(size.index)
+    expected = pd.DataFrame({'count': g.count(), 'mean': g.mean(), 'median': g.median(),
+                             'q90': g.quantile(0.9)}).reindex(size.index)
+    for stat in ['count', 'mean', 'median', 'q90']:
+        np.testing.assert_allclose(got['%s_%s' % (column, stat)].to_numpy(dtype=np.float64),
+                                   expected[stat].fillna(0 if stat == 'count' else np.nan),
+                                   rtol=1e-12, err_msg=stat)
+    cancelled = df[where].groupby(['Origin', 'Dest'], observed=True)['Cancelled'].mean()
+    np.testing.assert_allclose(got['Cancelled'].to_numpy(), cancelled.to_numpy())
+
+
+@pytest.mark.parametrize('stat, ascending', [('mean', False), ('median', False),
+                                             ('median', True), ('count', False)])
+def test_top_routes_match_sorted_groupby(df, stat, ascending):
+    size, g = grouped(df, 'DepDelay')
+    values = g.agg(stat).astype('float64')
+    values = values[size.reindex(values.index) >= 2]
+    expected = values.sort_values(ascending=ascending, kind='stable')
+    for k in [1, 7, 40, len(expected) + 5]:
+        got = top_routes(df, 'DepDelay', stat, k=k, min_flights=2, ascending=ascending)
+        assert list(got.index) == list(expected.index[:k]), k
+        np.testing.assert_allclose(got['DepDelay_%s' % stat].to_numpy(),
+                                   expected.to_numpy()[:k])
+    # The integer delays tie often, also across the boundary of the top k.
+    boundary = [k for k in range(1, len(expected))
+                if expected.iloc[k - 1] == expected.iloc[k]]
+    assert boundary
+    k = boundary[len(boundary) // 2]
+    got = top_routes(df, 'DepDelay', stat, k=k, min_flights=2, ascending=ascending)
+    assert list(got.index) == list(expected.index[:k])
+
+
+def test_top_routes_with_code_table(flights_csv, df):
+    coded = read_flights(flights_csv, codes=CodeTable())
+    for k in [5, 50]:
+        got = top_routes(coded, 'ArrDelay', k=k, min_flights=3)
+        expected = top_routes(df, 'ArrDelay', k=k, min_flights=3)
+        np.testing.assert_array_equal(got['ArrDelay_mean'].to_numpy(),
+                                      expected['ArrDelay_mean'].to_numpy())
+    assert top_routes(df, 'ArrDelay', k=0).empty
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from flights import read_flights, sample_flights
+from flights.sample import _allocate
+
+STRATA = ['Month', 'DayOfWeek', 'UniqueCarrier']
+
+
+def test_allocate_gives_every_stratum_one():
+    sizes = np.array([10000, 5, 1, 0, 3])
+    quota = _allocate(20, sizes)
+    assert quota.sum() == 20
+    assert (quota[sizes > 0] >= 1).all() and quota[3] == 0
+    assert (quota <= sizes).all()
+
+
+def test_stratified_sample_covers_every_stratum(flights_csv):
+    df = read_flights(flights_csv)
+    strata = df.groupby(STRATA, observed=True).ngroups
+    sample = sample_flights(flights_csv, strata + 50, seed=1, strata=STRATA)
+    assert len(sample.frame) == strata + 50
+    assert not len(sample.excluded)
+    assert np.isfinite(sample.weights['weight'][sample.weights['population'] > 0]).all()
+    # The weights add up to the population.
+    assert sample.row_weights().sum() == pytest.approx(len(df))
+    assert sample.mean('Distance') == pytest.approx(df['Distance'].mean(), rel=0.05)
+
+
+def test_too_small_sample_reports_excluded_strata(flights_csv):
+    sample = sample_flights(flights_csv, 10, seed=1, strata=STRATA)
+    assert len(sample.excluded)
+    with pytest.raises(ValueError):
+        sample.mean('Distance')
@@ -0,0 +1,63 @@
+import numpy as np
+
+from flights import DELAY_COLUMNS, QuantileSketch, delay_bins, quantile_bins, quartile_bins
+
+LEVELS = np.linspace(0.01, 0.99, 99)
+
+
+def rank_error(sketch, values, levels=LEVELS):
+    # Largest distance, as a fraction of the values, between each level and
+    # the rank range of its estimate in the sorted data (np.quantile's).
+    values = np.sort(values)
+    estimate = sketch.quantile(levels)
+    below = np.searchsorted(values, estimate, side='left') / len(values)
+    upto = np.searchsorted(values, estimate, side='right') / len(values)
+    return np.max(np.where(levels < below, below - levels,
+                           np.where(levels > upto, levels - upto, 0)))
+
+
+def test_merged_sketches_within_error_bound():
+    rng = np.random.default_rng(12)
+    # Long-tailed integer delays, with many ties, split over workers.
+    values = np.rint(rng.lognormal(3, 1, 200_000))
+    parts = np.array_split(values, 7)
+    for seed in range(5):
+        sketches = [QuantileSketch(seed=seed).update(p) for p in parts]
+        merged = sketches[0]
+        for s in sketches[1:]:
+            merged.merge(s)
+        assert merged.n == len(values)
+        assert (merged.min, merged.max) == (values.min(), values.max())
+        assert rank_error(merged, values) <= 0.0165
+        assert sum(len(lv) for lv in merged.levels) < 1000
+
+
+def test_sketch_of_few_values_is_exact():
+    values = np.array([5.0, 1.0, np.nan, 3.0, 2.0, 4.0])
+    s = QuantileSketch().update(values)
+    assert len(s) == 5
+    assert s.quantile([0, 0.5, 1]).tolist() == [1.0, 3.0, 5.0]
+    assert s.rank(3) == 0.6
+    assert np.isnan(QuantileSketch().quantile(0.5))
+
+
+def test_quartile_bins_labels():
+    s = QuantileSketch().update(np.arange(1, 101))
+    edges, labels = quartile_bins(s)
+    assert edges == [0, 25, 50, 75, 100]
+    assert labels == ['1-25', '26-50', '51-75', '76-100']
+    edges, labels = quartile_bins(QuantileSketch().update([0.5, 1.5, 2.5, 3.5]), levels=[0.5])
+    assert edges[1:] == [1.5, 3.5] and edges[0] < 0.5
+    assert labels[1] == '1.5-3.5'
+    # Coinciding edges are merged.
+    edges, labels = quartile_bins(QuantileSketch().update([7] * 10 + [9]))
+    assert edges == [6, 7, 9] and labels == ['7-7', '8-9']
+
+
+def test_delay_bins_are_quartile_quantile_bins(flights_csv):
+    from flights import read_flights
+
+    df = read_flights(flights_csv)
+    bins = delay_bins(df, seed=3)
+    assert bins == quantile_bins(df, DELAY_COLUMNS, seed=3)
+    assert set(bins) == set(DELAY_COLUMNS)
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from flights import RollingStats
+
+RECORD = {'Year': 2008, 'Month': 1, 'DayofMonth': 3, 'CRSDepTime': 1200, 'Origin': 'ATL',
+          'UniqueCarrier': 'WN', 'Cancelled': 0, 'CarrierDelay': 'NA', 'WeatherDelay': 'NA',
+          'NASDelay': 'NA', 'SecurityDelay': 'NA', 'LateAircraftDelay': 'NA'}
+
+
+def test_window_means():
+    stats = RollingStats()
+    stats.update(dict(RECORD, CarrierDelay='10'))
+    stats.update(dict(RECORD, CarrierDelay=20, Cancelled='1', CRSDepTime=1300))
+    stats.update(dict(RECORD, CarrierDelay='0', CRSDepTime=1400))
+    row = stats.snapshot('24h', 'Origin').loc['ATL']
+    assert row['Total_Flights'] == 3
+    assert row['Cancelled'] == pytest.approx(1 / 3)
+    assert row['CarrierDelay'] == 15
+
+
+@pytest.mark.parametrize('bad', ['NaN', 'nan', 'inf', '-Infinity', float('nan')])
+def test_non_finite_values_count_as_missing(bad):
+    stats = RollingStats()
+    stats.update(dict(RECORD, CarrierDelay=bad, WeatherDelay=bad))
+    stats.update(dict(RECORD, CarrierDelay='30', CRSDepTime=1300))
+    row = stats.snapshot('24h', 'Origin').loc['ATL']
+    assert row['CarrierDelay'] == 30
+    assert np.isnan(row['WeatherDelay'])
+    assert row['Total_Flights'] == 2
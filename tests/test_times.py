@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from flights import add_time_columns, hour_of_day, hourly_delays, minutes, read_flights
+
+
+@pytest.fixture(scope='module')
+def df(flights_csv):
+    return read_flights(flights_csv)
+
+
+def test_minutes_edge_cases():
+    hhmm = pd.Series([0, 1, 5, 59, 100, 101, 959, 1435, 2359, 2400, None],
+                     dtype='Int16', name='DepTime')
+    got = minutes(hhmm)
+    assert got.name == 'DepMinutes' and got.dtype == 'Int16'
+    assert got.tolist() == [0, 1, 5, 59, 60, 61, 599, 875, 1439, 1440, pd.NA]
+    # Midnight at the end of the day sorts after 2359.
+    assert got[9] > got[8]
+
+
+def test_minutes_without_missing_is_int16():
+    got = minutes(pd.Series(np.array([30, 2400, 845], dtype=np.int16), name='CRSDepTime'))
+    assert got.dtype == np.int16 and got.name == 'CRSDepMinutes'
+    assert got.tolist() == [30, 1440, 525]
+    got = minutes(pd.Series([30.0, np.nan]))
+    assert got.dtype == 'Int16' and got.isna().tolist() == [False, True]
+
+
+def test_hour_of_day():
+    np.testing.assert_array_equal(hour_of_day(np.array([0, 59, 60, 1439, 1440])),
+                                  [0, 0, 1, 23, 23])
+    assert hour_of_day(np.array([5])).dtype == np.int8
+    got = hour_of_day(minutes(pd.Series([2400, 5, None], dtype='Int16', name='DepTime')))
+    assert got.dtype == 'Int8' and list(got) == [23, 0, pd.NA]
+
+
+def test_add_time_columns():
+    df = pd.DataFrame({'DepTime': pd.array([2355, None, 2400], dtype='Int16'),
+                       'CRSDepTime': np.array([2350, 1200, 2359], dtype=np.int16),
+                       'ArrTime': pd.array([15, None, 2400], dtype='Int16'),
+                       'CRSArrTime': np.array([5, 1400, 2400], dtype=np.int16)})
+    add_time_columns(df)
+    assert df['Overnight'].tolist() == [1, 0, 0]
+    assert df['ArrOvernight'].tolist() == [1, 0, 0]
+    assert df['DepHour'].tolist() == [23, 12, 23]
+    assert df['ArrHour'].tolist() == [0, 14, 23]
+    assert df['DepMinutes'].isna().tolist() == [False, True, False]
+
+
+def test_hourly_delays_match_groupby(df):
+    got = hourly_delays(df)
+    hour = np.minimum((df['CRSDepTime'] // 100).astype(int), 23)
+    expected = (df.assign(hour=hour, DepDelay=df['DepDelay'].astype('float64'))
+                .groupby(['Origin', 'hour'], observed=True)['DepDelay'].mean()
+                .unstack('hour').reindex(columns=range(24)))
+    np.testing.assert_allclose(got.to_numpy(), expected.to_numpy(), rtol=1e-12)
+    assert list(got.index) == list(expected.index)
+    assert list(got.columns) == list(range(24))
@@ -0,0 +1,16 @@
+from flights import trace
+from flights.trace import Tracer, stage
+
+
+def test_tracer_without_resource(monkeypatch):
+    # As on Windows, where the resource module does not exist.
+    monkeypatch.setattr(trace, 'resource', None)
+    with Tracer() as tracer:
+        with stage('outer', rows_in=2):
+            with stage('inner'):
+                pass
+    assert all(s.max_rss is None for s in tracer.spans)
+    summary = tracer.summary()
+    assert set(summary.index) == {'outer', 'inner'}
+    assert summary['max_rss_mb'].isna().all()
+    assert 'max_rss' not in tracer.chrome_trace()['traceEvents'][0]['args']